@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness for the semana2 and semana3 pipelines.
+
+Generates synthetic datasets with the Kaggle schemas at several sizes, times
+every pipeline phase separately, samples peak RSS per phase and writes JSON
+results. Passing --baseline compares against a stored run and flags
+regressions (non-zero exit code). With --dtypes float64 float32 every run
+is repeated with the processors' float32 in-place path and the peak-memory
+reduction is reported.
+
+    python benchmarks/run.py --sizes 1000 100000 --output bench.json
+    python benchmarks/run.py --sizes 1000 100000 --baseline bench.json
+    python benchmarks/run.py --sizes 1e6 --dtypes float64 float32
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Ensure the repo root is in the python path to find modules if run from root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import sklearn
+
+from benchmarks.synthetic import ensure_dataset
+
+# Rows used by phases that cannot scale to the largest sizes (None = all rows)
+DEFAULT_PHASE_CAPS = {
+    'train': 200_000,
+    'cv': 100_000,
+    'viz_models': 200_000,
+    'dbscan': 200_000,
+    'dbscan_graph': 200_000,
+    'tsne': 5_000,
+    'tsne_fast': 200_000,
+}
+
+# Rows the fast t-SNE embeds; the rest of its capped input is kNN-interpolated
+TSNE_FAST_SAMPLE = 5_000
+
+
+class PeakRSSSampler:
+    """Samples the process RSS in a background thread to get a per-phase peak."""
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_rss():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            # Non-Linux fallback: lifetime peak (KB on Linux, bytes on macOS)
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current_rss())
+
+    def __enter__(self):
+        self.start = self.peak = self.current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current_rss())
+
+
+def semana2_phases(dataset_path, caps, plot_dir, dtype='float64'):
+    from semana2.src.data.processor import SocialAdDataProcessor
+    from semana2.src.models.engine import SupervisedModelEngine
+    from semana2.src.utils.visualizer import ResultsVisualizer
+
+    state = {}
+
+    def cap(phase, *arrays):
+        limit = caps.get(phase)
+        return [a[:limit] for a in arrays] if limit else list(arrays)
+
+    def load():
+        state['processor'] = SocialAdDataProcessor(dataset_path, dtype=dtype)
+        state['processor'].load_data()
+
+    def preprocess():
+        processor = state['processor']
+        processor.preprocess()
+        state['splits'] = processor.get_data_splits()
+
+    def preprocess_chunked():
+        # Out-of-core variant of load + preprocess; the in-memory state is left as is
+        processor = SocialAdDataProcessor(dataset_path, dtype=dtype)
+        processor.preprocess_chunked(chunksize=100_000)
+
+    def train():
+        X_train, X_test, y_train, y_test = state['splits']
+        X_train, y_train = cap('train', X_train, y_train)
+        state['engine'] = SupervisedModelEngine()
+        state['results'] = state['engine'].train_evaluate_all(X_train, y_train, X_test, y_test)
+
+    def cv():
+        processor = state['processor']
+        X, y = cap('cv', processor.X_scaled, processor.y)
+        state['engine'].run_cross_validation(X, y)
+
+    def viz_models():
+        X_train, _, y_train, _ = state['splits']
+        X_train, y_train = cap('viz_models', X_train, y_train)
+        state['models_2d'] = state['engine'].train_2d_models_for_viz(X_train, y_train)
+
+    def plot():
+        processor = state['processor']
+        visualizer = ResultsVisualizer(output_dir=plot_dir)
+        X, y = cap('plot', processor.X_scaled, processor.y)
+        _, _, _, y_test = state['splits']
+        for name, res in state['results'].items():
+            visualizer.plot_confusion_matrix(y_test, res['predictions'], name)
+        for name, model in state['models_2d'].items():
+            visualizer.plot_decision_boundary(model, X, y, name)
+
+    return [('load', load), ('preprocess', preprocess), ('preprocess_chunked', preprocess_chunked),
+            ('train', train), ('cv', cv), ('viz_models', viz_models), ('plot', plot)]
+
+
+def semana3_phases(dataset_path, caps, plot_dir, dtype='float64'):
+    from semana3.src.data.processor import UserBehaviorDataProcessor
+    from semana3.src.models.dbscan_graph import DBSCANNeighborGraph
+    from semana3.src.models.engine import ClusteringModelEngine
+    from semana3.src.utils.visualizer import ClusteringVisualizer
+
+    state = {'engine': ClusteringModelEngine()}
+
+    def capped(phase):
+        limit = caps.get(phase)
+        return state['X'][:limit] if limit else state['X']
+
+    def load():
+        state['processor'] = UserBehaviorDataProcessor(dataset_path, verbose=False, dtype=dtype)
+        state['processor'].load_data()
+
+    def preprocess():
+        state['processor'].preprocess()
+        state['X'] = state['processor'].get_scaled_data()
+
+    def kmeans_sweep():
+        state['inertia'] = state['engine'].find_optimal_k(capped('kmeans_sweep'), range(1, 10))
+
+    def kmeans_sweep_parallel():
+        state['engine'].find_optimal_k(capped('kmeans_sweep_parallel'), range(1, 10), n_jobs=-1)
+
+    def kmeans_sweep_warm():
+        state['engine'].find_optimal_k(capped('kmeans_sweep_warm'), range(1, 10), warm_start=True,
+                                       knee_threshold=0.1)
+
+    def kmeans():
+        state['labels'], _ = state['engine'].run_kmeans(capped('kmeans'), n_clusters=4)
+
+    def kmeans_streaming():
+        # Streams the CSV itself, so the row cap does not apply
+        processor = UserBehaviorDataProcessor(dataset_path, verbose=False, dtype=dtype)
+        state['engine'].run_kmeans_streaming(processor, n_clusters=4)
+
+    def dbscan():
+        state['engine'].run_dbscan(capped('dbscan'), eps=0.6, min_samples=5)
+
+    def dbscan_graph():
+        # One neighbor graph, then DBSCAN at several eps without recomputing neighborhoods
+        neighbor_graph = DBSCANNeighborGraph(max_eps=0.8).fit(capped('dbscan_graph'))
+        neighbor_graph.sweep([0.4, 0.5, 0.6, 0.7, 0.8], min_samples=5)
+
+    def pca():
+        state['engine'].run_pca(capped('pca'), n_components=2)
+
+    def pca_streaming():
+        # Streams the CSV itself, so the row cap does not apply
+        processor = UserBehaviorDataProcessor(dataset_path, verbose=False, dtype=dtype)
+        shared = state['engine'].fit_pca_streaming(processor)
+        for _ in shared.transform_chunks(processor.iter_scaled_chunks(), 2):
+            pass
+
+    def tsne():
+        X = capped('tsne')
+        state['X_tsne'] = state['engine'].run_tsne(X, n_components=2, perplexity=min(30, (len(X) - 1) / 3))
+
+    def tsne_fast():
+        state['engine'].run_tsne_fast(capped('tsne_fast'), n_components=2, sample_size=TSNE_FAST_SAMPLE)
+
+    def plot():
+        visualizer = ClusteringVisualizer(output_dir=plot_dir)
+        X = capped('plot')
+        labels = state['labels'][:len(X)] if 'labels' in state else None
+        if 'inertia' in state:
+            visualizer.plot_elbow_method(range(1, 10), state['inertia'])
+        visualizer.plot_cluster_scatter(X, labels, 'KMeans', 'x', 'y', 'segmentacion_kmeans.png')
+        if 'X_tsne' in state:
+            visualizer.plot_tsne(state['X_tsne'], state['labels'][:len(state['X_tsne'])])
+
+    return [('load', load), ('preprocess', preprocess), ('kmeans_sweep', kmeans_sweep),
+            ('kmeans_sweep_parallel', kmeans_sweep_parallel), ('kmeans_sweep_warm', kmeans_sweep_warm),
+            ('kmeans', kmeans), ('kmeans_streaming', kmeans_streaming), ('dbscan', dbscan),
+            ('dbscan_graph', dbscan_graph), ('pca', pca),
+            ('pca_streaming', pca_streaming), ('tsne', tsne),
+            ('tsne_fast', tsne_fast), ('plot', plot)]
+
+
+PIPELINES = {'semana2': semana2_phases, 'semana3': semana3_phases}
+
+
+def run_pipeline(pipeline, n_rows, data_dir, caps, skip=(), dtype='float64'):
+    """Runs one pipeline at one size and returns a result record per phase."""
+    dataset_path = ensure_dataset(pipeline, n_rows, data_dir)
+    records = []
+    with tempfile.TemporaryDirectory() as plot_dir:
+        phases = PIPELINES[pipeline](dataset_path, caps, plot_dir, dtype)
+        run_start = PeakRSSSampler.current_rss()
+        for phase, fn in phases:
+            if phase in skip:
+                continue
+            with PeakRSSSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                fn()
+                wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            limit = caps.get(phase)
+            record = {
+                'pipeline': pipeline, 'rows': n_rows, 'phase': phase, 'dtype': dtype,
+                'rows_used': min(n_rows, limit) if limit else n_rows,
+                'seconds': wall, 'cpu_seconds': cpu,
+                'peak_rss_mb': rss.peak / 2 ** 20,
+                'rss_delta_mb': (rss.peak - rss.start) / 2 ** 20,
+                # Growth over the RSS before the run's first phase, comparable across dtypes
+                'run_peak_mb': (rss.peak - run_start) / 2 ** 20
+            }
+            records.append(record)
+            print(f"{pipeline:8s} n={n_rows:>10,d} {dtype:7s} {phase:21s} {wall:9.3f}s "
+                  f"peak RSS {record['peak_rss_mb']:8.1f} MB")
+    return records
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """Returns phases slower than baseline by more than tolerance (and min_seconds)."""
+    reference = {(r['pipeline'], r['rows'], r['phase'], r.get('dtype', 'float64')): r
+                 for r in baseline['results']}
+    regressions = []
+    for record in results:
+        base = reference.get((record['pipeline'], record['rows'], record['phase'], record['dtype']))
+        if base is None:
+            continue
+        slower = record['seconds'] - base['seconds']
+        if slower > min_seconds and record['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append({**record, 'baseline_seconds': base['seconds'],
+                                'ratio': record['seconds'] / base['seconds']})
+    return regressions
+
+
+def memory_reduction(results, reference='float64', compact='float32'):
+    """
+    Peak memory of the compact-dtype runs against the reference ones, per
+    pipeline and size: the run's peak RSS growth and the preprocess phase's.
+    """
+    runs = {}
+    for record in results:
+        run = runs.setdefault((record['pipeline'], record['rows'], record['dtype']), {})
+        run['peak'] = max(run.get('peak', 0.0), record['run_peak_mb'])
+        if record['phase'] == 'preprocess':
+            run['preprocess'] = record['rss_delta_mb']
+    rows = []
+    for (pipeline, n_rows, dtype), run in sorted(runs.items()):
+        base = runs.get((pipeline, n_rows, reference))
+        if dtype != compact or base is None:
+            continue
+        rows.append({'pipeline': pipeline, 'rows': n_rows,
+                     'peak_mb': (base['peak'], run['peak']),
+                     'preprocess_mb': (base.get('preprocess', 0.0), run.get('preprocess', 0.0))})
+    return rows
+
+
+def _reduction(before, after):
+    return f"{before:8.1f} -> {after:8.1f} MB ({1 - after / before:6.1%})" if before > 0 else "n/a"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the semana pipelines on synthetic data.")
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1e3, 1e4, 1e5],
+                        help="Row counts to benchmark (10^3 to 10^7)")
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--dtypes', nargs='+', choices=('float64', 'float32'), default=['float64'],
+                        help="Feature dtypes to run; both also reports the float32 peak-memory reduction")
+    parser.add_argument('--skip', nargs='*', default=[], help="Phase names to skip")
+    parser.add_argument('--cap', nargs='*', default=[], metavar='PHASE=ROWS',
+                        help="Override per-phase row caps (ROWS=0 removes the cap)")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    parser.add_argument('--output', default=None, help="Write JSON results to this file")
+    parser.add_argument('--baseline', default=None, help="Baseline JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown before flagging a regression")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many seconds")
+    return parser.parse_args(argv)
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    caps = dict(DEFAULT_PHASE_CAPS)
+    for item in args.cap:
+        phase, rows = item.split('=')
+        caps[phase] = int(float(rows)) or None
+
+    results = []
+    for n_rows in sorted(int(size) for size in args.sizes):
+        for pipeline in args.pipelines:
+            for dtype in args.dtypes:
+                results.extend(run_pipeline(pipeline, n_rows, args.data_dir, caps, set(args.skip), dtype))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'sklearn': sklearn.__version__, 'cpu_count': os.cpu_count(),
+            'platform': platform.platform(), 'phase_caps': caps,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+    reductions = memory_reduction(results)
+    if reductions:
+        report['memory_reduction'] = reductions
+        print("\nfloat32 peak-memory reduction (RSS growth over the run's start):")
+        for r in reductions:
+            print(f"{r['pipeline']:8s} n={r['rows']:>10,d} run peak {_reduction(*r['peak_mb'])}  "
+                  f"preprocess {_reduction(*r['preprocess_mb'])}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved benchmark results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        for r in regressions:
+            print(f"REGRESSION {r['pipeline']} n={r['rows']:,d} {r['phase']}: "
+                  f"{r['seconds']:.3f}s vs {r['baseline_seconds']:.3f}s ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
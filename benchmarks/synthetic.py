@@ -0,0 +1,76 @@
+"""
+Synthetic datasets with the same schemas as the bundled Kaggle CSVs,
+generated in chunks so 10^7-row files never have to fit in memory at once.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DEVICES = {
+    'Android': ['Google Pixel 5', 'OnePlus 9', 'Xiaomi Mi 11', 'Samsung Galaxy S21'],
+    'iOS': ['iPhone 12']
+}
+
+
+def social_ads_chunk(n_rows, start_id, rng):
+    """Rows shaped like Social_Network_Ads.csv; purchase odds grow with age and salary."""
+    age = rng.integers(18, 61, n_rows)
+    salary = (rng.integers(15, 151, n_rows) * 1000).astype(np.int64)
+    logit = 0.2 * (age - 42) + 0.00004 * (salary - 70000)
+    purchased = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(np.int8)
+    return pd.DataFrame({
+        'User ID': np.arange(start_id, start_id + n_rows) + 15_000_000,
+        'Gender': rng.choice(['Male', 'Female'], n_rows),
+        'Age': age,
+        'EstimatedSalary': salary,
+        'Purchased': purchased
+    })
+
+
+def user_behavior_chunk(n_rows, start_id, rng):
+    """Rows shaped like user_behavior_dataset.csv; usage metrics scale with behavior class."""
+    behavior = rng.integers(1, 6, n_rows)
+    os_name = np.where(rng.random(n_rows) < 0.8, 'Android', 'iOS')
+    device = np.where(
+        os_name == 'iOS', DEVICES['iOS'][0],
+        np.asarray(DEVICES['Android'])[rng.integers(0, len(DEVICES['Android']), n_rows)]
+    )
+    jitter = rng.random(n_rows)
+    app_usage = (behavior * 100 - 70 + jitter * 90).astype(np.int64)
+    return pd.DataFrame({
+        'User ID': np.arange(start_id, start_id + n_rows) + 1,
+        'Device Model': device,
+        'Operating System': os_name,
+        'App Usage Time (min/day)': app_usage,
+        'Screen On Time (hours/day)': np.round(behavior * 2 - 1 + rng.random(n_rows) * 2, 1),
+        'Battery Drain (mAh/day)': (behavior * 500 + rng.integers(0, 500, n_rows)).astype(np.int64),
+        'Number of Apps Installed': (behavior * 18 - 8 + rng.integers(0, 18, n_rows)).astype(np.int64),
+        'Data Usage (MB/day)': (behavior * 450 - 300 + rng.integers(0, 450, n_rows)).astype(np.int64),
+        'Age': rng.integers(18, 60, n_rows),
+        'Gender': rng.choice(['Male', 'Female'], n_rows),
+        'User Behavior Class': behavior
+    })
+
+
+GENERATORS = {
+    'semana2': ('social_network_ads', social_ads_chunk),
+    'semana3': ('user_behavior', user_behavior_chunk),
+}
+
+
+def ensure_dataset(pipeline, n_rows, data_dir, seed=42, chunk_rows=1_000_000):
+    """Writes (once) and returns the path of a synthetic CSV for a pipeline and size."""
+    name, make_chunk = GENERATORS[pipeline]
+    path = os.path.join(data_dir, f"{name}_{n_rows}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    tmp_path = path + '.tmp'
+    for start in range(0, n_rows, chunk_rows):
+        chunk = make_chunk(min(chunk_rows, n_rows - start), start, rng)
+        chunk.to_csv(tmp_path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,178 @@
+"""
+Content-addressed artifact cache shared by the semana pipelines.
+
+Fitted estimators and derived arrays are pickled to disk under a key that
+hashes the input data, the preprocessing config and the estimator params,
+so an unchanged rerun loads results instead of refitting them.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+class ArtifactCache:
+    """
+    Size-bounded, LRU-evicted on-disk cache of pickled artifacts.
+
+    Entries are files named '<namespace>-<digest>.pkl'. Reads refresh the
+    file's mtime, and once the directory exceeds max_bytes the least
+    recently used entries are deleted.
+    """
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, verbose=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.verbose = verbose
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(namespace, *parts):
+        """Builds a cache key from a namespace and any hashable-by-content parts."""
+        hasher = hashlib.sha256()
+        _update_hash(hasher, sklearn.__version__)
+        for part in parts:
+            _update_hash(hasher, part)
+        return f"{namespace}-{hasher.hexdigest()[:32]}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key, or default on a miss. Entries that
+        no longer unpickle (truncated, or referring to classes and modules
+        that were renamed or removed since) are deleted and count as misses.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # ImportError covers ModuleNotFoundError
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return default
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores value under key atomically, then enforces the size bound."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return value
+
+    def get_or_compute(self, namespace, compute, *parts):
+        """Returns the cached artifact for (namespace, parts) or computes and stores it."""
+        key = self.make_key(namespace, *parts)
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            if self.verbose:
+                print(f"[cache] Reusing {namespace} ({key[-8:]})")
+            return value
+        return self.put(key, compute())
+
+    def invalidate(self, namespace=None):
+        """Deletes every entry, or only the entries of one namespace."""
+        removed = 0
+        for name, _, _ in self._entries():
+            if namespace is None or name.startswith(f"{namespace}-"):
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        print(f"[cache] Invalidated {removed} entries in {self.cache_dir}")
+        return removed
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((name, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for name, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass  # already evicted by a concurrent put
+            total -= size
+
+
+def cached(cache, namespace, compute, *parts):
+    """Calls compute() through cache when one is configured, directly otherwise."""
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(namespace, compute, *parts)
+
+
+_HASH_BLOCK_ROWS = 65_536
+
+
+def _update_hash(hasher, obj):
+    """Feeds a content fingerprint of obj into hasher."""
+    if isinstance(obj, np.ndarray):
+        hasher.update(f"ndarray{obj.dtype}{obj.shape}".encode())
+        if obj.flags.c_contiguous or obj.ndim == 0:
+            hasher.update(np.ascontiguousarray(obj).view(np.uint8).data)
+        else:
+            # Strided views (e.g. column slices) are hashed in row blocks, never copied whole
+            for start in range(0, len(obj), _HASH_BLOCK_ROWS):
+                hasher.update(np.ascontiguousarray(obj[start:start + _HASH_BLOCK_ROWS]).view(np.uint8).data)
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        hasher.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            _update_hash(hasher, [str(col) for col in obj.columns])
+        hasher.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().data)
+    elif hasattr(obj, 'get_params'):
+        # Unfitted estimator: identified by class and hyperparameters
+        hasher.update(type(obj).__qualname__.encode())
+        _update_hash(hasher, obj.get_params(deep=False))
+    elif isinstance(obj, dict):
+        hasher.update(b"dict")
+        for key in sorted(obj, key=str):
+            _update_hash(hasher, str(key))
+            _update_hash(hasher, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(hasher, item)
+    else:
+        hasher.update(f"{type(obj).__name__}:{obj!r}".encode())
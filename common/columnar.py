@@ -0,0 +1,183 @@
+"""
+Typed, columnar, memory-mapped CSV loading.
+
+The first load parses only the requested columns with explicit compact
+dtypes and writes each column to a .npy file (categoricals as integer codes,
+nullable integers as their values plus a missing-value mask).
+Later loads memory-map those files instead of re-parsing the CSV, as long
+as the source file and the requested schema are unchanged.
+
+Columns come back as a ColumnarTable of those raw arrays. drop_missing()
+turns it into a DataFrame whose integer columns are the memory maps
+themselves (when no row is dropped), never IntegerArrays converted back.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 2
+
+
+class ColumnarTable:
+    """
+    Columns as stored: raw value arrays (read-only memory maps by default),
+    a missing-value mask per nullable integer column and the categories of
+    categorical columns (stored as codes, -1 for missing). A column becomes
+    a pandas array (Categorical, IntegerArray) only when a caller asks for
+    it or for a DataFrame; DataFrame-only work should go through
+    drop_missing() or to_frame().
+    """
+    def __init__(self, values, masks=None, categories=None):
+        self._values = dict(values)
+        self._masks = dict(masks or {})
+        self._categories = dict(categories or {})
+        self.columns = list(self._values)
+
+    def __len__(self):
+        return len(self._values[self.columns[0]]) if self.columns else 0
+
+    def missing(self, column):
+        """Boolean array marking the rows where column has no value."""
+        values = self._values[column]
+        if column in self._masks:
+            return np.asarray(self._masks[column])
+        if column in self._categories:
+            return np.asarray(values) < 0
+        if values.dtype.kind in 'fc':
+            return np.isnan(values)
+        return np.zeros(len(values), dtype=bool)
+
+    def isna(self):
+        return pd.DataFrame({col: self.missing(col) for col in self.columns}, copy=False)
+
+    def _array(self, column, rows=None, nullable=True):
+        values = self._values[column] if rows is None else self._values[column][rows]
+        if column in self._categories:
+            return pd.Categorical.from_codes(values, categories=self._categories[column])
+        if column in self._masks and nullable:
+            mask = self._masks[column] if rows is None else self._masks[column][rows]
+            return pd.arrays.IntegerArray(np.asarray(values), np.asarray(mask))
+        return values
+
+    def __getitem__(self, column):
+        return pd.Series(self._array(column), name=column, copy=False)
+
+    def to_frame(self, rows=None, plain=()):
+        """
+        DataFrame of the columns, or of the given rows. Nullable integer
+        columns become IntegerArrays, except those in plain, which keep the
+        stored numpy values (for columns known to have no missing value).
+        """
+        return pd.DataFrame({col: self._array(col, rows, nullable=col not in plain) for col in self.columns},
+                            copy=False)
+
+    def drop_missing(self, columns=None):
+        """drop_missing() for a table: (DataFrame, number of dropped rows)."""
+        columns = self.columns if columns is None else list(columns)
+        missing = np.zeros(len(self), dtype=bool)
+        for col in columns:
+            missing |= self.missing(col)
+        n_dropped = int(missing.sum())
+        return self.to_frame(np.flatnonzero(~missing) if n_dropped else None, plain=columns), n_dropped
+
+
+def load_columnar(csv_path, dtypes, store_dir=None, mmap=True):
+    """
+    Returns a ColumnarTable with the columns of dtypes (in that order).
+
+    - dtypes: {column: dtype} with numpy dtypes, nullable integer dtypes
+      ('Int8', ...) for columns that may have missing values, or 'category'.
+    - store_dir: where the .npy columns live (default: '.columnar/<csv name>'
+      next to the CSV).
+    - mmap: memory-map the stored columns (read-only) instead of reading them.
+    """
+    if store_dir is None:
+        store_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.columnar',
+                                 os.path.splitext(os.path.basename(csv_path))[0])
+    meta = _read_meta(store_dir)
+    schema = {col: str(dtype) for col, dtype in dtypes.items()}
+    if meta is None or meta['source'] != _source_signature(csv_path) or meta['schema'] != schema:
+        df = pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes)[list(dtypes)]
+        meta = _write_store(df, store_dir, csv_path, schema)
+    return _read_store(store_dir, meta, mmap)
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _read_meta(store_dir):
+    try:
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return meta if meta.get('version') == FORMAT_VERSION else None
+
+
+def _write_store(df, store_dir, csv_path, schema):
+    """Writes one .npy per column, then the metadata file that marks the store valid."""
+    os.makedirs(store_dir, exist_ok=True)
+    meta_path = os.path.join(store_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    columns = []
+    for i, col in enumerate(df.columns):
+        entry = {'name': col, 'file': f'col_{i}.npy'}
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry['categories'] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        elif _is_nullable_integer(series.dtype):
+            entry['mask'] = f'mask_{i}.npy'
+            np.save(os.path.join(store_dir, entry['mask']), series.isna().to_numpy())
+            values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(store_dir, entry['file']), values)
+        columns.append(entry)
+    meta = {'version': FORMAT_VERSION, 'source': _source_signature(csv_path),
+            'schema': schema, 'columns': columns, 'n_rows': len(df)}
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def _read_store(store_dir, meta, mmap):
+    mmap_mode = 'r' if mmap else None
+    values, masks, categories = {}, {}, {}
+    for entry in meta['columns']:
+        name = entry['name']
+        values[name] = np.load(os.path.join(store_dir, entry['file']), mmap_mode=mmap_mode)
+        if 'categories' in entry:
+            categories[name] = entry['categories']
+        elif 'mask' in entry:
+            masks[name] = np.load(os.path.join(store_dir, entry['mask']), mmap_mode=mmap_mode)
+    return ColumnarTable(values, masks, categories)
+
+
+def drop_missing(df, columns=None):
+    """
+    Drops the rows with a missing value in columns (all by default) and
+    turns their nullable integer columns into the plain numpy dtype, once
+    no value can be missing. df is a DataFrame or a ColumnarTable (whose
+    integer columns then never pass through IntegerArray). Returns
+    (DataFrame, number of dropped rows).
+    """
+    if isinstance(df, ColumnarTable):
+        return df.drop_missing(columns)
+    columns = list(df.columns) if columns is None else list(columns)
+    missing = df[columns].isna().any(axis=1).to_numpy()
+    n_dropped = int(missing.sum())
+    if n_dropped:
+        df = df.loc[~missing].reset_index(drop=True)
+    compact = {col: df[col].dtype.numpy_dtype for col in columns if _is_nullable_integer(df[col].dtype)}
+    return (df.astype(compact) if compact else df), n_dropped
+
+
+def _is_nullable_integer(dtype):
+    return isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype)
@@ -0,0 +1,277 @@
+"""
+Dependency-aware phase scheduler for the entry points.
+
+Each pipeline phase is declared as a node with named inputs and outputs.
+PhaseGraph.run() starts every node as soon as its inputs exist, on a
+thread pool, so independent phases (e.g. DBSCAN, PCA and t-SNE, which only
+need X_scaled) overlap; the heavy NumPy/scikit-learn kernels release the
+GIL and figures already render in their own processes.
+
+Nodes marked cache=True are skipped when the ArtifactCache already holds
+their outputs. Their keys are chained from the keys of their inputs
+(node name, version and input keys, down to the initial values), so a
+changed dataset stamp or setting invalidates exactly the nodes downstream
+of it, without hashing intermediate arrays.
+
+Everything a node prints is buffered and written out in declaration
+order once the node and all nodes declared before it are done, so
+concurrent nodes never interleave their output. A node's title (e.g. a
+"[PHASE N]" banner) heads its output, also when it is skipped as cached.
+
+After a run, report() prints each node's status and timing together with
+the critical path: the chain of dependent nodes that bounds the wall time
+no matter how many workers run.
+"""
+
+import io
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from common.cache import ArtifactCache
+from common.profiling import trace_span
+
+
+class Phase:
+    """
+    One node of a PhaseGraph. fn is called with the values of inputs
+    (positionally) and returns the single output, a tuple matching outputs,
+    or nothing when outputs is empty (reporting and plotting nodes). title,
+    if any, is printed before the node's output.
+    """
+    def __init__(self, name, fn, inputs=(), outputs=(), cache=False, version=0, title=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.cache = cache
+        self.version = version
+        self.title = title
+
+    def __call__(self, *args):
+        with trace_span(f"phase.{self.name}"):
+            result = self.fn(*args)
+        if not self.outputs:
+            return {}
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: result}
+        return dict(zip(self.outputs, result))
+
+
+class PhaseGraph:
+    """
+    Runs Phases in dependency order, independent ones concurrently on up to
+    max_workers threads (1 runs them one at a time, in declaration order).
+    """
+    def __init__(self, max_workers=4, cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.phases = {}
+        self.records = {}
+        self.wall_s = 0.0
+        self._producers = {}
+
+    def add(self, name, fn, inputs=(), outputs=(), cache=False, version=0, title=None):
+        """Declares a node; outputs must not be produced by any other node."""
+        if name in self.phases:
+            raise ValueError(f"Phase '{name}' is already declared")
+        for output in outputs:
+            if output in self._producers:
+                raise ValueError(f"'{output}' is already produced by phase '{self._producers[output]}'")
+            self._producers[output] = name
+        self.phases[name] = Phase(name, fn, inputs, outputs, cache, version, title)
+        return self.phases[name]
+
+    def _key(self, value_name, values, keys, initial_keys):
+        """Chained cache key of a value: initial values are hashed, outputs derive from their node."""
+        if value_name not in keys:
+            if value_name in self._producers:
+                phase = self.phases[self._producers[value_name]]
+                keys[value_name] = f"{self._node_key(phase, values, keys, initial_keys)}-{value_name}"
+            else:
+                stand_in = initial_keys.get(value_name, values[value_name])
+                keys[value_name] = ArtifactCache.make_key('input', stand_in)
+        return keys[value_name]
+
+    def _node_key(self, phase, values, keys, initial_keys):
+        return ArtifactCache.make_key(
+            f"phase-{phase.name}", phase.version,
+            [self._key(name, values, keys, initial_keys) for name in phase.inputs]
+        )
+
+    def run(self, values, keys=None):
+        """
+        Runs every node reachable from the initial values and returns all
+        values. keys optionally gives stand-ins to hash instead of an initial
+        value (e.g. a file's size and mtime instead of its path).
+        """
+        values = dict(values)
+        for phase in self.phases.values():
+            missing = [name for name in phase.inputs if name not in values and name not in self._producers]
+            if missing:
+                raise ValueError(f"Phase '{phase.name}' needs {missing}, which no phase produces")
+        initial_keys = dict(keys or {})
+        keys = {}
+        pending = dict(self.phases)
+        running = {}
+        self.records = {}
+        error = None
+        start = time.perf_counter()
+        lock = threading.Lock()
+        stdout = sys.stdout
+        self._output = _NodeOutput(stdout)
+        self._texts = {}
+        order = list(self.phases)
+        flushed = 0
+
+        def flush_ready(final=False):
+            # Writes buffered output in declaration order, up to the first unfinished node
+            nonlocal flushed
+            while flushed < len(order) and (final or order[flushed] in self._texts):
+                stdout.write(self._texts.pop(order[flushed], ''))
+                flushed += 1
+            stdout.flush()
+
+        def submit_ready(pool):
+            progressed = True
+            while progressed and error is None:
+                progressed = False
+                for name, phase in list(pending.items()):
+                    if not all(value_name in values for value_name in phase.inputs):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    if self._load_cached(phase, values, keys, initial_keys, start):
+                        continue
+                    args = [values[value_name] for value_name in phase.inputs]
+                    running[pool.submit(self._timed, phase, args, start, lock)] = phase
+
+        sys.stdout = self._output
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                submit_ready(pool)
+                flush_ready()
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        phase = running.pop(future)
+                        try:
+                            outputs = future.result()
+                        except BaseException as e:
+                            error = error or e
+                            continue
+                        values.update(outputs)
+                        if phase.cache and self.cache is not None:
+                            self.cache.put(self._node_key(phase, values, keys, initial_keys), outputs)
+                    submit_ready(pool)
+                    flush_ready()
+        finally:
+            sys.stdout = stdout
+            flush_ready(final=True)
+
+        self.wall_s = time.perf_counter() - start
+        for name in pending:
+            self.records[name] = {'status': 'skipped', 'start_s': None, 'seconds': 0.0}
+        if error is not None:
+            raise error
+        return values
+
+    def _load_cached(self, phase, values, keys, initial_keys, start):
+        """Fills in a cacheable node's outputs from the cache; returns True on a hit."""
+        if not phase.cache or self.cache is None:
+            return False
+        missing = object()
+        outputs = self.cache.get(self._node_key(phase, values, keys, initial_keys), missing)
+        if outputs is missing:
+            return False
+        values.update(outputs)
+        self._texts[phase.name] = (f"\n{phase.title}\n" if phase.title else '') \
+            + f"[cache] Reusing outputs of phase '{phase.name}'\n"
+        self.records[phase.name] = {'status': 'cached', 'start_s': time.perf_counter() - start,
+                                    'seconds': 0.0}
+        return True
+
+    def _timed(self, phase, args, start, lock):
+        started = time.perf_counter()
+        status = 'failed'
+        buffer = self._output.capture()
+        if phase.title:
+            print(f"\n{phase.title}")
+        try:
+            outputs = phase(*args)
+            status = 'ran'
+            return outputs
+        finally:
+            self._output.release()
+            with lock:
+                self._texts[phase.name] = buffer.getvalue()
+                self.records[phase.name] = {'status': status, 'start_s': started - start,
+                                            'seconds': time.perf_counter() - started}
+
+    def critical_path(self):
+        """(seconds, [node names]) of the longest chain of dependent nodes in the last run."""
+        finish, via = {}, {}
+
+        def visit(name):
+            if name not in finish:
+                phase = self.phases[name]
+                parents = {self._producers[value_name] for value_name in phase.inputs
+                           if value_name in self._producers}
+                best = max(parents, key=visit, default=None)
+                seconds = self.records.get(name, {}).get('seconds', 0.0)
+                finish[name] = seconds + (finish[best] if best is not None else 0.0)
+                via[name] = best
+            return finish[name]
+
+        for name in self.phases:
+            visit(name)
+        if not finish:
+            return 0.0, []
+        node = max(finish, key=finish.get)
+        total, path = finish[node], []
+        while node is not None:
+            path.append(node)
+            node = via[node]
+        return total, path[::-1]
+
+    def report(self):
+        """Prints per-node status and timing, then the critical path; returns the records."""
+        print(f"\n{'Phase':28s} {'status':>8s} {'start (s)':>10s} {'time (s)':>9s}")
+        for name in self.phases:
+            record = self.records.get(name, {'status': 'skipped', 'start_s': None, 'seconds': 0.0})
+            start = '-' if record['start_s'] is None else f"{record['start_s']:.2f}"
+            print(f"{name:28s} {record['status']:>8s} {start:>10s} {record['seconds']:9.2f}")
+        busy = sum(record['seconds'] for record in self.records.values())
+        critical_s, path = self.critical_path()
+        print(f"Wall {self.wall_s:.2f}s | phases {busy:.2f}s | critical path {critical_s:.2f}s: "
+              f"{' -> '.join(path)}")
+        return self.records
+
+
+class _NodeOutput:
+    """
+    Stands in for sys.stdout during a run: writes from a thread running a
+    node go to that node's buffer, all other writes to the real stream.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def release(self):
+        self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
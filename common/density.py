@@ -0,0 +1,194 @@
+"""
+Large-data rendering helpers.
+
+Above a point budget, plots draw a stratified subsample of the rows over a
+density layer binned from every row, and regression lines are drawn from
+full-data summary statistics. The heavy work is O(n) NumPy binning in the
+calling process; render jobs only receive fixed-size grids and samples, so
+their time stays roughly constant as n grows.
+"""
+
+import numpy as np
+
+from common.lazy import lazy_import
+
+matplotlib = lazy_import('matplotlib')
+mpl_colors = lazy_import('matplotlib.colors')
+mpl_figure = lazy_import('matplotlib.figure')
+
+
+def stratified_sample(n_rows, max_points, strata=None, seed=0):
+    """
+    Sorted indices of about max_points rows (all rows if n_rows fits).
+    With strata (cluster or class labels) every stratum keeps its share of
+    the sample, and at least one row, so small clusters stay visible.
+    """
+    if n_rows <= max_points:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return np.sort(rng.choice(n_rows, max_points, replace=False))
+
+    _, inverse, counts = np.unique(np.asarray(strata), return_inverse=True, return_counts=True)
+    quotas = np.maximum(1, (counts * max_points) // n_rows)
+    order = np.argsort(inverse.ravel(), kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    picks = [order[start + rng.choice(count, quota, replace=False)]
+             for start, count, quota in zip(starts, counts, quotas)]
+    return np.sort(np.concatenate(picks))
+
+
+def _finite_extent(values):
+    values = values[np.isfinite(values)]
+    low, high = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+    return (low, high) if high > low else (low - 0.5, high + 0.5)
+
+
+def density_grid(x, y, bins=200, extent=None):
+    """
+    Counts of all (x, y) rows on a bins x bins grid, via index arithmetic and
+    np.bincount. Returns {'counts' (rows = y bins), 'x_edges', 'y_edges', 'n'}.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if extent is None:
+        extent = (_finite_extent(x), _finite_extent(y))
+    (x_min, x_max), (y_min, y_max) = extent
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    ix = np.clip(((x - x_min) * (bins / (x_max - x_min))).astype(np.int64), 0, bins - 1)
+    iy = np.clip(((y - y_min) * (bins / (y_max - y_min))).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(iy * bins + ix, minlength=bins * bins).reshape(bins, bins)
+    return {
+        'counts': counts,
+        'x_edges': np.linspace(x_min, x_max, bins + 1),
+        'y_edges': np.linspace(y_min, y_max, bins + 1),
+        'n': len(x)
+    }
+
+
+def linear_fit_summary(x, y):
+    """
+    Least-squares line of y on x from the full data's sufficient statistics
+    (n, means, centered sums of squares). Enough to draw the line and its
+    95% confidence band without keeping the rows.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(x)
+    x_mean, y_mean = x.mean(), y.mean()
+    dx, dy = x - x_mean, y - y_mean
+    sxx, sxy, syy = dx @ dx, dx @ dy, dy @ dy
+    slope = sxy / sxx if sxx > 0 else 0.0
+    residual_var = max(syy - slope * sxy, 0.0) / max(n - 2, 1)
+    return {
+        'n': n, 'x_mean': x_mean, 'y_mean': y_mean, 'sxx': sxx,
+        'slope': slope, 'intercept': y_mean - slope * x_mean,
+        'r': sxy / np.sqrt(sxx * syy) if sxx > 0 and syy > 0 else 0.0,
+        'residual_var': residual_var,
+        'x_range': (float(x.min()), float(x.max()))
+    }
+
+
+def draw_density(ax, grid, cmap='Greys', label='Filas por celda', colorbar=True):
+    """Draws a density grid as a log-scaled mesh (empty cells transparent)."""
+    counts = np.ma.masked_equal(grid['counts'], 0)
+    mesh = ax.pcolormesh(grid['x_edges'], grid['y_edges'], counts, cmap=cmap,
+                         norm=mpl_colors.LogNorm(vmin=1, vmax=max(int(counts.max() or 1), 2)),
+                         shading='flat', rasterized=True)
+    if colorbar:
+        ax.figure.colorbar(mesh, ax=ax, label=label)
+    return mesh
+
+
+def draw_regression(ax, fit, color='red', z=1.96, n_points=100):
+    """Draws a fitted line and its confidence band from linear_fit_summary()."""
+    xs = np.linspace(*fit['x_range'], n_points)
+    ys = fit['intercept'] + fit['slope'] * xs
+    se = np.sqrt(fit['residual_var'] * (1 / fit['n'] + (xs - fit['x_mean']) ** 2 / fit['sxx']))
+    ax.plot(xs, ys, color=color)
+    ax.fill_between(xs, ys - z * se, ys + z * se, color=color, alpha=0.15, linewidth=0)
+
+
+def annotate_sample(ax, shown, total):
+    """Notes on the axes how many of the rows are drawn as points."""
+    ax.text(0.01, 0.99, f"{shown:,} de {total:,} puntos (densidad: todas las filas)",
+            transform=ax.transAxes, ha='left', va='top', fontsize=8,
+            bbox={'facecolor': 'white', 'alpha': 0.7, 'edgecolor': 'none'})
+
+
+def pairplot_summary(df, columns, hue=None, max_points=20_000, bins=60):
+    """
+    Everything a density pairplot needs, computed from all rows of df:
+    per-column histograms (split by hue), per-pair density grids and a
+    hue-stratified point sample.
+    """
+    hue_values = df[hue].to_numpy() if hue is not None else None
+    levels = np.unique(hue_values) if hue is not None else [None]
+    data = {col: df[col].to_numpy(dtype=np.float64) for col in columns}
+    extents = {col: _finite_extent(values) for col, values in data.items()}
+
+    histograms = {}
+    for col in columns:
+        edges = np.linspace(*extents[col], bins + 1)
+        histograms[col] = {
+            'edges': edges,
+            'counts': {level: np.histogram(data[col] if level is None else data[col][hue_values == level],
+                                           bins=edges)[0]
+                       for level in levels}
+        }
+    grids = {}
+    for i, x_col in enumerate(columns):
+        for y_col in columns[i + 1:]:
+            grids[(x_col, y_col)] = density_grid(data[x_col], data[y_col], bins=bins,
+                                                 extent=(extents[x_col], extents[y_col]))
+    idx = stratified_sample(len(df), max_points, strata=hue_values)
+    return {
+        'columns': list(columns), 'hue': hue, 'levels': list(levels), 'n': len(df),
+        'histograms': histograms, 'grids': grids,
+        'sample': {col: values[idx] for col, values in data.items()},
+        'sample_hue': hue_values[idx] if hue is not None else None
+    }
+
+
+def _transposed(grid):
+    return {'counts': grid['counts'].T, 'x_edges': grid['y_edges'],
+            'y_edges': grid['x_edges'], 'n': grid['n']}
+
+
+def render_density_pairplot(full_path, summary, title=None, palette='tab10'):
+    """Pairplot from pairplot_summary(): histograms on the diagonal, density plus sample elsewhere."""
+    columns, levels = summary['columns'], summary['levels']
+    colors = matplotlib.colormaps[palette].colors
+    k = len(columns)
+    fig = mpl_figure.Figure(figsize=(2.5 * k, 2.5 * k), layout='constrained')
+    axes = fig.subplots(k, k, squeeze=False)
+    for row, y_col in enumerate(columns):
+        for col, x_col in enumerate(columns):
+            ax = axes[row][col]
+            if row == col:
+                hist = summary['histograms'][x_col]
+                for i, level in enumerate(levels):
+                    ax.stairs(hist['counts'][level], hist['edges'], color=colors[i % len(colors)],
+                              fill=len(levels) == 1, alpha=0.6 if len(levels) == 1 else 1.0,
+                              label=None if level is None else str(level))
+            else:
+                grid = summary['grids'].get((x_col, y_col))
+                grid = grid if grid is not None else _transposed(summary['grids'][(y_col, x_col)])
+                draw_density(ax, grid, colorbar=False)
+                sample_hue = summary['sample_hue']
+                for i, level in enumerate(levels):
+                    mask = slice(None) if level is None else sample_hue == level
+                    ax.scatter(summary['sample'][x_col][mask], summary['sample'][y_col][mask],
+                               s=1, alpha=0.25, color=colors[i % len(colors)], rasterized=True)
+            if row == k - 1:
+                ax.set_xlabel(x_col)
+            if col == 0:
+                ax.set_ylabel(y_col)
+    if summary['hue'] is not None:
+        handles, labels = axes[0][0].get_legend_handles_labels()
+        fig.legend(handles, labels, title=summary['hue'], loc='outside right center')
+    shown = len(next(iter(summary['sample'].values()))) if summary['sample'] else 0
+    fig.suptitle((title + '\n' if title else '') +
+                 f"{shown:,} de {summary['n']:,} puntos; histogramas y densidad con todas las filas")
+    fig.savefig(full_path, dpi=150, bbox_inches='tight')
+    print(f"Saved density pairplot to {full_path}")
@@ -0,0 +1,88 @@
+"""
+Headless figure pipeline: plot jobs are rendered with the Agg backend in a
+process pool while the pipeline keeps computing, and join() collects a
+per-plot timing and failure report at the end.
+"""
+
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from common.lazy import imports
+from common.shared import worker_context
+
+
+def _init_worker():
+    with imports('matplotlib'):
+        import matplotlib
+    matplotlib.use('Agg')
+
+
+def _run_job(render, args, kwargs):
+    """Runs one render function; never raises, so failures reach the report."""
+    start = time.perf_counter()
+    try:
+        render(*args, **kwargs)
+    except Exception:
+        return time.perf_counter() - start, traceback.format_exc()
+    return time.perf_counter() - start, None
+
+
+class FigureJobPool:
+    """
+    Renders figure jobs in worker processes (max_workers > 0) or inline in
+    the calling process (max_workers=0). Either way every job is timed and
+    its error, if any, is kept for the final report instead of being lost.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        if max_workers != 0:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context(),
+                                                 initializer=_init_worker)
+        else:
+            _init_worker()
+        self._jobs = []
+        # Inline jobs may be submitted from concurrent phases; pyplot-based
+        # renders (seaborn grids) are not thread-safe, so they run one at a time
+        self._inline_lock = threading.Lock()
+
+    def submit(self, name, render, *args, **kwargs):
+        """Queues render(*args, **kwargs) under a report name."""
+        submitted = time.perf_counter()
+        if self._executor is None:
+            with self._inline_lock:
+                self._jobs.append((name, submitted, _run_job(render, args, kwargs)))
+        else:
+            self._jobs.append((name, submitted, self._executor.submit(_run_job, render, args, kwargs)))
+
+    def join(self, verbose=True):
+        """Waits for every queued job and returns the report (one dict per plot)."""
+        report = []
+        for name, submitted, job in self._jobs:
+            try:
+                seconds, error = job.result() if hasattr(job, 'result') else job
+            except Exception:
+                # The job could not even be pickled or the worker died
+                seconds, error = time.perf_counter() - submitted, traceback.format_exc()
+            report.append({'plot': name, 'seconds': seconds,
+                           'status': 'ok' if error is None else 'failed', 'error': error})
+        self._jobs = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if verbose:
+            print_report(report)
+        return report
+
+
+def print_report(report):
+    """Prints per-plot render times followed by the traceback of every failure."""
+    print(f"\n{'Plot':55s} {'status':>7s} {'time (s)':>9s}")
+    for entry in report:
+        print(f"{entry['plot']:55s} {entry['status']:>7s} {entry['seconds']:9.2f}")
+    failures = [entry for entry in report if entry['error'] is not None]
+    for entry in failures:
+        print(f"\nPlot '{entry['plot']}' failed:\n{entry['error']}")
+    print(f"{len(report) - len(failures)}/{len(report)} plots rendered successfully.")
@@ -0,0 +1,119 @@
+"""
+Deferred imports and import-time accounting for the CLI entry points.
+
+Entry points import only argparse and this module up front; each subcommand
+imports what it needs inside an imports() block, and modules whose heavy
+dependencies are used by a few functions only (plotting libraries, mostly)
+bind them with lazy_import(), which imports on first attribute access.
+Both record how long the import took, net of nested timed imports, and
+which top-level packages it pulled in, so report_imports() can show what a
+short batch job paid before doing any work.
+"""
+
+import importlib
+import os
+import sys
+import sysconfig
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+_STARTED = time.perf_counter()
+_records = []  # (label, seconds, new top-level packages)
+_local = threading.local()
+_STDLIB_DIR = os.path.realpath(sysconfig.get_paths()['stdlib'])
+
+
+def _is_stdlib(name):
+    """True for standard-library modules (sys.stdlib_module_names only exists on 3.10+)."""
+    stdlib_names = getattr(sys, 'stdlib_module_names', None)
+    if stdlib_names is not None:
+        return name in stdlib_names
+    if name in sys.builtin_module_names:
+        return True
+    path = getattr(sys.modules.get(name), '__file__', None)
+    path = path and os.path.realpath(path)
+    return (path is not None and path.startswith(_STDLIB_DIR)
+            and 'site-packages' not in path and 'dist-packages' not in path)
+
+
+def _top_level_packages():
+    """Imported third-party and project top-level packages (stdlib and private ones left out)."""
+    names = {name.partition('.')[0] for name in list(sys.modules)}
+    return {name for name in names if not name.startswith('_') and not _is_stdlib(name)}
+
+
+@contextmanager
+def imports(label):
+    """Times the imports in the block and records them under label."""
+    stack = _local.__dict__.setdefault('stack', [])
+    before = _top_level_packages()
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        new = sorted(_top_level_packages() - before)
+        _records.append((label, elapsed - nested, new))
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            if self.__name__ in sys.modules:
+                module = sys.modules[self.__name__]
+            else:
+                with imports(self.__name__):
+                    module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """Returns the module if it is already imported, else a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def import_records():
+    """Recorded imports as (label, seconds, new top-level packages), in order."""
+    return list(_records)
+
+
+def report_imports(verbose=False, file=None):
+    """
+    Prints the time spent in timed imports and since the entry point started
+    (to file, stdout by default). verbose also lists every timed block with
+    the packages it loaded.
+    """
+    total = sum(seconds for _, seconds, _ in _records)
+    uptime = time.perf_counter() - _STARTED
+    heaviest = sorted(_records, key=lambda record: -record[1])[:3]
+    detail = ", ".join(f"{label} {seconds:.2f}s" for label, seconds, _ in heaviest)
+    print(f"\n[imports] {total:.2f}s of {uptime:.2f}s spent importing" + (f" ({detail})" if detail else ""),
+          file=file)
+    if verbose:
+        for label, seconds, new in _records:
+            print(f"  {label:40s} {seconds:7.3f}s  {' '.join(new)}", file=file)
+    return total
@@ -0,0 +1,265 @@
+"""
+Out-of-core, chunked preprocessing built from composable stages.
+
+A ChunkedPipeline streams a CSV twice:
+  1. fit pass: every stage is reset, then sees each chunk in order
+     (running null counts, duplicate detection, StandardScaler.partial_fit, ...);
+  2. transform pass: chunks flow through all stages and the scaled feature
+     matrix is written into a preallocated np.memmap.
+Only one chunk is held in memory at a time.
+"""
+
+import os
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+
+class Stage:
+    """Base stage: DataFrame chunk in, DataFrame chunk out."""
+
+    def reset(self):
+        """Forgets what earlier fit passes learned; called before each one."""
+
+    def partial_fit(self, chunk):
+        """
+        Updates the stage's state from a chunk during the fit pass and returns
+        the chunk for downstream stages, or None when downstream stages cannot
+        see data until this stage is fully fitted.
+        """
+        return self.transform(chunk)
+
+    def transform(self, chunk):
+        return chunk
+
+    def report(self):
+        pass
+
+
+class Validate(Stage):
+    """
+    Running null counts and duplicate detection on an id column.
+    exact=True keeps every seen id in a set; otherwise a Bloom filter with
+    bounded memory gives an approximate (never under-counting) duplicate count.
+    """
+    def __init__(self, id_column=None, exact=True, expected_rows=10_000_000, error_rate=0.001):
+        self.id_column = id_column
+        self.exact = exact
+        self.expected_rows = expected_rows
+        self.error_rate = error_rate
+        self.reset()
+
+    def reset(self):
+        self.n_rows = 0
+        self.null_counts = None
+        self.duplicates = 0
+        if self.id_column is not None:
+            self._seen = set() if self.exact else _BloomFilter(self.expected_rows, self.error_rate)
+
+    def partial_fit(self, chunk):
+        nulls = chunk.isnull().sum()
+        self.null_counts = nulls if self.null_counts is None else self.null_counts.add(nulls, fill_value=0)
+        self.n_rows += len(chunk)
+        if self.id_column is not None:
+            ids = chunk[self.id_column].to_numpy()
+            unique_ids = np.unique(ids)
+            self.duplicates += len(ids) - len(unique_ids)
+            if self.exact:
+                self.duplicates += sum(1 for value in unique_ids.tolist() if value in self._seen)
+                self._seen.update(unique_ids.tolist())
+            else:
+                self.duplicates += self._seen.add(unique_ids)
+        return chunk
+
+    def report(self):
+        print("\nValidar nulos:")
+        print(self.null_counts.astype(int))
+        if self.id_column is not None:
+            mode = "exacto" if self.exact else "aproximado"
+            print("\nValidar duplicados:")
+            print(f"Duplicados por {self.id_column} ({mode}): {self.duplicates}")
+
+
+class Derive(Stage):
+    """Adds derived columns: {new column: function(chunk) -> Series}."""
+    def __init__(self, derivations):
+        self.derivations = derivations
+
+    def transform(self, chunk):
+        return chunk.assign(**{col: fn(chunk) for col, fn in self.derivations.items()})
+
+
+class Encode(Stage):
+    """Maps categorical columns to codes: {column: {value: code}}; unknown values become missing."""
+    def __init__(self, mappings, dtype='Int8'):
+        self.mappings = mappings
+        self.dtype = dtype
+
+    def transform(self, chunk):
+        return chunk.assign(**{
+            col: chunk[col].map(mapping).astype(self.dtype)
+            for col, mapping in self.mappings.items() if col in chunk.columns
+        })
+
+
+class Select(Stage):
+    """Keeps only the given columns, in order."""
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, chunk):
+        return chunk[self.columns]
+
+
+class Scale(Stage):
+    """
+    StandardScaler over the given columns, fitted with partial_fit. Missing
+    values are passed on as NaN (ignored by the fit, kept by the transform).
+    The first chunk of a fit pass refits the scaler (it may be shared with
+    the caller, so it is reset in place rather than replaced).
+    """
+    def __init__(self, columns, scaler=None):
+        self.columns = list(columns)
+        self.scaler = scaler if scaler is not None else StandardScaler()
+        self._fresh = True
+
+    def reset(self):
+        self._fresh = True
+
+    def partial_fit(self, chunk):
+        X = chunk[self.columns].to_numpy(dtype=float, na_value=np.nan)
+        if self._fresh:
+            # fit() discards statistics from earlier passes, partial_fit() accumulates
+            self.scaler.fit(X)
+            self._fresh = False
+        else:
+            self.scaler.partial_fit(X)
+        return None
+
+    def transform(self, chunk):
+        scaled = self.scaler.transform(chunk[self.columns].to_numpy(dtype=float, na_value=np.nan))
+        return chunk.assign(**dict(zip(self.columns, scaled.T)))
+
+
+def scale_in_place(df, columns, scaler, dtype=np.float32, rows=None, chunk_size=65_536):
+    """
+    In-memory counterpart of Scale for a compact dtype: copies the feature
+    columns once into a single C-contiguous buffer (rows optionally
+    reordered, e.g. into train/test split order so splits are slices),
+    fits scaler chunk by chunk and standardizes the buffer in place. No
+    float64 copy of the whole matrix is made. Any earlier fit of scaler is
+    discarded. Returns the buffer.
+    """
+    n_rows = len(df) if rows is None else len(rows)
+    X = np.empty((n_rows, len(columns)), dtype=dtype)
+    for j, column in enumerate(columns):
+        values = df[column].to_numpy()
+        X[:, j] = values if rows is None else values[rows]
+    for start in range(0, n_rows, chunk_size):
+        if start == 0:
+            scaler.fit(X[:chunk_size])
+        else:
+            scaler.partial_fit(X[start:start + chunk_size])
+    X -= scaler.mean_.astype(dtype)
+    X /= scaler.scale_.astype(dtype)
+    return X
+
+
+class ChunkedPipeline:
+    """
+    Runs stages over CSV chunks and materializes the feature columns into a
+    memmap (and the target column, if any, into a small in-memory array).
+    """
+    def __init__(self, stages, features, target=None, dtype=np.float64):
+        self.stages = stages
+        self.features = list(features)
+        self.target = target
+        self.dtype = dtype
+        self.n_rows = 0
+
+    def _chunks(self, filepath, usecols, dtypes, chunksize):
+        return pd.read_csv(filepath, usecols=usecols, dtype=dtypes, chunksize=chunksize)
+
+    def fit(self, filepath, usecols=None, dtypes=None, chunksize=100_000):
+        """Fit pass: feeds each chunk through stages until one blocks."""
+        self.n_rows = 0
+        for stage in self.stages:
+            stage.reset()
+        for chunk in self._chunks(filepath, usecols, dtypes, chunksize):
+            self.n_rows += len(chunk)
+            for stage in self.stages:
+                chunk = stage.partial_fit(chunk)
+                if chunk is None:
+                    break
+        for stage in self.stages:
+            stage.report()
+        return self
+
+    def transform(self, filepath, usecols=None, dtypes=None, chunksize=100_000, out_path=None):
+        """
+        Transform pass: writes features into a preallocated memmap; returns
+        (X, y). Without out_path the memmap lives in a temporary file that is
+        removed once X (and every view of it) is released.
+        """
+        temporary = out_path is None
+        if temporary:
+            fd, out_path = tempfile.mkstemp(suffix='.mmap')
+            os.close(fd)
+        X = np.lib.format.open_memmap(out_path, mode='w+', dtype=self.dtype,
+                                      shape=(self.n_rows, len(self.features)))
+        if temporary:
+            # Kept while mapped: worker processes may map the same file (see common.shared)
+            weakref.finalize(X._mmap, _remove_file, out_path)
+        y = None
+        row = 0
+        for chunk in self._chunks(filepath, usecols, dtypes, chunksize):
+            for stage in self.stages:
+                chunk = stage.transform(chunk)
+            stop = row + len(chunk)
+            X[row:stop] = chunk[self.features].to_numpy(dtype=self.dtype, na_value=np.nan)
+            if self.target is not None:
+                if y is None:
+                    dtype = chunk[self.target].dtype
+                    y = np.empty(self.n_rows, dtype=getattr(dtype, 'numpy_dtype', dtype))
+                y[row:stop] = chunk[self.target].to_numpy(dtype=y.dtype)
+            row = stop
+        X.flush()
+        print(f"Feature matrix shape: {X.shape} (memmap: {'temporary file' if temporary else out_path})")
+        return X, y
+
+    def fit_transform(self, filepath, usecols=None, dtypes=None, chunksize=100_000, out_path=None):
+        self.fit(filepath, usecols, dtypes, chunksize)
+        return self.transform(filepath, usecols, dtypes, chunksize, out_path)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _BloomFilter:
+    """Vectorized Bloom filter over integer ids."""
+    def __init__(self, capacity, error_rate):
+        self.n_bits = int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * np.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, ids):
+        keys = pd.util.hash_array(np.asarray(ids)).astype(np.uint64)
+        h1 = keys & np.uint64(0xFFFFFFFF)
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        seeds = np.arange(self.n_hashes, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + seeds * h2[None, :]) % np.uint64(self.n_bits)).astype(np.int64)
+
+    def add(self, ids):
+        """Adds unique ids and returns how many were (probably) already present."""
+        pos = self._positions(ids)
+        byte_idx, bit = pos >> 3, (pos & 7).astype(np.uint8)
+        present = ((self.bits[byte_idx] >> bit) & 1).all(axis=0)
+        np.bitwise_or.at(self.bits, byte_idx.ravel(), (np.uint8(1) << bit).ravel())
+        return int(present.sum())
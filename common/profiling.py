@@ -0,0 +1,256 @@
+"""
+Per-phase instrumentation for processors, engines and visualizers.
+
+Classes decorated with @instrument record one span per public method call
+(wall time, CPU time, peak traced-memory delta and input shapes) into the
+active Tracer. Nothing is recorded, and the wrappers only cost one check,
+until start_tracing() is called. Traces export as JSON lines and as a
+Chrome trace (chrome://tracing, Perfetto); selected spans can be profiled
+with cProfile.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_tracer = None
+
+
+class Tracer:
+    """
+    Collects spans. track_memory uses tracemalloc (noticeable overhead; peaks
+    are process-wide, so spans overlapping in threads share them).
+    profile is a set of span names (e.g. 'ClusteringModelEngine.run_tsne')
+    or method names ('run_tsne') to run under cProfile.
+    """
+    def __init__(self, track_memory=True, profile=()):
+        self.track_memory = track_memory
+        self.profile = set(profile)
+        self.events = []
+        self.profiles = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+
+    def _memory_stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **args):
+        stack = self._memory_stack()
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            stack.append({'start': current, 'peak': current})
+
+        profiler = None
+        short_name = name.rsplit('.', 1)[-1]
+        if (name in self.profile or short_name in self.profile) and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            wall_end, cpu_end = time.perf_counter(), time.process_time()
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                self.profiles.setdefault(name, []).append(profiler)
+            event = {
+                'name': name,
+                'start_s': wall_start - self.origin,
+                'wall_s': wall_end - wall_start,
+                'cpu_s': cpu_end - cpu_start,
+                'thread': threading.get_ident(),
+                'args': args
+            }
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                frame = stack.pop()
+                frame_peak = max(frame['peak'], peak)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], frame_peak)
+                tracemalloc.reset_peak()
+                event['peak_mem_delta_mb'] = (frame_peak - frame['start']) / 2 ** 20
+            if error is not None:
+                event['error'] = error
+            with self._lock:
+                self.events.append(event)
+
+    def export_jsonl(self, path):
+        """Writes one JSON object per span."""
+        with open(path, 'w') as f:
+            for event in sorted(self.events, key=lambda e: e['start_s']):
+                f.write(json.dumps(event, default=str) + '\n')
+        print(f"Saved trace ({len(self.events)} spans) to {path}")
+
+    def export_chrome_trace(self, path):
+        """Writes complete ('X') events in the Chrome trace event format."""
+        pid = os.getpid()
+        trace_events = [{
+            'name': event['name'],
+            'cat': event['name'].split('.', 1)[0],
+            'ph': 'X',
+            'ts': event['start_s'] * 1e6,
+            'dur': event['wall_s'] * 1e6,
+            'pid': pid,
+            'tid': event['thread'],
+            'args': {k: v for k, v in event.items() if k not in ('name', 'start_s', 'thread')}
+        } for event in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, default=str)
+        print(f"Saved Chrome trace to {path}")
+
+    def export_profiles(self, output_dir, top=25):
+        """Dumps one .prof file per profiled span and prints the top functions."""
+        os.makedirs(output_dir, exist_ok=True)
+        for name, profilers in self.profiles.items():
+            stats = pstats.Stats(*profilers)
+            stats.dump_stats(os.path.join(output_dir, f"{name}.prof"))
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(top)
+            print(f"\n[profile] {name}\n{out.getvalue()}")
+
+    def summary(self):
+        """Prints total wall/CPU time per span name, slowest first."""
+        totals = {}
+        for event in self.events:
+            entry = totals.setdefault(event['name'], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event['wall_s']
+            entry[2] += event['cpu_s']
+        print(f"\n{'Span':55s} {'calls':>5s} {'wall (s)':>9s} {'cpu (s)':>9s}")
+        for name, (calls, wall, cpu) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"{name:55s} {calls:5d} {wall:9.3f} {cpu:9.3f}")
+
+
+def start_tracing(track_memory=True, profile=()):
+    """Installs and returns a new global Tracer."""
+    global _tracer
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _tracer = Tracer(track_memory=track_memory, profile=profile)
+    return _tracer
+
+
+def stop_tracing():
+    """Removes the global Tracer and returns it."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and tracer.track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+@contextmanager
+def trace_span(name, **args):
+    """Records a span on the active tracer; a no-op when tracing is off."""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.span(name, **args):
+        yield
+
+
+def add_tracing_arguments(parser):
+    """Adds the --trace/--chrome-trace/--profile options to an entry point's parser."""
+    parser.add_argument('--trace', default=None, metavar='PATH',
+                        help="Record per-method spans and write them as JSON lines")
+    parser.add_argument('--chrome-trace', default=None, metavar='PATH',
+                        help="Also write the spans as a Chrome trace file")
+    parser.add_argument('--profile', nargs='*', default=[], metavar='METHOD',
+                        help="Run these methods (e.g. run_tsne) under cProfile")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Where cProfile .prof files are written")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="Skip tracemalloc peak-memory tracking (lower overhead)")
+
+
+def start_tracing_from_args(args):
+    """Starts tracing if any tracing option was given; returns the tracer or None."""
+    if not (args.trace or args.chrome_trace or args.profile):
+        return None
+    return start_tracing(track_memory=not args.no_trace_memory, profile=args.profile)
+
+
+def finish_tracing_from_args(args):
+    """Stops tracing and writes the requested exports."""
+    tracer = stop_tracing()
+    if tracer is None:
+        return None
+    tracer.summary()
+    if args.trace:
+        tracer.export_jsonl(args.trace)
+    if args.chrome_trace:
+        tracer.export_chrome_trace(args.chrome_trace)
+    if tracer.profiles:
+        tracer.export_profiles(args.profile_dir)
+    return tracer
+
+
+def _describe(value):
+    """Shape (or length) of array-like inputs, for span args."""
+    shape = getattr(value, 'shape', None)
+    if shape is not None:
+        return list(shape)
+    if isinstance(value, (list, tuple, range)):
+        return [len(value)]
+    return None
+
+
+def _wrap(func, span_name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _tracer is None:
+            return func(*args, **kwargs)
+        shapes = {}
+        for i, value in enumerate(args):
+            shape = _describe(value)
+            if shape is not None:
+                shapes[f"arg{i}"] = shape
+        for key, value in kwargs.items():
+            shape = _describe(value)
+            if shape is not None:
+                shapes[key] = shape
+        with _tracer.span(span_name, input_shapes=shapes):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument(cls):
+    """Class decorator: wraps every public method (including static ones) in a span."""
+    for attr_name, attr in list(vars(cls).items()):
+        if attr_name.startswith('_'):
+            continue
+        span_name = f"{cls.__name__}.{attr_name}"
+        if isinstance(attr, staticmethod):
+            setattr(cls, attr_name, staticmethod(_wrap(attr.__func__, span_name)))
+        elif isinstance(attr, classmethod):
+            setattr(cls, attr_name, classmethod(_wrap(attr.__func__, span_name)))
+        elif callable(attr):
+            setattr(cls, attr_name, _wrap(attr, span_name))
+    return cls
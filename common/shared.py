@@ -0,0 +1,134 @@
+"""
+Zero-copy array sharing for process pools.
+
+Arguments sent to a ProcessPoolExecutor are pickled once per task, so a
+feature matrix passed to every (model, fold) task is copied into every
+worker over and over. SharedArrays instead publishes each array once as a
+read-only memory-mapped .npy file and hands out small picklable handles;
+workers map the file and all of them read the same pages of the OS page
+cache. Arrays that already are np.memmaps (e.g. from the chunked pipeline)
+are shared in place without writing anything.
+
+Pools are started through worker_context(), so workers never fork from the
+multi-threaded pipeline.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Per-process maps opened from handles, so a worker maps each file once
+_OPENED = {}
+
+
+class SharedArray:
+    """Picklable handle to a memory-mapped array; open() maps it read-only."""
+    __slots__ = ('filename', 'dtype', 'shape', 'offset', 'order')
+
+    def __init__(self, filename, dtype, shape, offset=0, order='C'):
+        self.filename = filename
+        self.dtype = dtype
+        self.shape = shape
+        self.offset = offset
+        self.order = order
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def open(self):
+        key = (self.filename, self.offset)
+        if key not in _OPENED:
+            _OPENED[key] = np.memmap(self.filename, dtype=self.dtype, mode='r', offset=self.offset,
+                                     shape=self.shape, order=self.order)
+        return _OPENED[key]
+
+
+# Modules the fork server imports before forking workers ('__main__' is multiprocessing's default)
+_PRELOAD = ['__main__']
+
+
+def preload_in_workers(*modules):
+    """
+    Has the fork server import modules once, so workers start with them
+    loaded instead of each importing them (seconds for scikit-learn) before
+    running a task. Only takes effect before the first pool starts; module
+    level calls in the modules defining worker functions ensure that.
+    """
+    _PRELOAD.extend(module for module in modules if module not in _PRELOAD)
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        multiprocessing.get_context('forkserver').set_forkserver_preload(list(_PRELOAD))
+
+
+def worker_context():
+    """
+    Start-method context for process pools. Forking the (multi-threaded)
+    pipeline can copy a lock or pipe held by another phase's thread into the
+    worker (e.g. an import lock, hanging its first import); a fork server
+    forks from a clean, single-threaded process instead.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else None)
+
+
+def resolve(data):
+    """Returns the array behind a SharedArray handle, or data itself."""
+    return data.open() if isinstance(data, SharedArray) else data
+
+
+class SharedArrays:
+    """
+    Context manager that publishes arrays for worker processes. The files it
+    wrote are removed on exit; with enabled=False, publish() returns the
+    arrays unchanged (threads and serial runs already share memory).
+    """
+    def __init__(self, enabled=True, directory=None):
+        self.enabled = enabled
+        self.directory = directory
+        self._tmpdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        _OPENED.clear()
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def publish(self, array):
+        """Returns a handle to a read-only shared view of array."""
+        if not self.enabled:
+            return array
+        if _maps_whole_file(array):
+            order = 'C' if array.flags.c_contiguous else 'F'
+            return SharedArray(array.filename, array.dtype.str, array.shape, array.offset, order)
+        array = np.asarray(array)
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix='shared-', dir=self.directory)
+        path = os.path.join(self._tmpdir, f"{len(os.listdir(self._tmpdir))}.npy")
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+        out[...] = array
+        out.flush()
+        handle = SharedArray(path, array.dtype.str, array.shape, out.offset)
+        del out
+        return handle
+
+
+def _maps_whole_file(array):
+    """
+    True for a contiguous memmap spanning its whole file (views of one keep
+    the base's offset). A memmap whose file was already removed is not
+    shareable by name and gets copied like any other array.
+    """
+    if not isinstance(array, np.memmap) or array.filename is None or not os.path.exists(array.filename):
+        return False
+    if not (array.flags.c_contiguous or array.flags.f_contiguous):
+        return False
+    return os.path.getsize(array.filename) == array.offset + array.nbytes
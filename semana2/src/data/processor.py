@@ -1,24 +1,64 @@
+import os
+import pickle
+
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import check_cv, train_test_split
 from sklearn.preprocessing import StandardScaler
 
+from common.columnar import drop_missing, load_columnar
+from common.pipeline import ChunkedPipeline, Encode, Scale, Select, Validate, scale_in_place
+from common.profiling import instrument
+
+@instrument
 class SocialAdDataProcessor:
     """
     Handles loading, cleaning, and preprocessing of the Social Network Ads dataset.
+
+    With dtype=np.float32 the features live in one contiguous float32 buffer,
+    scaled in place, with rows stored in the default train/test split order:
+    the splits are then slices (views) of it, and X_scaled/y follow that
+    order rather than the CSV's (rows maps buffer rows back to CSV rows).
+    cv_splits() gives the cross-validation folds of the CSV order, so both
+    modes evaluate the same experiment.
     """
-    def __init__(self, filepath):
+    # Columns the pipeline uses, with compact (nullable) dtypes ('User ID' is never needed)
+    COLUMN_DTYPES = {
+        'Gender': 'category',
+        'Age': 'Int8',
+        'EstimatedSalary': 'Int32',
+        'Purchased': 'Int8'
+    }
+    GENDER_CODES = {'Female': 0, 'Male': 1}
+    TEST_SIZE = 0.20
+    RANDOM_STATE = 42
+
+    def __init__(self, filepath, columnar=True, dtype=np.float64):
         self.filepath = filepath
+        self.columnar = columnar
+        self.dtype = np.dtype(dtype)
+        self.split_layout = None
+        self.rows = None
         self.df = None
         self.X_train = None
         self.X_test = None
         self.y_train = None
         self.y_test = None
         self.scaler = StandardScaler()
+        self.feature_columns = None
         
     def load_data(self):
-        """Loads data from CSV."""
+        """
+        Loads the used columns from CSV with compact dtypes. With columnar=True
+        the CSV is converted once to .npy columns that later runs memory-map,
+        and df is a ColumnarTable until preprocess() turns it into a frame.
+        """
         print(f"Loading data from {self.filepath}...")
-        self.df = pd.read_csv(self.filepath)
+        if self.columnar:
+            self.df = load_columnar(self.filepath, self.COLUMN_DTYPES)
+        else:
+            self.df = pd.read_csv(self.filepath, usecols=list(self.COLUMN_DTYPES),
+                                  dtype=self.COLUMN_DTYPES)
         print("Data loaded successfully.")
         return self.df
     
@@ -29,31 +69,150 @@ class SocialAdDataProcessor:
         if self.df is None:
             raise ValueError("Data not loaded. Call load_data() first.")
             
+        if 'Gender' in self.df.columns:
+            self.feature_columns = ['Gender', 'Age', 'EstimatedSalary']
+        else:
+            self.feature_columns = ['Age', 'EstimatedSalary']
+
+        # Rows with missing values are dropped; the rest get plain compact dtypes
+        # (a columnar table becomes a frame here, its integer columns still memory-mapped)
+        self.df, dropped = drop_missing(self.df, self.feature_columns + ['Purchased'])
+
         # 1. Drop unnecessary columns
         if 'User ID' in self.df.columns:
             self.df = self.df.drop('User ID', axis=1)
             
-        # 2. Encode Gender if present
+        # 2. Encode Gender if present (rows with unknown values are dropped too)
         if 'Gender' in self.df.columns:
-            self.df['Gender'] = self.df['Gender'].map({'Female': 0, 'Male': 1})
-            self.X = self.df[['Gender', 'Age', 'EstimatedSalary']]
-        else:
-            self.X = self.df[['Age', 'EstimatedSalary']]
-            
-        self.y = self.df['Purchased']
-        
+            self.df['Gender'] = self.df['Gender'].map(self.GENDER_CODES).astype('Int8')
+            self.df, unknown = drop_missing(self.df, ['Gender'])
+            dropped += unknown
+        if dropped:
+            print(f"Dropped {dropped} rows with missing values.")
+
         # 3. Scale features
         print("Scaling features...")
-        self.X_scaled = self.scaler.fit_transform(self.X)
+        if self.dtype == np.float64:
+            self.X = self.df[self.feature_columns]
+            self.y = self.df['Purchased']
+            self.X_scaled = self.scaler.fit_transform(self.X)
+        else:
+            # No intermediate frame; rows laid out as [train | test] for get_data_splits()
+            train, test = train_test_split(np.arange(len(self.df)), test_size=self.TEST_SIZE,
+                                           random_state=self.RANDOM_STATE)
+            self.rows = np.concatenate([train, test])
+            self.X = None
+            self.X_scaled = scale_in_place(self.df, self.feature_columns, self.scaler, self.dtype, self.rows)
+            self.y = pd.Series(self.df['Purchased'].to_numpy()[self.rows], name='Purchased')
+            self.split_layout = (self.TEST_SIZE, self.RANDOM_STATE, len(train))
         
-    def get_data_splits(self, test_size=0.20, random_state=42):
+    def preprocess_chunked(self, chunksize=100_000, out_path=None):
         """
-        Splits data into training and testing sets.
+        Out-of-core variant of preprocess(): streams the CSV through
+        validate -> encode -> select -> scale stages and writes the scaled
+        features to a memmap of the processor's dtype. The target is kept as
+        a compact in-memory array.
         """
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X_scaled, self.y, test_size=test_size, random_state=random_state
+        header = pd.read_csv(self.filepath, nrows=0).columns
+        features = ['Gender', 'Age', 'EstimatedSalary'] if 'Gender' in header else ['Age', 'EstimatedSalary']
+        usecols = features + ['Purchased']
+        pipeline = ChunkedPipeline(
+            stages=[
+                Validate(),
+                Encode({'Gender': self.GENDER_CODES}),
+                Select(usecols),
+                Scale(features, scaler=self.scaler)
+            ],
+            features=features,
+            target='Purchased',
+            dtype=self.dtype
         )
+        print("Scaling features (chunked)...")
+        self.X_scaled, y = pipeline.fit_transform(
+            self.filepath, usecols=usecols,
+            dtypes={col: self.COLUMN_DTYPES[col] for col in usecols},
+            chunksize=chunksize, out_path=out_path
+        )
+        self.y = pd.Series(y, name='Purchased')
+        self.feature_columns = features
+        return self.X_scaled, self.y
+        
+    def get_data_splits(self, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+        """
+        Splits data into training and testing sets (views of X_scaled when
+        its rows are already laid out for this split).
+        """
+        if self.split_layout is not None and self.split_layout[:2] == (test_size, random_state):
+            n_train = self.split_layout[2]
+            self.X_train, self.X_test = self.X_scaled[:n_train], self.X_scaled[n_train:]
+            self.y_train, self.y_test = self.y.iloc[:n_train], self.y.iloc[n_train:]
+        else:
+            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                self.X_scaled, self.y, test_size=test_size, random_state=random_state
+            )
         print(f"Training set size: {self.X_train.shape}")
         print(f"Test set size: {self.X_test.shape}")
         
         return self.X_train, self.X_test, self.y_train, self.y_test
+
+    def cv_splits(self, cv=5):
+        """
+        Cross-validation folds for X_scaled/y: cv itself when rows are in CSV
+        order, otherwise the folds cv builds on the CSV order, mapped to the
+        buffer's row positions (keeping each fold's CSV row order).
+        """
+        if self.rows is None:
+            return cv
+        y = self.y.to_numpy()
+        y_csv = np.empty_like(y)
+        y_csv[self.rows] = y
+        position = np.empty(len(self.rows), dtype=np.intp)
+        position[self.rows] = np.arange(len(self.rows))
+        splitter = check_cv(cv, y_csv, classifier=True)
+        return [(position[train], position[test])
+                for train, test in splitter.split(np.zeros((len(y_csv), 1)), y_csv)]
+
+    def iter_batches(self, filepath=None, chunksize=50_000, skip_rows=0):
+        """
+        Streams a CSV with this dataset's schema (by default the processor's
+        own file, e.g. a day of new rows otherwise) and yields encoded,
+        unscaled feature frames with their targets, chunk by chunk, starting
+        after the first skip_rows data rows.
+        """
+        filepath = filepath or self.filepath
+        header = pd.read_csv(filepath, nrows=0).columns
+        usecols = [col for col in self.COLUMN_DTYPES if col in header]
+        for chunk in pd.read_csv(filepath, usecols=usecols, chunksize=chunksize,
+                                 skiprows=range(1, skip_rows + 1),
+                                 dtype={col: self.COLUMN_DTYPES[col] for col in usecols}):
+            if 'Gender' in chunk.columns:
+                chunk['Gender'] = chunk['Gender'].map(self.GENDER_CODES).astype('Int8')
+            features = [col for col in ('Gender', 'Age', 'EstimatedSalary') if col in chunk.columns]
+            chunk, _ = drop_missing(chunk, features + ['Purchased'])
+            if self.feature_columns is None:
+                self.feature_columns = features
+            elif features != self.feature_columns:
+                raise ValueError(f"Batch columns {features} do not match {self.feature_columns}.")
+            yield chunk[features], chunk['Purchased'].to_numpy()
+
+    def partial_fit_scaler(self, X_batch):
+        """
+        Updates the scaler's running mean/variance with one batch (instead
+        of refitting on the whole table) and returns the batch scaled with
+        the updated statistics.
+        """
+        self.scaler.partial_fit(X_batch)
+        return self.scaler.transform(X_batch)
+
+    def save_scaler(self, path):
+        """Persists the fitted scaler with its feature order and encodings for scoring."""
+        if self.feature_columns is None:
+            raise ValueError("Data not preprocessed. Call preprocess() first.")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'scaler': self.scaler,
+                'features': self.feature_columns,
+                'encodings': {'Gender': self.GENDER_CODES}
+            }, f)
+        print(f"Saved scaler to {path}")
@@ -2,81 +2,258 @@
 """
 Main entry point for Supervised Learning Models Analysis.
 Refactored into Modular + OOP Architecture.
+
+Each phase is a node of a PhaseGraph with explicit inputs and outputs, so
+independent phases (EDA plots, training, cross-validation and the 2D
+models all need only the processed data) run concurrently, cached ones
+are skipped, and the critical path is reported at the end.
+
+Subcommands run only the phases they need and import their dependencies
+on first use, so e.g. `train` never loads the plotting stack:
+  load   read, encode and scale the dataset, and report the splits
+  train  load + train, evaluate, save artifacts and cross-validate
+  plot   load + (cached) training + every figure
+  score  score new rows with saved artifacts (options as in score.py)
+  all    every phase (default)
 """
 
+import argparse
 import os
 import sys
 
 # Ensure src is in the python path to find modules if run from root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from semana2.src.data.processor import SocialAdDataProcessor
-from semana2.src.models.engine import SupervisedModelEngine
-from semana2.src.utils.visualizer import ResultsVisualizer
+from common.lazy import imports, report_imports
+from common.profiling import (add_tracing_arguments, finish_tracing_from_args,
+                              start_tracing_from_args)
+
+COMMANDS = ('all', 'load', 'train', 'plot', 'score')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Supervised learning models analysis.")
+    parser.add_argument('command', nargs='?', default='all', choices=COMMANDS,
+                        help="Phases to run (default: all)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Artifact cache directory (default: <project>/.cache)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Retrain everything without reading or writing the cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Invalidate all cached artifacts before running")
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help="Parallel model fits, CV folds and search candidates (-1 = all cores)")
+    parser.add_argument('--backend', choices=('thread', 'process'), default='thread',
+                        help="Pool for --n-jobs; 'process' shares the data with workers through memory maps")
+    parser.add_argument('--tune', action='store_true',
+                        help="Tune hyperparameters with successive halving before training")
+    parser.add_argument('--search-log', default=None,
+                        help="JSON-lines log of search evaluations, used to resume "
+                             "(default: artifacts/search_log.jsonl)")
+    parser.add_argument('--svm-approx', choices=('nystroem', 'rff'), default=None,
+                        help="Approximate the SVM's RBF kernel so it scales to millions of rows")
+    parser.add_argument('--svm-rank', type=int, default=300,
+                        help="Rank (number of features) of the kernel approximation")
+    parser.add_argument('--compare-svm', action='store_true',
+                        help="Report accuracy and speed of approximated SVMs against exact SVC")
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help="Processes rendering plots in the background (0 renders inline)")
+    parser.add_argument('--max-plot-points', type=int, default=20_000,
+                        help="Above this many rows, plots draw a stratified sample over a density layer")
+    parser.add_argument('--float32', action='store_true',
+                        help="Keep the features in one float32 buffer scaled in place (about half the memory)")
+    parser.add_argument('--chunked', type=int, default=None, metavar='CHUNKSIZE',
+                        help="Stream the CSV in chunks of this many rows into a memory-mapped feature "
+                             "matrix instead of loading the table (skips the EDA plots, which need it)")
+    parser.add_argument('--phase-workers', type=int, default=4,
+                        help="Independent phases run concurrently on this many threads (1 = in order)")
+    parser.add_argument('--import-report', action='store_true',
+                        help="List every deferred import with its time and the packages it loaded")
+    add_tracing_arguments(parser)
+    args, extra = parser.parse_known_args(argv)
+    # Anything not recognized here belongs to score.py's own parser
+    if args.command != 'score' and extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.score_args = extra
+    return args
+
+
+def score(args):
+    with imports('semana2.src.score'):
+        from semana2.src import score as score_cli
+    status = score_cli.main(score_cli.parse_args(args.score_args))
+    # Scores may be going to stdout, so the report goes to stderr
+    report_imports(args.import_report, file=sys.stderr)
+    return status
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    if args.command == 'score':
+        return score(args)
 
-def main():
     print("="*60)
     print("  SUPERVISED LEARNING MODEL ANALYSIS (MODULAR ARCHITECTURE)")
     print("="*60)
-    
+
     # --- Configuration ---
     # Determine project root (assuming src/main.py structure)
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
+
     # Define critical paths
     assets_dir = os.path.join(project_root, "assets")
+    artifacts_dir = os.path.join(project_root, "artifacts")
     dataset_path = os.path.join(project_root, "src", "data", "kaggle", "Social_Network_Ads.csv")
-    
+
     print(f"Project Root: {project_root}")
     print(f"Assets Directory: {assets_dir}")
     print(f"Dataset Path: {dataset_path}")
-    
+
+    plotting = args.command in ('all', 'plot')
+    training = args.command != 'load'
+    start_tracing_from_args(args)
+    with imports('data processing'):
+        from common.cache import ArtifactCache
+        from common.dag import PhaseGraph
+        from semana2.src.data.processor import SocialAdDataProcessor
+    cache = None
+    if not args.no_cache:
+        cache = ArtifactCache(args.cache_dir or os.path.join(project_root, ".cache"))
+        if args.clear_cache:
+            cache.invalidate()
+
     if not os.path.exists(dataset_path):
         print(f"ERROR: Dataset not found at {dataset_path}")
         return
-    
+
+    visualizer = None
+    if plotting:
+        with imports('visualization'):
+            from common.figures import FigureJobPool
+            from semana2.src.utils.visualizer import ResultsVisualizer
+        visualizer = ResultsVisualizer(output_dir=assets_dir, pool=FigureJobPool(args.plot_workers),
+                                       max_points=args.max_plot_points)
+    if training:
+        with imports('models'):
+            from semana2.src.models.engine import SupervisedModelEngine
+
+    graph = PhaseGraph(max_workers=args.phase_workers, cache=cache)
+
     # --- 1. Data Processing ---
-    print("\n[PHASE 1] Data Processing")
-    processor = SocialAdDataProcessor(dataset_path)
-    df = processor.load_data()
-    processor.preprocess()
-    X_train, X_test, y_train, y_test = processor.get_data_splits()
+    def load(path, dtype, chunksize):
+        processor = SocialAdDataProcessor(path, dtype=dtype)
+        if chunksize:
+            # Out of core: the table is never loaded, so there is no frame (df is None)
+            processor.preprocess_chunked(chunksize=chunksize)
+        else:
+            processor.load_data()
+            processor.preprocess()
+        # preprocess() may replace the frame (dropped rows, derived columns)
+        return (processor, processor.df) + tuple(processor.get_data_splits())
+
+    graph.add('load', load, ['dataset_path', 'dtype', 'chunksize'],
+              ['processor', 'df', 'X_train', 'X_test', 'y_train', 'y_test'],
+              title="[PHASE 1] Data Processing")
 
     # --- 2. Initial Visualization ---
-    print("\n[PHASE 2] Exploratory Visualization")
-    visualizer = ResultsVisualizer(output_dir=assets_dir)
-    visualizer.plot_pairplot(df)
-    visualizer.plot_correlation_matrix(df)
-    
-    # --- 3. Model Training & Evaluation ---
-    print("\n[PHASE 3] Model Training & Evaluation")
-    engine = SupervisedModelEngine()
-    results = engine.train_evaluate_all(X_train, y_train, X_test, y_test)
-    
-    # Visualize Confusion Matrices
-    for model_name, res in results.items():
-        visualizer.plot_confusion_matrix(y_test, res['predictions'], model_name)
-        
-    # --- 4. Cross-Validation Comparison ---
-    print("\n[PHASE 4] Cross-Validation Comparison")
-    cv_results = engine.run_cross_validation(processor.X_scaled, processor.y)
-    visualizer.plot_model_comparison(cv_results)
-    
-    # --- 5. Decision Boundaries ---
-    print("\n[PHASE 5] Decision Boundary Visualization (2D Projection)")
-    # Train simplified 2D models for visualization
-    models_2d = engine.train_2d_models_for_viz(X_train, y_train)
-    
-    # Get 2D data for plotting (Visualizer handles slicing)
-    X_vis = processor.X_scaled
-    
-    for name, model in models_2d.items():
-        visualizer.plot_decision_boundary(model, X_vis, processor.y, name)
-        
+    if plotting and args.chunked:
+        graph.add('eda_plots', lambda: print("Skipped: --chunked does not load the table"),
+                  title="[PHASE 2] Exploratory Visualization")
+    elif plotting:
+        def eda_plots(df):
+            visualizer.plot_pairplot(df)
+            visualizer.plot_correlation_matrix(df)
+
+        graph.add('eda_plots', eda_plots, ['df'], title="[PHASE 2] Exploratory Visualization")
+
+    if training:
+        # --- 3. Model Training & Evaluation ---
+        def build_engine(engine_config, X_train, y_train):
+            engine = SupervisedModelEngine(n_jobs=args.n_jobs, backend=args.backend, cache=cache,
+                                           svm_approximation=args.svm_approx, svm_rank=args.svm_rank)
+            if args.tune:
+                engine.tune_hyperparameters(
+                    X_train, y_train,
+                    log_path=args.search_log or os.path.join(artifacts_dir, "search_log.jsonl")
+                )
+            return engine
+
+        def save_artifacts(processor, engine, results):
+            # Persist scaler and models for score.py
+            processor.save_scaler(os.path.join(artifacts_dir, "scaler.pkl"))
+            engine.save_models(artifacts_dir)
+
+        def compare_svm(engine, X_train, y_train, X_test, y_test):
+            comparison = engine.compare_svm_approximation(X_train, y_train, X_test, y_test)
+            os.makedirs(artifacts_dir, exist_ok=True)
+            comparison.to_csv(os.path.join(artifacts_dir, "svm_approximation.csv"), index=False)
+            return comparison
+
+        def cross_validation(engine, processor):
+            # --- 4. Cross-Validation Comparison ---
+            return engine.run_cross_validation(processor.X_scaled, processor.y, cv=processor.cv_splits())
+
+        # The engine's models depend on these settings (and on tuning), so they key its outputs
+        graph.add('engine', build_engine, ['engine_config', 'X_train', 'y_train'], ['engine'],
+                  title="[PHASE 3] Model Training & Evaluation")
+        graph.add('train', lambda engine, *data: engine.train_evaluate_all(*data),
+                  ['engine', 'X_train', 'y_train', 'X_test', 'y_test'], ['results'])
+        # Not cached as a node: the engine caches fold scores, and fold timings are only reported when measured
+        graph.add('cross_validation', cross_validation, ['engine', 'processor'], ['cv_results'],
+                  title="[PHASE 4] Cross-Validation Comparison")
+        if args.command in ('all', 'train'):
+            graph.add('save_artifacts', save_artifacts, ['processor', 'engine', 'results'])
+            if args.compare_svm:
+                graph.add('compare_svm', compare_svm, ['engine', 'X_train', 'y_train', 'X_test', 'y_test'],
+                          ['svm_comparison'], cache=True)
+
+    if plotting:
+        def confusion_plots(results, y_test):
+            # Visualize Confusion Matrices
+            for model_name, res in results.items():
+                visualizer.plot_confusion_matrix(y_test, res['predictions'], model_name)
+
+        def models_2d(engine, X_train, y_train):
+            # --- 5. Decision Boundaries ---
+            # Train simplified 2D models for visualization
+            return engine.train_2d_models_for_viz(X_train, y_train)
+
+        def boundary_plots(models_2d, processor):
+            # Get 2D data for plotting (Visualizer handles slicing)
+            X_vis = processor.X_scaled
+            for name, model in models_2d.items():
+                visualizer.plot_decision_boundary(model, X_vis, processor.y, name)
+
+        graph.add('confusion_plots', confusion_plots, ['results', 'y_test'])
+        graph.add('comparison_plot', visualizer.plot_model_comparison, ['cv_results'])
+        graph.add('models_2d', models_2d, ['engine', 'X_train', 'y_train'], ['models_2d'], cache=True,
+                  title="[PHASE 5] Decision Boundary Visualization (2D Projection)")
+        graph.add('boundary_plots', boundary_plots, ['models_2d', 'processor'])
+
+    engine_config = {'svm_approximation': args.svm_approx, 'svm_rank': args.svm_rank,
+                     'tune': args.tune, 'search_log': args.search_log}
+    graph.run({'dataset_path': dataset_path, 'dtype': 'float32' if args.float32 else 'float64',
+               'chunksize': args.chunked, 'engine_config': engine_config},
+              keys={'dataset_path': _file_stamp(dataset_path)})
+
+    # Wait for background plots; a failed plot fails the run instead of being lost
+    plot_report = visualizer.join() if visualizer is not None else []
+    graph.report()
+    finish_tracing_from_args(args)
+    report_imports(args.import_report)
     print("\n" + "="*60)
     print("  ANALYSIS COMPLETE")
-    print("  Check generated .png files for results.")
+    if visualizer is not None:
+        print("  Check generated .png files for results.")
     print("="*60)
+    return 1 if any(entry['status'] == 'failed' for entry in plot_report) else 0
+
+
+def _file_stamp(path):
+    """Stands in for a file's content in phase cache keys: path, size and mtime."""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,22 +1,133 @@
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import check_cv
+
+from common.cache import ArtifactCache
+from common.profiling import instrument
+from common.shared import SharedArrays, preload_in_workers, resolve, worker_context
+from semana2.src.models.kernel_approx import ApproximateRBFSVC, compare_with_exact_svc
+from semana2.src.models.naming import model_slug
+from semana2.src.models.search import SuccessiveHalvingSearch
+
+# Worker processes run this module's task functions
+preload_in_workers(__name__)
 
+@instrument
 class SupervisedModelEngine:
     """
     Manages training, evaluation, and comparison of multiple supervised models.
+
+    n_jobs > 1 (or -1 for all cores) schedules every model fit and every
+    (model, fold) pair as an independent task on a thread or process pool
+    (backend='thread' | 'process'). Results are gathered in model/fold order,
+    so output does not depend on completion order.
+
+    An optional ArtifactCache makes reruns with unchanged data and
+    hyperparameters load fitted models and scores instead of refitting.
+
+    svm_approximation='nystroem' | 'rff' swaps the exact RBF SVC for an
+    ApproximateRBFSVC of rank svm_rank, so the 'SVM' entry scales linearly
+    with the number of rows; results keep the same names and layout.
     """
-    def __init__(self):
+    def __init__(self, n_jobs=None, backend='thread', cache=None, svm_approximation=None, svm_rank=300):
+        self.svm_approximation = svm_approximation
+        self.svm_rank = svm_rank
         self.models = {
             'Regresión Logística': LogisticRegression(random_state=42),
-            'SVM': SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42),
+            'SVM': self._svm(),
             'Árbol de Decisión': DecisionTreeClassifier(max_depth=4, random_state=42)
         }
         self.results = {}
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.cache = cache
+
+    def _svm(self):
+        """Exact RBF SVC, or its kernel approximation when one is configured."""
+        if self.svm_approximation is None:
+            return SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42)
+        return ApproximateRBFSVC(method=self.svm_approximation, n_components=self.svm_rank,
+                                 C=1.0, gamma='scale', random_state=42)
+
+    def _executor(self):
+        """Returns a pool for the configured backend, or None to run serially."""
+        if self.n_jobs is None or self.n_jobs == 1:
+            return None
+        max_workers = None if self.n_jobs == -1 else self.n_jobs
+        if self.backend == 'process':
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context())
+        if self.backend == 'thread':
+            return ThreadPoolExecutor(max_workers=max_workers)
+        raise ValueError(f"Unknown backend '{self.backend}'. Use 'thread' or 'process'.")
+
+    def _map(self, fn, tasks):
+        """Runs fn(*task) for each task, in parallel when configured, preserving order."""
+        executor = self._executor()
+        if executor is None:
+            return [fn(*task) for task in tasks]
+        with executor:
+            futures = [executor.submit(fn, *task) for task in tasks]
+            return [future.result() for future in futures]
+
+    def _fingerprint(self, *data):
+        """Hashes the input data once so per-model cache keys stay cheap."""
+        return None if self.cache is None else ArtifactCache.make_key('data', *data)
+
+    def _lookup(self, namespace, key_parts):
+        """
+        Looks every task's key parts up in the cache. Returns (keys, results,
+        todo): results holds None for misses, todo the indices of the misses.
+        """
+        if self.cache is None:
+            return None, [None] * len(key_parts), list(range(len(key_parts)))
+        keys = [ArtifactCache.make_key(namespace, *parts) for parts in key_parts]
+        missing = object()
+        results = [self.cache.get(key, missing) for key in keys]
+        todo = [i for i, result in enumerate(results) if result is missing]
+        if len(todo) < len(keys):
+            print(f"[cache] Reusing {len(keys) - len(todo)}/{len(keys)} {namespace} results")
+        return keys, [None if result is missing else result for result in results], todo
+
+    def _cached_map(self, namespace, fn, tasks, key_parts):
+        """
+        Like _map, but each task is first looked up in the cache by its key
+        parts; only misses are scheduled, and their results are stored.
+        """
+        if self.cache is None:
+            return self._map(fn, tasks)
+        keys, results, todo = self._lookup(namespace, key_parts)
+        for i, result in zip(todo, self._map(fn, [tasks[i] for i in todo])):
+            results[i] = self.cache.put(keys[i], result)
+        return results
         
+    def tune_hyperparameters(self, X_train, y_train, search_spaces=None, cv=5, eta=3,
+                             log_path=None, **search_kwargs):
+        """
+        Runs a successive-halving search per model (see SuccessiveHalvingSearch)
+        with candidates spread over the engine's pool, then replaces each entry
+        of self.models with its best configuration. Tune on training data only.
+        Returns the fitted search (best_params_, best_scores_, history_).
+        """
+        if self.backend == 'process':
+            # Shipping distance matrices to every worker costs more than it saves
+            search_kwargs.setdefault('max_kernel_rows', 0)
+        search = SuccessiveHalvingSearch(
+            self.models, search_spaces, cv=cv, eta=eta, log_path=log_path,
+            map_fn=self._map, **search_kwargs
+        ).fit(X_train, y_train)
+        self.models.update(search.best_models())
+        return search
+
     def train_evaluate_all(self, X_train, y_train, X_test, y_test):
         """
         Trains all defined models and evaluates them on the test set.
@@ -24,14 +135,15 @@ class SupervisedModelEngine:
         """
         print("\nStarting model training and evaluation...")
         
-        for name, model in self.models.items():
+        # Train and predict (each model is an independent task)
+        data_key = self._fingerprint(X_train, y_train, X_test)
+        fitted = self._cached_map('train', _fit_predict, [
+            (clone(model), X_train, y_train, X_test) for model in self.models.values()
+        ], [(model, data_key) for model in self.models.values()])
+        
+        for name, (model, y_pred) in zip(list(self.models), fitted):
             print(f"\n{'='*30}\nTraining {name}...\n{'='*30}")
-            
-            # Train
-            model.fit(X_train, y_train)
-            
-            # Predict
-            y_pred = model.predict(X_test)
+            self.models[name] = model
             
             # Evaluate
             report = classification_report(y_test, y_pred, output_dict=True)
@@ -52,23 +164,90 @@ class SupervisedModelEngine:
             
     def run_cross_validation(self, X_scaled, y, cv=5):
         """
-        Runs cross-validation for all models and returns summary statistics.
+        Runs cross-validation for all models and returns summary statistics,
+        including per-fold fit and score times. Only fold scores are cached:
+        folds reused from the cache were not timed in this run, so their
+        times are NaN.
+
+        The folds are split once and shared by every model. With the process
+        backend, X, y and the fold indices are published once as read-only
+        memory maps (see common.shared) and each (model, fold) task only
+        carries handles, so workers read the same pages instead of each
+        receiving copies of the data.
         """
         print("\nRunning Cross-Validation...")
         cv_summary = []
         
-        for name, model in self.models.items():
-            scores = cross_val_score(model, X_scaled, y, cv=cv, scoring='accuracy')
+        # Same deterministic splits cross_val_score would use, computed once
+        splitter = check_cv(cv, y, classifier=True)
+        folds = list(splitter.split(X_scaled, y))
+        # All folds' train and test rows in one index array, sliced per task
+        fold_rows = np.concatenate([np.concatenate([train_idx, test_idx]) for train_idx, test_idx in folds])
+        ends = np.cumsum([len(train_idx) + len(test_idx) for train_idx, test_idx in folds])
+        bounds = [(int(end - len(train_idx) - len(test_idx)), int(end - len(test_idx)), int(end))
+                  for end, (train_idx, test_idx) in zip(ends, folds)]
+        data_key = self._fingerprint(X_scaled, y, folds)
+        pairs = [(model, fold) for model in self.models.values() for fold in range(len(folds))]
+        keys, cached_scores, todo = self._lookup('cv_score', [(model, data_key, fold) for model, fold in pairs])
+        fold_results = np.full((len(pairs), 3), np.nan)
+        fold_results[:, 0] = [np.nan if score is None else score for score in cached_scores]
+        
+        # Nothing to publish when every fold comes from the cache
+        share = self.backend == 'process' and self.n_jobs not in (None, 1) and bool(todo)
+        with SharedArrays(enabled=share) as shared:
+            X_h, y_h, rows_h = (shared.publish(a) for a in (X_scaled, np.asarray(y), fold_rows))
+            tasks = [(clone(pairs[i][0]), X_h, y_h, rows_h, bounds[pairs[i][1]]) for i in todo]
+            for i, result in zip(todo, self._map(_fit_score_fold, tasks)):
+                fold_results[i] = result
+                if self.cache is not None:
+                    self.cache.put(keys[i], result[0])
+        fold_results = fold_results.reshape(len(self.models), len(folds), 3)
+        
+        for name, per_fold in zip(self.models, fold_results):
+            scores, fit_times, score_times = per_fold.T
+            timed = ~np.isnan(fit_times)
             cv_summary.append({
                 'Modelo': name,
                 'Accuracy Promedio': scores.mean(),
                 'Desviación Estándar': scores.std(),
-                'Scores': scores
+                'Scores': scores,
+                'Fit (s)': fit_times,
+                'Score (s)': score_times
             })
-            print(f"{name}: Mean Accuracy = {scores.mean():.3f} (+/- {scores.std():.3f})")
+            timing = (f"fit {fit_times[timed].sum():.2f}s / score {score_times[timed].sum():.2f}s "
+                      f"over {timed.sum()} folds" if timed.any() else "not timed")
+            if not timed.all():
+                timing += f", {len(folds) - timed.sum()} folds cached"
+            print(f"{name}: Mean Accuracy = {scores.mean():.3f} (+/- {scores.std():.3f}), {timing}")
             
         return cv_summary
 
+    def compare_svm_approximation(self, X_train, y_train, X_test, y_test, ranks=(50, 100, 300, 1000),
+                                  methods=('nystroem', 'rff'), exact_max_rows=20_000):
+        """
+        Accuracy-vs-speed comparison of Nyström and random Fourier feature SVMs
+        against exact SVC (trained on at most exact_max_rows rows). Uses the C
+        and gamma of the current 'SVM' entry, so it reflects tuned values.
+        """
+        print("\nComparing kernel-approximated SVMs with exact SVC...")
+        params = self.models['SVM'].get_params()
+        comparison = compare_with_exact_svc(X_train, y_train, X_test, y_test, ranks=ranks, methods=methods,
+                                            C=params['C'], gamma=params['gamma'],
+                                            exact_max_rows=exact_max_rows)
+        print(comparison.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        return comparison
+
+    def save_models(self, output_dir):
+        """Pickles every fitted model to <output_dir>/<model slug>.pkl and returns the paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {}
+        for name, res in self.results.items():
+            paths[name] = os.path.join(output_dir, f"{model_slug(name)}.pkl")
+            with open(paths[name], 'wb') as f:
+                pickle.dump(res['model'], f)
+            print(f"Saved {name} model to {paths[name]}")
+        return paths
+
     def train_2d_models_for_viz(self, X_train, y_train):
         """
         Trains simplified classifiers on only the last 2 features (Age, Salary)
@@ -80,13 +259,46 @@ class SupervisedModelEngine:
         
         models_2d = {
             'Regresión Logística': LogisticRegression(random_state=42),
-            'SVM': SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42),
+            'SVM': self._svm(),
             'Árbol de Decisión': DecisionTreeClassifier(max_depth=4, random_state=42)
         }
         
-        trained_models = {}
-        for name, model in models_2d.items():
-            model.fit(X_2d, y_train)
-            trained_models[name] = model
-            
-        return trained_models
+        data_key = self._fingerprint(X_2d, y_train)
+        fitted = self._cached_map(
+            'viz2d', _fit,
+            [(model, X_2d, y_train) for model in models_2d.values()],
+            [(model, data_key) for model in models_2d.values()]
+        )
+        return dict(zip(models_2d, fitted))
+
+
+def _take(data, idx):
+    """Row selection that works for both ndarrays and pandas objects."""
+    return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+
+
+def _fit(model, X_train, y_train):
+    """Pool task: fits one model."""
+    return model.fit(X_train, y_train)
+
+
+def _fit_predict(model, X_train, y_train, X_test):
+    """Pool task: fits one model and predicts on the test set."""
+    model.fit(X_train, y_train)
+    return model, model.predict(X_test)
+
+
+def _fit_score_fold(model, X, y, rows, fold_bounds):
+    """
+    Pool task: fits one (model, fold) pair; returns (accuracy, fit seconds,
+    score seconds). rows[start:split] are the fold's train rows and
+    rows[split:stop] its test rows; X, y and rows may be shared handles.
+    """
+    X, y, rows = resolve(X), resolve(y), resolve(rows)
+    start, split, stop = fold_bounds
+    train_idx, test_idx = rows[start:split], rows[split:stop]
+    started = time.perf_counter()
+    model.fit(_take(X, train_idx), _take(y, train_idx))
+    fitted = time.perf_counter()
+    score = model.score(_take(X, test_idx), _take(y, test_idx))
+    return score, fitted - started, time.perf_counter() - fitted
@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import SGDClassifier
+from sklearn.svm import SVC, LinearSVC
+from sklearn.utils.multiclass import unique_labels
+
+
+def rbf_gamma(gamma, X_train):
+    """Numeric RBF gamma for X_train; 'scale' and 'auto' mean the same as in SVC."""
+    if gamma == 'scale':
+        variance = X_train.var()
+        return 1.0 / (X_train.shape[1] * variance) if variance > 0 else 1.0
+    if gamma == 'auto':
+        return 1.0 / X_train.shape[1]
+    return float(gamma)
+
+
+class ApproximateRBFSVC(ClassifierMixin, BaseEstimator):
+    """
+    Linear SVM on an explicit approximation of the RBF kernel, a drop-in for
+    SVC(kernel='rbf') whose cost grows linearly with the number of rows.
+
+    - method: 'nystroem' (kernel columns of n_components sampled rows) or
+      'rff' (n_components random Fourier features).
+    - n_components: approximation rank; accuracy approaches the exact SVC as
+      it grows, and fit/predict cost grows linearly with it.
+    - gamma: float, or 'scale' / 'auto' with the same meaning as in SVC.
+    - solver: 'liblinear' trains LinearSVC on the full (float32) feature
+      matrix; 'sgd' streams feature chunks through SGD hinge-loss epochs so
+      memory stays bounded by chunk_size. 'auto' picks 'sgd' once the feature
+      matrix would exceed max_feature_bytes.
+
+    More than two classes are handled one-vs-rest by the linear model, as in
+    LinearSVC; decision_function then returns one column per class.
+    """
+    def __init__(self, method='nystroem', n_components=300, C=1.0, gamma='scale',
+                 solver='auto', max_feature_bytes=1 << 30, chunk_size=100_000,
+                 sgd_epochs=5, random_state=42):
+        self.method = method
+        self.n_components = n_components
+        self.C = C
+        self.gamma = gamma
+        self.solver = solver
+        self.max_feature_bytes = max_feature_bytes
+        self.chunk_size = chunk_size
+        self.sgd_epochs = sgd_epochs
+        self.random_state = random_state
+
+    def _features(self, X):
+        """Kernel features of X, computed chunk by chunk in float32."""
+        out = np.empty((len(X), self.feature_map_.n_components), dtype=np.float32)
+        for start in range(0, len(X), self.chunk_size):
+            out[start:start + self.chunk_size] = self.feature_map_.transform(X[start:start + self.chunk_size])
+        return out
+
+    def fit(self, X, y):
+        X, y = np.asarray(X, dtype=np.float64), np.asarray(y)
+        self.classes_ = unique_labels(y)
+        self.n_features_in_ = X.shape[1]
+        self.gamma_ = rbf_gamma(self.gamma, X)
+        n_components = min(self.n_components, len(X)) if self.method == 'nystroem' else self.n_components
+        if self.method == 'nystroem':
+            self.feature_map_ = Nystroem(kernel='rbf', gamma=self.gamma_, n_components=n_components,
+                                         random_state=self.random_state)
+        elif self.method == 'rff':
+            self.feature_map_ = RBFSampler(gamma=self.gamma_, n_components=n_components,
+                                           random_state=self.random_state)
+        else:
+            raise ValueError(f"Unknown method '{self.method}'. Use 'nystroem' or 'rff'.")
+        self.feature_map_.fit(X)
+
+        solver = self.solver
+        if solver == 'auto':
+            too_big = len(X) * n_components * 4 > self.max_feature_bytes
+            solver = 'sgd' if too_big else 'liblinear'
+        self.solver_ = solver
+        if solver == 'liblinear':
+            self.linear_ = LinearSVC(C=self.C, random_state=self.random_state).fit(self._features(X), y)
+        elif solver == 'sgd':
+            # hinge loss with alpha = 1 / (C * n) matches the SVM objective's regularization
+            self.linear_ = SGDClassifier(loss='hinge', alpha=1.0 / (self.C * len(X)),
+                                         random_state=self.random_state)
+            rng = np.random.default_rng(self.random_state)
+            for _ in range(self.sgd_epochs):
+                for start in rng.permutation(np.arange(0, len(X), self.chunk_size)):
+                    stop = start + self.chunk_size
+                    self.linear_.partial_fit(self.feature_map_.transform(X[start:stop]), y[start:stop],
+                                             classes=self.classes_)
+        else:
+            raise ValueError(f"Unknown solver '{self.solver}'. Use 'auto', 'liblinear' or 'sgd'.")
+        return self
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        # Binary models return one score per row, multiclass ones one per class
+        scores = np.empty(len(X) if len(self.classes_) == 2 else (len(X), len(self.classes_)))
+        for start in range(0, len(X), self.chunk_size):
+            chunk = self.feature_map_.transform(X[start:start + self.chunk_size])
+            scores[start:start + self.chunk_size] = self.linear_.decision_function(chunk)
+        return scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+def compare_with_exact_svc(X_train, y_train, X_test, y_test, ranks=(50, 100, 300, 1000),
+                           methods=('nystroem', 'rff'), C=1.0, gamma='scale', exact_max_rows=20_000):
+    """
+    Accuracy-vs-speed table of the approximations against exact SVC. The
+    exact model is trained on at most exact_max_rows rows (its cost is
+    quadratic or worse); 'agreement' is the share of test predictions that
+    match it. Returns a DataFrame, one row per configuration.
+    """
+    X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+    rows = []
+
+    def run(label, rank, model, n_rows):
+        start = time.perf_counter()
+        model.fit(X_train[:n_rows], y_train[:n_rows])
+        fit_s = time.perf_counter() - start
+        start = time.perf_counter()
+        pred = model.predict(X_test)
+        predict_s = time.perf_counter() - start
+        rows.append({'Método': label, 'Rango': rank, 'Filas': n_rows, 'Fit (s)': fit_s,
+                     'Predict (s)': predict_s, 'Accuracy': float(np.mean(pred == np.asarray(y_test)))})
+        return pred
+
+    exact_rows = min(len(X_train), exact_max_rows)
+    exact_pred = run('SVC exacto', None, SVC(kernel='rbf', C=C, gamma=gamma, random_state=42), exact_rows)
+    for method in methods:
+        for rank in ranks:
+            pred = run(method, rank, ApproximateRBFSVC(method, rank, C=C, gamma=gamma), len(X_train))
+            rows[-1]['Acuerdo con exacto'] = float(np.mean(pred == exact_pred))
+    rows[0]['Acuerdo con exacto'] = 1.0
+    return pd.DataFrame(rows)
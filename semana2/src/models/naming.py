@@ -0,0 +1,10 @@
+"""
+Artifact naming shared by training and scoring. Kept free of heavy
+imports so the scoring entry point can resolve model files without
+loading the training engine.
+"""
+
+
+def model_slug(name):
+    """File-name friendly model name, matching the plot file naming."""
+    return name.lower().replace(" ", "_")
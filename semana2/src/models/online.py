@@ -0,0 +1,166 @@
+import os
+import pickle
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.linear_model import SGDClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from common.profiling import instrument
+from semana2.src.models.naming import model_slug
+
+
+@instrument
+class OnlineModelTrainer:
+    """
+    Online training mode for the ads classifiers.
+
+    Each mini-batch first updates the processor's scaler with partial_fit,
+    then the linear models (logistic regression and a linear SVM, both as
+    SGD classifiers) take one partial_fit step on the scaled batch. The
+    decision tree cannot be updated in place, so it is rebuilt every
+    rebuild_every batches from a sliding window of the most recent
+    window_rows rows. The whole state (scaler, models, window, counters and
+    how many rows of each input file were consumed) is checkpointed between
+    batches, so ingestion resumes where it stopped: a resumed ingest() skips
+    the rows already seen and files that were fully ingested.
+    """
+    CLASSES = np.array([0, 1])
+
+    def __init__(self, processor, rebuild_every=10, window_rows=200_000, random_state=42):
+        self.processor = processor
+        self.rebuild_every = rebuild_every
+        self.window_rows = window_rows
+        self.models = {
+            'Regresión Logística': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=random_state),
+            'SVM': SGDClassifier(loss='hinge', alpha=1e-4, random_state=random_state),
+            'Árbol de Decisión': DecisionTreeClassifier(max_depth=4, random_state=random_state)
+        }
+        self.n_batches = 0
+        self.n_rows = 0
+        # Absolute input path -> (CSV rows consumed, whether the file was finished)
+        self.ingested = {}
+        self._window_X = None
+        self._window_y = None
+        self._window_pos = 0
+        self._window_filled = 0
+
+    def _remember(self, X_raw, y):
+        """Adds unscaled rows to the tree's ring buffer, overwriting the oldest."""
+        if self._window_X is None:
+            self._window_X = np.empty((self.window_rows, X_raw.shape[1]))
+            self._window_y = np.empty(self.window_rows, dtype=np.int8)
+        X_raw, y = X_raw[-self.window_rows:], y[-self.window_rows:]
+        idx = (self._window_pos + np.arange(len(y))) % self.window_rows
+        self._window_X[idx], self._window_y[idx] = X_raw, y
+        self._window_pos = (self._window_pos + len(y)) % self.window_rows
+        self._window_filled = min(self.window_rows, self._window_filled + len(y))
+
+    def rebuild_tree(self):
+        """Refits the decision tree on the window, scaled with the current scaler."""
+        scaler = self.processor.scaler
+        # Same affine map as scaler.transform, applied to the unnamed window array
+        X_scaled = (self._window_X[:self._window_filled] - scaler.mean_) / scaler.scale_
+        tree = clone(self.models['Árbol de Decisión'])
+        self.models['Árbol de Decisión'] = tree.fit(X_scaled, self._window_y[:self._window_filled])
+
+    def partial_fit(self, X_batch, y_batch):
+        """Ingests one mini-batch of encoded, unscaled features and targets."""
+        X_scaled = self.processor.partial_fit_scaler(X_batch)
+        for name in ('Regresión Logística', 'SVM'):
+            self.models[name].partial_fit(X_scaled, y_batch, classes=self.CLASSES)
+        self._remember(np.asarray(X_batch, dtype=np.float64), np.asarray(y_batch))
+        self.n_batches += 1
+        self.n_rows += len(y_batch)
+        # Build the first tree right away, then only every rebuild_every batches
+        if self.n_batches % self.rebuild_every == 0 or not hasattr(self.models['Árbol de Decisión'], 'tree_'):
+            self.rebuild_tree()
+        return self
+
+    def ingest(self, filepath, chunksize=50_000, checkpoint_path=None, checkpoint_every=1):
+        """
+        Streams a CSV of new rows through partial_fit in chunks, writing a
+        checkpoint every checkpoint_every batches and at the end. Rows of
+        filepath already consumed before a checkpoint are skipped. Returns
+        (rows ingested, seconds).
+        """
+        key = os.path.abspath(filepath)
+        offset, finished = self.ingested.get(key, (0, False))
+        if finished:
+            print(f"Skipping {filepath}: already ingested")
+            return 0, 0.0
+        if offset:
+            print(f"Resuming {filepath} after {offset} rows")
+        start, rows_before = time.perf_counter(), self.n_rows
+        batches = 0
+        for X_batch, y_batch in self.processor.iter_batches(filepath, chunksize, skip_rows=offset):
+            self.partial_fit(X_batch, y_batch)
+            batches += 1
+            # Every chunk but the last spans exactly chunksize CSV rows (before dropping missing values)
+            self.ingested[key] = (offset + batches * chunksize, False)
+            if checkpoint_path and batches % checkpoint_every == 0:
+                self.checkpoint(checkpoint_path)
+        self.ingested[key] = (self.ingested.get(key, (offset, False))[0], True)
+        if checkpoint_path:
+            self.checkpoint(checkpoint_path)
+        seconds = time.perf_counter() - start
+        print(f"Ingested {self.n_rows - rows_before} rows from {filepath} in {seconds:.2f}s "
+              f"({self.n_batches} batches, {self.n_rows} rows in total)")
+        return self.n_rows - rows_before, seconds
+
+    def evaluate(self, X_test, y_test):
+        """Accuracy of every model on an already scaled test set."""
+        return {name: float(model.score(X_test, y_test)) for name, model in self.models.items()}
+
+    def checkpoint(self, path):
+        """Atomically pickles the full training state."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = {
+            'scaler': self.processor.scaler,
+            'features': self.processor.feature_columns,
+            'models': self.models,
+            'rebuild_every': self.rebuild_every,
+            'window_rows': self.window_rows,
+            'n_batches': self.n_batches,
+            'n_rows': self.n_rows,
+            'ingested': self.ingested,
+            'window': (self._window_X[:self._window_filled] if self._window_X is not None else None,
+                       self._window_y[:self._window_filled] if self._window_y is not None else None,
+                       self._window_pos)
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def resume(cls, processor, path):
+        """Restores a trainer (and the processor's scaler) from a checkpoint."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        trainer = cls(processor, rebuild_every=state['rebuild_every'], window_rows=state['window_rows'])
+        processor.scaler = state['scaler']
+        processor.feature_columns = state['features']
+        trainer.models = state['models']
+        trainer.n_batches, trainer.n_rows = state['n_batches'], state['n_rows']
+        trainer.ingested = dict(state.get('ingested', {}))
+        window_X, window_y, window_pos = state['window']
+        if window_X is not None:
+            trainer._window_X = np.empty((trainer.window_rows, window_X.shape[1]))
+            trainer._window_y = np.empty(trainer.window_rows, dtype=np.int8)
+            trainer._window_X[:len(window_y)], trainer._window_y[:len(window_y)] = window_X, window_y
+            trainer._window_filled, trainer._window_pos = len(window_y), window_pos
+        print(f"Resumed online training from {path} ({trainer.n_rows} rows seen)")
+        return trainer
+
+    def export(self, output_dir):
+        """Writes scaler.pkl and one pickle per model in the layout score.py loads."""
+        self.processor.save_scaler(os.path.join(output_dir, "scaler.pkl"))
+        paths = {}
+        for name, model in self.models.items():
+            paths[name] = os.path.join(output_dir, f"{model_slug(name)}.pkl")
+            with open(paths[name], 'wb') as f:
+                pickle.dump(model, f)
+            print(f"Saved {name} model to {paths[name]}")
+        return paths
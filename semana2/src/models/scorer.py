@@ -0,0 +1,231 @@
+import json
+import pickle
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+class LatencyStats:
+    """Collects per-batch latencies and row counts; reports p50/p99 and throughput."""
+    def __init__(self):
+        self.latencies = []
+        self.rows = 0
+        self.busy_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, n_rows):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.rows += n_rows
+            self.busy_time += seconds
+
+    def summary(self):
+        with self._lock:
+            latencies = np.asarray(self.latencies) * 1000
+            return {
+                'batches': len(latencies),
+                'rows': self.rows,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                'rows_per_second': self.rows / self.busy_time if self.busy_time > 0 else 0.0
+            }
+
+    def print_summary(self, label="Scoring", file=None):
+        stats = self.summary()
+        print(f"{label}: {stats['rows']} rows in {stats['batches']} batches | "
+              f"p50={stats['p50_ms']:.2f} ms, p99={stats['p99_ms']:.2f} ms, "
+              f"{stats['rows_per_second']:,.0f} rows/s", file=file)
+        return stats
+
+
+class AdScorer:
+    """
+    Scores new users with a persisted scaler (SocialAdDataProcessor.save_scaler)
+    and a persisted model (SupervisedModelEngine.save_models).
+    """
+    def __init__(self, scaler, model, features, encodings=None):
+        self.scaler = scaler
+        self.model = model
+        self.features = list(features)
+        self.encodings = encodings or {}
+        self.stats = LatencyStats()
+
+    @classmethod
+    def load(cls, scaler_path, model_path):
+        with open(scaler_path, 'rb') as f:
+            bundle = pickle.load(f)
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        return cls(bundle['scaler'], model, bundle['features'], bundle.get('encodings'))
+
+    def prepare(self, df):
+        """
+        Encodes, selects and scales a DataFrame of raw rows into a float
+        matrix. Raises ValueError for missing values and unknown categories.
+        """
+        X = np.empty((len(df), len(self.features)))
+        for j, col in enumerate(self.features):
+            values = df[col]
+            if col in self.encodings:
+                values = values.map(self.encodings[col])
+            X[:, j] = values.to_numpy(dtype=float, na_value=np.nan)
+        missing = np.isnan(X).any(axis=0)
+        if missing.any():
+            columns = [col for col, bad in zip(self.features, missing) if bad]
+            raise ValueError(f"Missing or unknown values in {columns}")
+        # Same affine map as scaler.transform, applied in place on the batch buffer
+        X -= self.scaler.mean_
+        X /= self.scaler.scale_
+        return X
+
+    def score_frame(self, df):
+        """Returns predictions (and purchase probability when available) for df."""
+        start = time.perf_counter()
+        return self.score_prepared(self.prepare(df), df.index, start)
+
+    def score_prepared(self, X, index=None, start=None):
+        """Scores rows already encoded and scaled by prepare()."""
+        start = time.perf_counter() if start is None else start
+        result = pd.DataFrame({'prediction': self.model.predict(X)}, index=index)
+        if hasattr(self.model, 'predict_proba'):
+            result['probability'] = self.model.predict_proba(X)[:, 1]
+        self.stats.record(time.perf_counter() - start, len(X))
+        return result
+
+    def score_csv(self, source, output=None, chunksize=50_000):
+        """
+        Scores a CSV path (or '-' for stdin) in vectorized chunks and writes
+        the input rows with their scores as CSV to output (stdout by default).
+        """
+        source = sys.stdin if source == '-' else source
+        output = sys.stdout if output in (None, '-') else output
+        header = True
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            scored = chunk.join(self.score_frame(chunk))
+            scored.to_csv(output, header=header, index=False, mode='w' if header else 'a')
+            header = False
+        # Keep stdout clean for the scored CSV
+        return self.stats.print_summary("Batch scoring", file=sys.stderr if output is sys.stdout else None)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent scoring requests into one vectorized call: requests
+    queue up until max_batch_rows is reached or max_wait_ms has passed.
+    Each request is validated and encoded on its own first, so a malformed
+    request fails only its own future.
+    """
+    def __init__(self, scorer, max_batch_rows=4096, max_wait_ms=5):
+        self.scorer = scorer
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, df):
+        future = Future()
+        self._queue.put((df, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while n_rows < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        prepared = []
+        for df, future in batch:
+            try:
+                prepared.append((self.scorer.prepare(df), future))
+            except Exception as e:
+                future.set_exception(e)
+        if not prepared:
+            return
+        try:
+            scored = self.scorer.score_prepared(np.concatenate([X for X, _ in prepared]))
+        except Exception:
+            # Retry request by request, so a failure only reaches the request that caused it
+            for X, future in prepared:
+                try:
+                    future.set_result(self.scorer.score_prepared(X))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        start = 0
+        for X, future in prepared:
+            future.set_result(scored.iloc[start:start + len(X)])
+            start += len(X)
+
+
+def serve_http(scorer, host='127.0.0.1', port=8080, max_batch_rows=4096, max_wait_ms=5):
+    """
+    Serves POST /score (JSON list of rows, or {"rows": [...]}) and GET /stats
+    on a local threaded HTTP server with request micro-batching.
+    """
+    batcher = MicroBatcher(scorer, max_batch_rows, max_wait_ms)
+    request_stats = LatencyStats()
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                self._send_json(404, {'error': 'not found'})
+                return
+            self._send_json(200, {'requests': request_stats.summary(),
+                                  'model_batches': scorer.stats.summary()})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send_json(404, {'error': 'not found'})
+                return
+            start = time.perf_counter()
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                rows = payload['rows'] if isinstance(payload, dict) else payload
+                scored = batcher.submit(pd.DataFrame(rows)).result()
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            request_stats.record(time.perf_counter() - start, len(scored))
+            self._send_json(200, scored.to_dict(orient='records'))
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ScoringHandler)
+    print(f"Serving scoring endpoint on http://{host}:{port}/score (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        request_stats.print_summary("HTTP requests")
+        scorer.stats.print_summary("Model batches")
+    return server
@@ -0,0 +1,176 @@
+import json
+import math
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.svm import SVC
+
+from common.cache import ArtifactCache
+from semana2.src.models.kernel_approx import rbf_gamma
+
+# Candidate grids per model (keys match SupervisedModelEngine.models)
+DEFAULT_SEARCH_SPACES = {
+    'Regresión Logística': {'C': [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0]},
+    'SVM': {'C': [0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0],
+            'gamma': ['scale', 0.03, 0.1, 0.3, 1.0, 3.0]},
+    'Árbol de Decisión': {'max_depth': [2, 3, 4, 5, 6, 8, 10, None],
+                          'min_samples_leaf': [1, 5, 20]},
+}
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive-halving hyperparameter search over data-size budgets.
+
+    Every candidate starts on a small stratified subsample; after each rung
+    only the best 1/eta by mean CV accuracy move on, and the budget grows by
+    eta until the last rung uses all rows. All candidates in a rung share
+    one set of stratified folds. For RBF SVMs on rungs of at most
+    max_kernel_rows rows the pairwise squared distances are computed once
+    and every (C, gamma) candidate fits on a precomputed kernel derived from
+    them.
+
+    Evaluations are appended to log_path (JSON lines) as each rung
+    finishes; rerunning with the same log, data and settings skips every
+    evaluation already recorded, so an interrupted search resumes.
+    """
+    def __init__(self, models, search_spaces=None, cv=5, eta=3, min_resources=None,
+                 max_kernel_rows=3000, log_path=None, map_fn=None, random_state=42):
+        self.models = models
+        self.search_spaces = search_spaces or DEFAULT_SEARCH_SPACES
+        self.cv = cv
+        self.eta = eta
+        self.min_resources = min_resources
+        self.max_kernel_rows = max_kernel_rows
+        self.log_path = log_path
+        self.map_fn = map_fn or (lambda fn, tasks: [fn(*task) for task in tasks])
+        self.random_state = random_state
+        self.best_params_ = {}
+        self.best_scores_ = {}
+        self.history_ = []
+
+    def _budgets(self, n_samples, n_candidates, n_classes):
+        """Rung sizes r0 * eta**i, ending at n_samples, enough rungs to narrow to ~1 candidate."""
+        n_rungs = max(1, math.ceil(math.log(max(n_candidates, 1), self.eta)) + 1)
+        floor = self.min_resources or 4 * self.cv * n_classes
+        budgets = [max(floor, int(n_samples / self.eta ** (n_rungs - 1 - i))) for i in range(n_rungs)]
+        budgets = [min(b, n_samples) for b in budgets]
+        return sorted(set(budgets))
+
+    def _stratified_order(self, y):
+        """Row order whose every prefix keeps the class proportions (nested budgets)."""
+        rng = np.random.default_rng(self.random_state)
+        order = rng.permutation(len(y))
+        position = np.empty(len(y))
+        for label in np.unique(y):
+            rows = order[y[order] == label]
+            position[rows] = (np.arange(len(rows)) + rng.random(len(rows))) / len(rows)
+        return np.argsort(position, kind='stable')
+
+    def _load_log(self):
+        done = {}
+        if self.log_path and os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by an interrupted run
+                    done[record['key']] = record
+        return done
+
+    def _log(self, record):
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def fit(self, X, y):
+        """Runs one successive-halving search per model; returns self."""
+        X, y = np.asarray(X), np.asarray(y)
+        data_key = ArtifactCache.make_key('search', X, y, self.cv, self.eta, self.random_state)
+        order = self._stratified_order(y)
+        done = self._load_log()
+        folds_by_budget = {}
+        n_classes = len(np.unique(y))
+
+        for name, base_model in self.models.items():
+            candidates = list(ParameterGrid(self.search_spaces.get(name, {})))
+            budgets = self._budgets(len(y), len(candidates), n_classes)
+            print(f"\nBuscando hiperparámetros de {name}: {len(candidates)} candidatos, "
+                  f"presupuestos {budgets}")
+            survivors = candidates
+            for rung, budget in enumerate(budgets):
+                rows = np.sort(order[:budget])
+                X_rung, y_rung = X[rows], y[rows]
+                if budget not in folds_by_budget:
+                    splitter = StratifiedKFold(self.cv, shuffle=True, random_state=self.random_state)
+                    folds_by_budget[budget] = list(splitter.split(X_rung, y_rung))
+                folds = folds_by_budget[budget]
+                sq_dists = None
+                if isinstance(base_model, SVC) and base_model.kernel == 'rbf' and budget <= self.max_kernel_rows:
+                    sq_dists = _squared_distances(X_rung)
+
+                keys = [f"{data_key}|{name}|{json.dumps(params, sort_keys=True, default=str)}|{budget}"
+                        for params in survivors]
+                todo = [i for i, key in enumerate(keys) if key not in done]
+                # One task per (candidate, fold) keeps every core busy on the late, narrow rungs
+                tasks = [(base_model, survivors[i], X_rung, y_rung, [fold], sq_dists)
+                         for i in todo for fold in folds]
+                fold_scores = np.asarray(self.map_fn(_evaluate_candidate, tasks)).reshape(len(todo), len(folds))
+                for i, scores in zip(todo, fold_scores.tolist()):
+                    record = {'key': keys[i], 'model': name, 'params': survivors[i], 'rung': rung,
+                              'budget': budget, 'scores': scores, 'mean_score': float(np.mean(scores))}
+                    done[keys[i]] = record
+                    self._log(record)
+                if len(todo) < len(keys):
+                    print(f"  rung {rung}: {len(keys) - len(todo)}/{len(keys)} reanudados del registro")
+
+                records = [done[key] for key in keys]
+                self.history_.extend(records)
+                ranking = np.argsort([-r['mean_score'] for r in records], kind='stable')
+                keep = len(survivors) if rung == len(budgets) - 1 else max(1, math.ceil(len(survivors) / self.eta))
+                print(f"  rung {rung} (n={budget}): mejor {records[ranking[0]]['mean_score']:.3f}, "
+                      f"pasan {min(keep, len(survivors))}/{len(survivors)}")
+                survivors = [survivors[i] for i in ranking[:keep]]
+                best = records[ranking[0]]
+
+            self.best_params_[name] = best['params']
+            self.best_scores_[name] = best['mean_score']
+            print(f"  Mejor configuración de {name}: {best['params']} "
+                  f"(accuracy CV {best['mean_score']:.3f})")
+        return self
+
+    def best_models(self):
+        """Unfitted clones of the models with their best parameters set."""
+        return {name: clone(model).set_params(**self.best_params_.get(name, {}))
+                for name, model in self.models.items()}
+
+
+def _squared_distances(X):
+    """Pairwise squared Euclidean distances, computed once per rung."""
+    norms = np.einsum('ij,ij->i', X, X)
+    sq_dists = norms[:, None] + norms[None, :] - 2 * X @ X.T
+    np.maximum(sq_dists, 0, out=sq_dists)
+    return sq_dists
+
+
+def _evaluate_candidate(base_model, params, X, y, folds, sq_dists=None):
+    """Pool task: accuracy of one candidate on each of the given folds of a rung."""
+    scores = []
+    for train_idx, test_idx in folds:
+        if sq_dists is None:
+            model = clone(base_model).set_params(**params)
+            model.fit(X[train_idx], y[train_idx])
+            scores.append(float(model.score(X[test_idx], y[test_idx])))
+            continue
+        # Same RBF kernel the SVC would compute, taken from the shared distance matrix
+        svc_params = {k: v for k, v in params.items() if k != 'gamma'}
+        gamma = rbf_gamma(params.get('gamma', base_model.gamma), X[train_idx])
+        model = clone(base_model).set_params(kernel='precomputed', **svc_params)
+        model.fit(np.exp(-gamma * sq_dists[np.ix_(train_idx, train_idx)]), y[train_idx])
+        predictions = model.predict(np.exp(-gamma * sq_dists[np.ix_(test_idx, train_idx)]))
+        scores.append(float(np.mean(predictions == y[test_idx])))
+    return scores
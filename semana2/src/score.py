@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Scoring entry point for the trained Social Network Ads classifiers.
+Scores CSV/stdin batches or serves a local HTTP endpoint.
+"""
+
+import argparse
+import os
+import sys
+
+# Ensure src is in the python path to find modules if run from root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from semana2.src.models.naming import model_slug
+from semana2.src.models.scorer import AdScorer, serve_http
+
+
+def parse_args(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    artifacts_dir = os.path.join(project_root, "artifacts")
+    parser = argparse.ArgumentParser(description="Score users with a trained ads classifier.")
+    parser.add_argument('--model', default='SVM',
+                        help="Model name as trained by main.py (e.g. 'SVM', 'Regresión Logística')")
+    parser.add_argument('--artifacts-dir', default=artifacts_dir,
+                        help="Directory with scaler.pkl and the saved models")
+    parser.add_argument('--input', default='-', help="CSV to score, or '-' for stdin")
+    parser.add_argument('--output', default='-', help="Output CSV, or '-' for stdout")
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--serve', action='store_true', help="Serve POST /score over HTTP instead")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-rows', type=int, default=4096)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    return parser.parse_args(argv)
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    scaler_path = os.path.join(args.artifacts_dir, "scaler.pkl")
+    model_path = os.path.join(args.artifacts_dir, f"{model_slug(args.model)}.pkl")
+    for path in (scaler_path, model_path):
+        if not os.path.exists(path):
+            print(f"ERROR: Artifact not found at {path}. Run main.py first.", file=sys.stderr)
+            return 1
+
+    scorer = AdScorer.load(scaler_path, model_path)
+    if args.serve:
+        serve_http(scorer, args.host, args.port, args.max_batch_rows, args.max_wait_ms)
+    else:
+        scorer.score_csv(args.input, args.output, args.chunksize)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
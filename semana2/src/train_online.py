@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Online training entry point for the Social Network Ads classifiers.
+Ingests new CSV batches (e.g. one file per day) into checkpointed models
+instead of retraining from scratch, then exports artifacts for score.py.
+"""
+
+import argparse
+import os
+import sys
+
+# Ensure src is in the python path to find modules if run from root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from semana2.src.data.processor import SocialAdDataProcessor
+from semana2.src.models.online import OnlineModelTrainer
+
+
+def parse_args(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    artifacts_dir = os.path.join(project_root, "artifacts")
+    parser = argparse.ArgumentParser(description="Update the ads classifiers with new rows.")
+    parser.add_argument('inputs', nargs='+', help="CSV files of new rows, ingested in order")
+    parser.add_argument('--checkpoint', default=os.path.join(artifacts_dir, "online_checkpoint.pkl"),
+                        help="Training state to resume from and update")
+    parser.add_argument('--export-dir', default=artifacts_dir,
+                        help="Where scaler.pkl and the model pickles for score.py are written")
+    parser.add_argument('--no-export', action='store_true', help="Only update the checkpoint")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="Rows per mini-batch")
+    parser.add_argument('--rebuild-every', type=int, default=None,
+                        help="Rebuild the decision tree every this many batches (default: 10, "
+                             "or the checkpoint's value)")
+    parser.add_argument('--window-rows', type=int, default=None,
+                        help="Most recent rows the decision tree is rebuilt from (default: 200000, "
+                             "or the checkpoint's value)")
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                        help="Write the checkpoint every this many batches")
+    return parser.parse_args(argv)
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    processor = SocialAdDataProcessor(args.inputs[0])
+    if os.path.exists(args.checkpoint):
+        trainer = OnlineModelTrainer.resume(processor, args.checkpoint)
+        for option, name in (('--rebuild-every', 'rebuild_every'), ('--window-rows', 'window_rows')):
+            value = getattr(args, name)
+            if value is not None and value != getattr(trainer, name):
+                print(f"WARNING: Ignoring {option} {value}; the checkpoint at {args.checkpoint} "
+                      f"uses {getattr(trainer, name)} (delete it to start over)", file=sys.stderr)
+    else:
+        trainer = OnlineModelTrainer(processor,
+                                     rebuild_every=args.rebuild_every if args.rebuild_every is not None else 10,
+                                     window_rows=args.window_rows if args.window_rows is not None else 200_000)
+
+    for path in args.inputs:
+        if not os.path.exists(path):
+            print(f"ERROR: Input not found at {path}", file=sys.stderr)
+            return 1
+        trainer.ingest(path, chunksize=args.batch_size, checkpoint_path=args.checkpoint,
+                       checkpoint_every=args.checkpoint_every)
+
+    if not args.no_export:
+        trainer.export(args.export_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
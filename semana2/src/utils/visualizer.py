@@ -1,113 +1,239 @@
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+
 import numpy as np
-from matplotlib.colors import ListedColormap
-from sklearn.metrics import confusion_matrix
 import pandas as pd
+from sklearn.metrics import confusion_matrix
+
+from common.density import pairplot_summary, render_density_pairplot, stratified_sample
+from common.figures import FigureJobPool
+from common.lazy import lazy_import
+from common.profiling import instrument
+
+# Plotting libraries load on first render, i.e. only in the processes that draw
+sns = lazy_import('seaborn')
+mpl_colors = lazy_import('matplotlib.colors')
+mpl_figure = lazy_import('matplotlib.figure')
 
+@instrument
 class ResultsVisualizer:
     """
     Handles all visualization tasks for the Social Network Ads analysis.
+
+    Plots are queued as jobs on a FigureJobPool and rendered headless with
+    the object-oriented Figure API. Without a pool they render inline; in
+    both cases call join() to get the per-plot timing and failure report.
+
+    Inputs with more than max_points rows are drawn as a class-stratified
+    sample; the pairplot adds histograms and density layers of all rows.
     """
-    def __init__(self, output_dir='.'):
+    def __init__(self, output_dir='.', pool=None, max_points=20_000):
         self.output_dir = output_dir
+        self.pool = pool if pool is not None else FigureJobPool(max_workers=0)
+        self.max_points = max_points
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
             print(f"Created output directory: {self.output_dir}")
 
     def _get_save_path(self, filename):
         return os.path.join(self.output_dir, filename)
+
+    def join(self):
+        """Waits for all queued plots and returns the render report."""
+        return self.pool.join()
     
+    def _is_large(self, n_rows):
+        return self.max_points is not None and n_rows > self.max_points
+
     def plot_pairplot(self, df, save_path='pairplot.png'):
         """Plots pairwise relationships in the dataset."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(12, 8))
-        sns.pairplot(df, hue='Purchased')
-        plt.suptitle('Relaciones entre variables y clase objetivo', y=1.02)
-        plt.savefig(full_path)
-        plt.close()
-        print(f"Saved pairplot to {full_path}")
+        if self._is_large(len(df)):
+            # Same columns seaborn would pick: the numeric ones other than the hue
+            columns = [col for col in df.select_dtypes(include='number').columns if col != 'Purchased']
+            summary = pairplot_summary(df, columns, hue='Purchased', max_points=self.max_points)
+            self.pool.submit(save_path, render_density_pairplot, full_path, summary,
+                             'Relaciones entre variables y clase objetivo')
+            return
+        self.pool.submit(save_path, _render_pairplot, full_path, df)
 
     def plot_correlation_matrix(self, df, save_path='correlation_matrix.png'):
         """Plots correlation matrix of numeric features."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(10, 8))
-        numeric_df = df.select_dtypes(include=['int64', 'float64'])
-        correlation = numeric_df.corr()
-        sns.heatmap(correlation, annot=True, cmap='coolwarm', linewidths=0.5)
-        plt.title('Matriz de Correlación')
-        plt.savefig(full_path)
-        plt.close()
-        print(f"Saved correlation matrix to {full_path}")
+        self.pool.submit(save_path, _render_correlation_matrix, full_path,
+                         df.select_dtypes(include='number'))
 
     def plot_confusion_matrix(self, y_true, y_pred, model_name, save_path=None):
         """Plots confusion matrix for a specific model."""
         if save_path is None:
             save_path = f'confusion_matrix_{model_name.lower().replace(" ", "_")}.png'
         full_path = self._get_save_path(save_path)
-            
-        cm = confusion_matrix(y_true, y_pred)
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                    xticklabels=['No Compra', 'Compra'],
-                    yticklabels=['No Compra', 'Compra'])
-        plt.xlabel('Predicción')
-        plt.ylabel('Valor Real')
-        plt.title(f'Matriz de Confusión - {model_name}')
-        plt.savefig(full_path)
-        plt.close()
-        print(f"Saved confusion matrix for {model_name} to {full_path}")
+        self.pool.submit(save_path, _render_confusion_matrix, full_path,
+                         confusion_matrix(y_true, y_pred), model_name)
 
     def plot_model_comparison(self, cv_results, save_path='cross_validation_comparison.png'):
         """Plots bar chart comparing model performance."""
         full_path = self._get_save_path(save_path)
-        cv_df = pd.DataFrame(cv_results)
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='Modelo', y='Accuracy Promedio', data=cv_df, palette='viridis')
-        plt.errorbar(x=range(len(cv_df)), y=cv_df['Accuracy Promedio'],
-                     yerr=cv_df['Desviación Estándar'], fmt='none', color='black', capsize=5)
-        plt.title('Comparación de Modelos - Validación Cruzada')
-        plt.ylim(0.7, 1.0)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.savefig(full_path)
-        plt.close()
-        print(f"Saved comparison plot to {full_path}")
+        self.pool.submit(save_path, _render_model_comparison, full_path, pd.DataFrame(cv_results))
         
-    def plot_decision_boundary(self, model, X, y, title, save_path=None):
-        """Plots decision boundary for 2D data (Age vs EstimatedSalary)."""
+    def plot_decision_boundary(self, model, X, y, title, save_path=None,
+                               pixel_budget=160_000, refine_levels=3, chunk_size=16_384):
+        """
+        Plots decision boundary for 2D data (Age vs EstimatedSalary).
+
+        The mesh resolution is derived from pixel_budget (total grid points).
+        A coarse lattice is predicted first and only cells near the class
+        boundary are refined, quadtree-style, evaluating the model in
+        fixed-size chunks into a preallocated buffer. Failures are reported
+        by join() rather than swallowed.
+        """
         if save_path is None:
             save_path = f'decision_boundary_{title.lower().replace(" ", "_")}.png'
         full_path = self._get_save_path(save_path)
         
         # Ensure we only use the last 2 columns (Age, Salary) for visualization context
         X_vis = X[:, -2:] if X.shape[1] > 2 else X
-        
-        h = 0.02  # step size in the mesh
-        x_min, x_max = X_vis[:, 0].min() - 1, X_vis[:, 0].max() + 1
-        y_min, y_max = X_vis[:, 1].min() - 1, X_vis[:, 1].max() + 1
-        xx, yy = np.meshgrid(np.arange(x_min, x_max, h), np.arange(y_min, y_max, h))
-        
-        try:
-            Z = model.predict(np.c_[xx.ravel(), yy.ravel()])
-            Z = Z.reshape(xx.shape)
-            
-            plt.figure(figsize=(10, 8))
-            plt.contourf(xx, yy, Z, alpha=0.8, cmap=ListedColormap(['#FFAAAA', '#AAFFAA']))
-            
-            scatter = plt.scatter(X_vis[:, 0], X_vis[:, 1], c=y,
-                                  edgecolors='k', cmap=ListedColormap(['#FF0000', '#00FF00']))
-                                  
-            plt.xlim(xx.min(), xx.max())
-            plt.ylim(yy.min(), yy.max())
-            plt.title(title)
-            plt.xlabel('Edad (estandarizada)')
-            plt.ylabel('Salario estimado (estandarizado)')
-            plt.legend(*scatter.legend_elements(), title="Compra")
-            
-            plt.savefig(full_path)
-            plt.close()
-            print(f"Saved decision boundary to {full_path}")
-            
-        except Exception as e:
-            print(f"Could not plot decision boundary for {title}: {e}")
+        y = np.asarray(y)
+        if self._is_large(len(X_vis)):
+            # The regions come from the model, so only the overlaid points need sampling
+            idx = stratified_sample(len(X_vis), self.max_points, strata=y)
+            X_vis, y = X_vis[idx], y[idx]
+        self.pool.submit(save_path, _render_decision_boundary, full_path, model, X_vis,
+                         y, title, pixel_budget, refine_levels, chunk_size)
+
+
+def _render_pairplot(full_path, df):
+    # pairplot builds its own figure; close it explicitly once saved
+    import matplotlib.pyplot as plt
+    grid = sns.pairplot(df, hue='Purchased')
+    grid.figure.suptitle('Relaciones entre variables y clase objetivo', y=1.02)
+    grid.figure.savefig(full_path)
+    plt.close(grid.figure)
+    print(f"Saved pairplot to {full_path}")
+
+
+def _render_correlation_matrix(full_path, numeric_df):
+    fig = mpl_figure.Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    sns.heatmap(numeric_df.corr(), annot=True, cmap='coolwarm', linewidths=0.5, ax=ax)
+    ax.set_title('Matriz de Correlación')
+    fig.savefig(full_path)
+    print(f"Saved correlation matrix to {full_path}")
+
+
+def _render_confusion_matrix(full_path, cm, model_name):
+    fig = mpl_figure.Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax,
+                xticklabels=['No Compra', 'Compra'],
+                yticklabels=['No Compra', 'Compra'])
+    ax.set_xlabel('Predicción')
+    ax.set_ylabel('Valor Real')
+    ax.set_title(f'Matriz de Confusión - {model_name}')
+    fig.savefig(full_path)
+    print(f"Saved confusion matrix for {model_name} to {full_path}")
+
+
+def _render_model_comparison(full_path, cv_df):
+    fig = mpl_figure.Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x='Modelo', y='Accuracy Promedio', data=cv_df, palette='viridis',
+                hue='Modelo', legend=False, ax=ax)
+    ax.errorbar(x=range(len(cv_df)), y=cv_df['Accuracy Promedio'],
+                yerr=cv_df['Desviación Estándar'], fmt='none', color='black', capsize=5)
+    ax.set_title('Comparación de Modelos - Validación Cruzada')
+    ax.set_ylim(0.7, 1.0)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.savefig(full_path)
+    print(f"Saved comparison plot to {full_path}")
+
+
+def _render_decision_boundary(full_path, model, X_vis, y, title, pixel_budget, refine_levels, chunk_size):
+    x_min, x_max = X_vis[:, 0].min() - 1, X_vis[:, 0].max() + 1
+    y_min, y_max = X_vis[:, 1].min() - 1, X_vis[:, 1].max() + 1
+    xs, ys = _adaptive_axes(x_min, x_max, y_min, y_max, pixel_budget, refine_levels)
+    Z = _refined_boundary_grid(model, xs, ys, refine_levels, chunk_size)
+
+    fig = mpl_figure.Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.contourf(xs, ys, Z, alpha=0.8, cmap=mpl_colors.ListedColormap(['#FFAAAA', '#AAFFAA']))
+    scatter = ax.scatter(X_vis[:, 0], X_vis[:, 1], c=y,
+                         edgecolors='k', cmap=mpl_colors.ListedColormap(['#FF0000', '#00FF00']))
+    ax.set_xlim(xs[0], xs[-1])
+    ax.set_ylim(ys[0], ys[-1])
+    ax.set_title(title)
+    ax.set_xlabel('Edad (estandarizada)')
+    ax.set_ylabel('Salario estimado (estandarizado)')
+    ax.legend(*scatter.legend_elements(), title="Compra")
+    fig.savefig(full_path)
+    print(f"Saved decision boundary to {full_path}")
+
+
+def _adaptive_axes(x_min, x_max, y_min, y_max, pixel_budget, refine_levels):
+    """
+    Picks per-axis grid sizes whose product is about pixel_budget, keeping the
+    aspect ratio of the data range. Sizes are rounded to m * 2**levels + 1 so the
+    coarse lattice nests exactly inside the fine one.
+    """
+    stride = 2 ** refine_levels
+    aspect = (x_max - x_min) / (y_max - y_min)
+    n_y = np.sqrt(pixel_budget / aspect)
+    n_x = pixel_budget / n_y
+    n_x = max(1, int(round((n_x - 1) / stride))) * stride + 1
+    n_y = max(1, int(round((n_y - 1) / stride))) * stride + 1
+    return np.linspace(x_min, x_max, n_x), np.linspace(y_min, y_max, n_y)
+
+
+def _predict_chunked(model, xs, ys, rows, cols, out, chunk_size):
+    """Predicts grid points (ys[rows], xs[cols]) in fixed-size chunks into out."""
+    points = np.empty((min(chunk_size, len(rows)), 2))
+    for start in range(0, len(rows), chunk_size):
+        stop = min(start + chunk_size, len(rows))
+        batch = points[:stop - start]
+        batch[:, 0] = xs[cols[start:stop]]
+        batch[:, 1] = ys[rows[start:stop]]
+        out[start:stop] = model.predict(batch)
+    return out
+
+
+def _refined_boundary_grid(model, xs, ys, refine_levels, chunk_size):
+    """
+    Returns the predicted label grid of shape (len(ys), len(xs)).
+
+    Starts on a lattice of stride 2**refine_levels and halves the stride at
+    each level. New points inside cells whose corners (and neighboring cells)
+    all agree inherit that label; only points near the boundary are predicted.
+    """
+    stride = 2 ** refine_levels
+    xs_level, ys_level = xs[::stride], ys[::stride]
+    rows, cols = np.divmod(np.arange(len(ys_level) * len(xs_level)), len(xs_level))
+    Z = np.empty(len(rows), dtype=model.classes_.dtype)
+    Z = _predict_chunked(model, xs_level, ys_level, rows, cols, Z, chunk_size)
+    Z = Z.reshape(len(ys_level), len(xs_level))
+
+    while stride > 1:
+        stride //= 2
+        xs_level, ys_level = xs[::stride], ys[::stride]
+        n_rows, n_cols = len(ys_level), len(xs_level)
+
+        # Cells of the previous lattice whose corners disagree, dilated by one cell
+        mixed = np.zeros((Z.shape[0] + 1, Z.shape[1] + 1), dtype=bool)
+        corner = Z[:-1, :-1]
+        mixed[1:-1, 1:-1] = (corner != Z[1:, :-1]) | (corner != Z[:-1, 1:]) | (corner != Z[1:, 1:])
+        near = mixed[1:-1, 1:-1].copy()
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                near |= mixed[1 + dr:mixed.shape[0] - 1 + dr, 1 + dc:mixed.shape[1] - 1 + dc]
+
+        # Upsample by nearest corner, then re-predict only points in boundary cells
+        cell_r = np.minimum(np.arange(n_rows) // 2, near.shape[0] - 1)
+        cell_c = np.minimum(np.arange(n_cols) // 2, near.shape[1] - 1)
+        Z = Z[np.arange(n_rows) // 2][:, np.arange(n_cols) // 2]
+        todo = near[cell_r][:, cell_c]
+        todo[::2, ::2] = False
+        rows, cols = np.nonzero(todo)
+        if len(rows):
+            Z[rows, cols] = _predict_chunked(
+                model, xs_level, ys_level, rows, cols,
+                np.empty(len(rows), dtype=Z.dtype), chunk_size
+            )
+    return Z
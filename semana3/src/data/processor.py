@@ -1,13 +1,42 @@
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
+from common.columnar import ColumnarTable, drop_missing, load_columnar
+from common.pipeline import ChunkedPipeline, Derive, Scale, Select, Validate, scale_in_place
+from common.profiling import instrument
 
+
+@instrument
 class UserBehaviorDataProcessor:
     """
     Handles loading, cleaning, and preprocessing of the User Behavior dataset.
+
+    With dtype=np.float32 the selected features are copied once into a
+    contiguous float32 buffer that is scaled in place (no float64 copies).
     """
-    def __init__(self, filepath):
+    # Features used for clustering
+    FEATURES = [
+        'Age',
+        'Screen On Time (hours/day)',
+        'Data Usage (MB/day)',
+        'Number of Apps Installed'
+    ]
+    # Columns the pipeline uses, with compact (nullable) dtypes
+    COLUMN_DTYPES = {
+        'User ID': 'Int32',
+        'App Usage Time (min/day)': 'Int16',
+        'Screen On Time (hours/day)': 'float32',
+        'Data Usage (MB/day)': 'Int32',
+        'Number of Apps Installed': 'Int16',
+        'Age': 'Int8'
+    }
+
+    def __init__(self, filepath, columnar=True, verbose=True, dtype=np.float64):
         self.filepath = filepath
+        self.columnar = columnar
+        self.verbose = verbose
+        self.dtype = np.dtype(dtype)
         self.df = None
         self.X = None
         self.X_scaled = None
@@ -15,13 +44,24 @@ class UserBehaviorDataProcessor:
         self.scaler = StandardScaler()
 
     def load_data(self):
-        """Loads data from CSV and prints exploratory info."""
+        """
+        Loads the used columns from CSV with compact dtypes and, if verbose,
+        prints exploratory info. With columnar=True the CSV is converted once
+        to .npy columns that later runs memory-map, and df is a ColumnarTable
+        until preprocess() turns it into a frame.
+        """
         print(f"Loading data from {self.filepath}...")
-        self.df = pd.read_csv(self.filepath)
+        if self.columnar:
+            self.df = load_columnar(self.filepath, self.COLUMN_DTYPES)
+        else:
+            self.df = pd.read_csv(self.filepath, usecols=list(self.COLUMN_DTYPES),
+                                  dtype=self.COLUMN_DTYPES)
         print("Data loaded successfully.")
-        print(self.df.head())
-        print(self.df.info())
-        print(self.df.describe())
+        if self.verbose:
+            df = self.df.to_frame() if isinstance(self.df, ColumnarTable) else self.df
+            print(df.head())
+            print(df.info())
+            print(df.describe())
         return self.df
 
     def preprocess(self):
@@ -34,32 +74,90 @@ class UserBehaviorDataProcessor:
 
         # Validate nulls
         print("\nValidar nulos:")
-        print(self.df.isnull().sum())
+        print(self.df.isna().sum())
 
         # Validate duplicates
         print("\nValidar duplicados:")
-        duplicados_id = self.df.duplicated(subset=['User ID']).sum()
+        duplicados_id = self.df['User ID'].duplicated().sum()
         print(f"Duplicados por User ID: {duplicados_id}")
 
+        # Rows with missing values are dropped; the rest get plain compact dtypes
+        self.df, dropped = drop_missing(self.df)
+        if dropped:
+            print(f"Filas eliminadas por valores nulos: {dropped}")
+
         # Create derived column
-        self.df['App Usage Time (hours/day)'] = self.df['App Usage Time (min/day)'] / 60
+        self.df['App Usage Time (hours/day)'] = (self.df['App Usage Time (min/day)'] / 60).astype('float32')
 
         # Select features for clustering
-        self.selected_variables = [
-            'Age',
-            'Screen On Time (hours/day)',
-            'Data Usage (MB/day)',
-            'Number of Apps Installed'
-        ]
-        self.X = self.df[self.selected_variables]
+        self.selected_variables = list(self.FEATURES)
 
         # Scale features
         print("\nScaling features...")
-        self.X_scaled = self.scaler.fit_transform(self.X)
+        if self.dtype == np.float64:
+            self.X = self.df[self.selected_variables]
+            self.X_scaled = self.scaler.fit_transform(self.X)
+        else:
+            self.X = None
+            self.X_scaled = scale_in_place(self.df, self.selected_variables, self.scaler, self.dtype)
         print(f"Feature matrix shape: {self.X_scaled.shape}")
 
+    def preprocess_chunked(self, chunksize=100_000, out_path=None, exact_duplicates=True):
+        """
+        Out-of-core variant of preprocess(): streams the CSV through
+        validate -> derive -> select -> scale stages and writes the scaled
+        matrix to a memmap, so the full table never has to fit in memory.
+        """
+        self.selected_variables = list(self.FEATURES)
+        pipeline = ChunkedPipeline(
+            stages=[
+                Validate(id_column='User ID', exact=exact_duplicates),
+                Derive({'App Usage Time (hours/day)':
+                        lambda chunk: (chunk['App Usage Time (min/day)'] / 60).astype('float32')}),
+                Select(self.selected_variables),
+                Scale(self.selected_variables, scaler=self.scaler)
+            ],
+            features=self.selected_variables
+        )
+        print("\nScaling features (chunked)...")
+        self.X_scaled, _ = pipeline.fit_transform(
+            self.filepath, usecols=list(self.COLUMN_DTYPES), dtypes=self.COLUMN_DTYPES,
+            chunksize=chunksize, out_path=out_path
+        )
+        return self.X_scaled
+
     def get_scaled_data(self):
         """Returns the scaled feature matrix."""
         if self.X_scaled is None:
             raise ValueError("Data not preprocessed. Call preprocess() first.")
         return self.X_scaled
+
+    def iter_feature_chunks(self, chunksize=100_000):
+        """
+        Streams the CSV in chunks and yields the selected feature columns
+        as float ndarrays, without keeping the full table in memory.
+        """
+        dtypes = {col: self.COLUMN_DTYPES[col] for col in self.FEATURES}
+        for chunk in pd.read_csv(self.filepath, usecols=self.FEATURES, dtype=dtypes,
+                                 chunksize=chunksize):
+            chunk, _ = drop_missing(chunk, self.FEATURES)
+            yield chunk[self.FEATURES].to_numpy(dtype=float)
+
+    def fit_scaler_incremental(self, chunksize=100_000):
+        """Fits the StandardScaler chunk by chunk with partial_fit."""
+        print(f"\nFitting scaler incrementally (chunksize={chunksize})...")
+        self.scaler = StandardScaler()
+        n_rows = 0
+        for X_chunk in self.iter_feature_chunks(chunksize):
+            self.scaler.partial_fit(X_chunk)
+            n_rows += len(X_chunk)
+        self.selected_variables = list(self.FEATURES)
+        print(f"Scaler fitted on {n_rows} rows.")
+        return self.scaler
+
+    def iter_scaled_chunks(self, chunksize=100_000):
+        """Yields scaled feature chunks using the incrementally fitted scaler."""
+        if not hasattr(self.scaler, 'mean_'):
+            raise ValueError("Scaler not fitted. Call fit_scaler_incremental() first.")
+        for X_chunk in self.iter_feature_chunks(chunksize):
+            yield self.scaler.transform(X_chunk)
@@ -2,22 +2,99 @@
 """
 Main entry point for Unsupervised Learning Models Analysis.
 Refactored into Modular + OOP Architecture.
+
+Each phase is a node of a PhaseGraph with explicit inputs and outputs, so
+independent phases (the elbow sweep, KMeans, DBSCAN, PCA and t-SNE all
+need only X_scaled) run concurrently, cached ones are skipped, and the
+critical path is reported at the end.
+
+Subcommands run only the phases they need and import their dependencies
+on first use, so e.g. `cluster` never loads the plotting stack:
+  load     read, clean and scale the dataset
+  cluster  load + KMeans, DBSCAN and the per-cluster statistics; saves the
+           KMeans segmenter and DBSCAN index to artifacts/ for `score`
+  embed    load + PCA and t-SNE embeddings
+  plot     every phase, with figures
+  all      same as plot (default)
+  score    assign new users to the saved segments (options as in score.py)
 """
 
+import argparse
 import os
 import sys
 
-import pandas as pd
-
 # Ensure src is in the python path to find modules if run from root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from semana3.src.data.processor import UserBehaviorDataProcessor
-from semana3.src.models.engine import ClusteringModelEngine
-from semana3.src.utils.visualizer import ClusteringVisualizer
+from common.lazy import imports, report_imports
+from common.profiling import (add_tracing_arguments, finish_tracing_from_args,
+                              start_tracing_from_args)
+
+COMMANDS = ('all', 'load', 'cluster', 'embed', 'plot', 'score')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Unsupervised learning models analysis.")
+    parser.add_argument('command', nargs='?', default='all', choices=COMMANDS,
+                        help="Phases to run (default: all)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Artifact cache directory (default: <project>/.cache)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Retrain everything without reading or writing the cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Invalidate all cached artifacts before running")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Skip the exploratory head/info/describe summaries")
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help="Processes rendering plots in the background (0 renders inline)")
+    parser.add_argument('--max-plot-points', type=int, default=20_000,
+                        help="Above this many rows, plots draw a stratified sample over a density layer")
+    parser.add_argument('--float32', action='store_true',
+                        help="Keep the features in one float32 buffer scaled in place (about half the memory)")
+    parser.add_argument('--streaming-kmeans', action='store_true',
+                        help="Fit KMeans with MiniBatchKMeans over CSV chunks instead of the in-memory matrix")
+    parser.add_argument('--dbscan-eps', type=float, nargs='+', default=None, metavar='EPS',
+                        help="Also run DBSCAN at these eps values, all from one cached neighbor graph")
+    parser.add_argument('--elbow-jobs', type=int, default=None,
+                        help="Processes fitting the elbow sweep's k values in parallel (-1 = all cores)")
+    parser.add_argument('--elbow-warm-start', action='store_true',
+                        help="Seed each k of the elbow sweep from the k-1 centroids (single init per k)")
+    parser.add_argument('--knee-threshold', type=float, default=None,
+                        help="Stop the elbow sweep once inertia improves by less than this fraction")
+    parser.add_argument('--streaming-pca', action='store_true',
+                        help="Fit PCA with IncrementalPCA over CSV chunks instead of the in-memory matrix")
+    parser.add_argument('--fast-tsne', action='store_true',
+                        help="Barnes-Hut t-SNE with early stopping instead of the exact default settings")
+    parser.add_argument('--tsne-sample', type=int, default=None,
+                        help="With --fast-tsne, embed this many rows and place the rest by kNN interpolation")
+    parser.add_argument('--phase-workers', type=int, default=4,
+                        help="Independent phases run concurrently on this many threads (1 = in order)")
+    parser.add_argument('--import-report', action='store_true',
+                        help="List every deferred import with its time and the packages it loaded")
+    add_tracing_arguments(parser)
+    args, extra = parser.parse_known_args(argv)
+    # Anything not recognized here belongs to score.py's own parser
+    if args.command != 'score' and extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.score_args = extra
+    return args
 
 
-def main():
+def score(args):
+    with imports('semana3.src.score'):
+        from semana3.src import score as score_cli
+    status = score_cli.main(score_cli.parse_args(args.score_args))
+    # Segments may be going to stdout, so the report goes to stderr
+    report_imports(args.import_report, file=sys.stderr)
+    return status
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    if args.command == 'score':
+        return score(args)
+
     print("=" * 60)
     print("  UNSUPERVISED LEARNING MODEL ANALYSIS (MODULAR ARCHITECTURE)")
     print("=" * 60)
@@ -25,121 +102,268 @@ def main():
     # --- Configuration ---
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     assets_dir = os.path.join(project_root, "assets")
+    artifacts_dir = os.path.join(project_root, "artifacts")
     dataset_path = os.path.join(project_root, "src", "data", "kaggle", "user_behavior_dataset.csv")
 
     print(f"Project Root: {project_root}")
     print(f"Assets Directory: {assets_dir}")
     print(f"Dataset Path: {dataset_path}")
 
+    plotting = args.command in ('all', 'plot')
+    clustering = plotting or args.command == 'cluster'
+    embedding = plotting or args.command == 'embed'
+    start_tracing_from_args(args)
+    with imports('data processing'):
+        from common.cache import ArtifactCache
+        from common.dag import PhaseGraph
+        from semana3.src.data.processor import UserBehaviorDataProcessor
+    cache = None
+    if not args.no_cache:
+        cache = ArtifactCache(args.cache_dir or os.path.join(project_root, ".cache"))
+        if args.clear_cache:
+            cache.invalidate()
+
     if not os.path.exists(dataset_path):
         print(f"ERROR: Dataset not found at {dataset_path}")
         return
 
+    engine = visualizer = None
+    if clustering or embedding:
+        with imports('models'):
+            from semana3.src.models.engine import ClusteringModelEngine
+        engine = ClusteringModelEngine(cache=cache)
+    if plotting:
+        with imports('visualization'):
+            from common.figures import FigureJobPool
+            from semana3.src.utils.visualizer import ClusteringVisualizer
+        visualizer = ClusteringVisualizer(output_dir=assets_dir, pool=FigureJobPool(args.plot_workers),
+                                          max_points=args.max_plot_points)
+
+    graph = PhaseGraph(max_workers=args.phase_workers, cache=cache)
+
     # --- Phase 1: Data Processing ---
-    print("\n[PHASE 1] Data Processing")
-    processor = UserBehaviorDataProcessor(dataset_path)
-    df = processor.load_data()
-    processor.preprocess()
-    X_scaled = processor.get_scaled_data()
+    def load(path, dtype):
+        processor = UserBehaviorDataProcessor(path, verbose=not args.quiet, dtype=dtype)
+        processor.load_data()
+        processor.preprocess()
+        # preprocess() may replace the frame (dropped rows, derived columns)
+        return processor, processor.df, processor.get_scaled_data()
+
+    graph.add('load', load, ['dataset_path', 'dtype'], ['processor', 'df', 'X_scaled'],
+              title="[PHASE 1] Data Processing")
 
     # --- Phase 2: Exploratory Visualization ---
-    print("\n[PHASE 2] Exploratory Visualization")
-    visualizer = ClusteringVisualizer(output_dir=assets_dir)
-    engine = ClusteringModelEngine()
-
-    # Pairplot of selected variables
-    pairplot_cols = ['Age', 'Screen On Time (hours/day)', 'Data Usage (MB/day)', 'Number of Apps Installed']
-    visualizer.plot_pairplot(df, pairplot_cols)
-
-    # Correlation: App Usage Time vs Screen On Time
-    corr, _ = engine.compute_correlation(
-        df['App Usage Time (hours/day)'],
-        df['Screen On Time (hours/day)']
-    )
-    visualizer.plot_correlation(
-        df,
-        x_col='App Usage Time (hours/day)',
-        y_col='Screen On Time (hours/day)',
-        corr_value=corr
-    )
-
-    # --- Phase 3: KMeans Clustering ---
-    print("\n[PHASE 3] KMeans Clustering")
-    k_range = range(1, 10)
-    inertia = engine.find_optimal_k(X_scaled, k_range)
-    visualizer.plot_elbow_method(k_range, inertia)
-
-    kmeans_labels, kmeans_model = engine.run_kmeans(X_scaled, n_clusters=4)
-    df['KMeans_Cluster'] = kmeans_labels
-
-    visualizer.plot_cluster_scatter(
-        X_scaled, kmeans_labels,
-        title='Segmentación por K-Means (Screen on Time vs Data Usage)',
-        x_label='Screen On Time (escalado)',
-        y_label='Data Usage (escalado)',
-        save_path='segmentacion_kmeans.png'
-    )
-
-    # Centroids in original scale
-    df_centros = engine.get_cluster_centers_real(
-        kmeans_model, processor.scaler, processor.selected_variables
-    )
-    print("\nCentroides de KMeans (escala original):")
-    print(df_centros)
-
-    # Group statistics
-    print("\nEstadísticas por cluster KMeans:")
-    print(df.groupby('KMeans_Cluster')[processor.selected_variables].mean())
-
-    # --- Phase 4: DBSCAN Clustering ---
-    print("\n[PHASE 4] DBSCAN Clustering")
-    dbscan_labels, dbscan_model = engine.run_dbscan(X_scaled, eps=0.6, min_samples=5)
-    df['DBSCAN_Cluster'] = dbscan_labels
-
-    visualizer.plot_cluster_scatter(
-        X_scaled, dbscan_labels,
-        title='Segmentación por DBSCAN (Screen on Time vs Data Usage)',
-        x_label='Screen On Time (escalado)',
-        y_label='Data Usage (escalado)',
-        save_path='segmentacion_dbscan.png'
-    )
-
-    # Group statistics
-    print("\nDistribución de clusters DBSCAN:")
-    print(df['DBSCAN_Cluster'].value_counts())
-    print("\nEstadísticas por cluster DBSCAN:")
-    print(df.groupby('DBSCAN_Cluster')[processor.selected_variables].mean())
-
-    # --- Phase 5: Dimensionality Reduction ---
-    print("\n[PHASE 5] Dimensionality Reduction")
-
-    # PCA
-    X_pca, pca_model = engine.run_pca(X_scaled, n_components=2)
-    df_pca = pd.DataFrame(X_pca, columns=['Componente 1', 'Componente 2'])
-    df_pca['Cluster'] = df['KMeans_Cluster']
-    visualizer.plot_pca_scatter(df_pca)
-
-    componentes = pd.DataFrame(
-        pca_model.components_,
-        columns=processor.selected_variables,
-        index=['Componente 1', 'Componente 2']
-    )
-    visualizer.plot_pca_heatmap(componentes)
-
-    # t-SNE
-    X_tsne = engine.run_tsne(X_scaled, n_components=2, perplexity=30, learning_rate=200)
-    visualizer.plot_tsne(X_tsne, df['KMeans_Cluster'].values)
+    if plotting:
+        # Pairplot of selected variables
+        pairplot_cols = ['Age', 'Screen On Time (hours/day)', 'Data Usage (MB/day)', 'Number of Apps Installed']
+        graph.add('pairplot', lambda df: visualizer.plot_pairplot(df, pairplot_cols), ['df'],
+                  title="[PHASE 2] Exploratory Visualization")
+
+    if clustering:
+        # --- Phase 3: KMeans Clustering ---
+        k_range = range(1, 10)
+
+        def kmeans(X_scaled):
+            return engine.run_kmeans(X_scaled, n_clusters=4)
+
+        def kmeans_streaming(dataset_path, X_scaled):
+            # A processor of its own: streaming refits the scaler, which other phases read concurrently
+            labels, model = engine.run_kmeans_streaming(
+                UserBehaviorDataProcessor(dataset_path, verbose=False), n_clusters=4)
+            if len(labels) != len(X_scaled):
+                raise ValueError(f"Streaming KMeans labeled {len(labels)} rows, the scaled data has "
+                                 f"{len(X_scaled)}; rows with missing values differ between the passes.")
+            return labels, model
+
+        def centroids(kmeans_model, processor):
+            # Centroids in original scale
+            df_centros = engine.get_cluster_centers_real(
+                kmeans_model, processor.scaler, processor.selected_variables
+            )
+            print("\nCentroides de KMeans (escala original):")
+            print(df_centros)
+
+        def elbow(X_scaled, elbow_options):
+            return engine.find_optimal_k(X_scaled, k_range, n_jobs=args.elbow_jobs, **elbow_options)
+
+        graph.add('elbow', elbow, ['X_scaled', 'elbow_options'], ['inertia'], cache=True,
+                  title="[PHASE 3] KMeans Clustering")
+        if args.streaming_kmeans:
+            graph.add('kmeans_streaming', kmeans_streaming, ['dataset_path', 'X_scaled'],
+                      ['kmeans_labels', 'kmeans_model'], cache=True)
+        else:
+            graph.add('kmeans', kmeans, ['X_scaled'], ['kmeans_labels', 'kmeans_model'], cache=True)
+        graph.add('centroids', centroids, ['kmeans_model', 'processor'])
+
+        def save_segmenter(kmeans_model, processor, X_scaled, kmeans_labels):
+            # Lets score.py segment new users without rerunning the pipeline
+            segmenter = engine.build_segmenter(kmeans_model, processor.scaler, processor.selected_variables,
+                                               X_scaled, kmeans_labels)
+            segmenter.save(os.path.join(artifacts_dir, "segmenter.pkl"))
+
+        graph.add('save_segmenter', save_segmenter, ['kmeans_model', 'processor', 'X_scaled', 'kmeans_labels'])
+
+        # --- Phase 4: DBSCAN Clustering ---
+        def dbscan(X_scaled):
+            return engine.run_dbscan(X_scaled, eps=0.6, min_samples=5)
+
+        def dbscan_sweep(X_scaled, dbscan_eps):
+            # One radius-neighbor graph serves the main fit and every eps of the sweep
+            from semana3.src.models.dbscan_graph import DBSCANNeighborGraph
+            neighbor_graph = DBSCANNeighborGraph(max_eps=max(dbscan_eps + [0.6])).fit(X_scaled)
+            labels, model = engine.run_dbscan(X_scaled, eps=0.6, min_samples=5, neighbor_graph=neighbor_graph)
+            print("\nBarrido de eps (min_samples=5):")
+            for eps, eps_labels in neighbor_graph.sweep(dbscan_eps, min_samples=5).items():
+                n_clusters = len(set(eps_labels)) - (1 if -1 in eps_labels else 0)
+                print(f"eps={eps}: {n_clusters} clusters, {(eps_labels == -1).sum()} puntos de ruido")
+            return labels, model
+
+        def save_dbscan_index(dbscan_model, processor, X_scaled):
+            # Lets score.py place new users into DBSCAN clusters and insert them without a refit
+            index = engine.build_dbscan_index(dbscan_model, X_scaled, processor.scaler,
+                                              processor.selected_variables)
+            index.save(os.path.join(artifacts_dir, "dbscan_index.pkl"))
+
+        def cluster_stats(df, processor, kmeans_labels, dbscan_labels):
+            # Group statistics, correlation and cluster sizes for both labelings in one pass
+            profile_cols = processor.selected_variables + ['App Usage Time (hours/day)']
+            labeled = df[profile_cols].assign(KMeans_Cluster=kmeans_labels, DBSCAN_Cluster=dbscan_labels)
+            return engine.profile_clusters(labeled, profile_cols, ['KMeans_Cluster', 'DBSCAN_Cluster'])
+
+        def stats_report(stats, processor):
+            print("\nEstadísticas por cluster KMeans:")
+            print(stats.means('KMeans_Cluster')[processor.selected_variables])
+            print("\nDistribución de clusters DBSCAN:")
+            print(stats.counts('DBSCAN_Cluster'))
+            print("\nEstadísticas por cluster DBSCAN:")
+            print(stats.means('DBSCAN_Cluster')[processor.selected_variables])
+            print("\nMediana y cuartiles por cluster KMeans:")
+            print(stats.quantiles('KMeans_Cluster')[processor.selected_variables])
+
+            # Correlation: App Usage Time vs Screen On Time
+            pair = ('App Usage Time (hours/day)', 'Screen On Time (hours/day)')
+            corr, p_value = stats.correlation().loc[pair], stats.correlation_pvalues().loc[pair]
+            print(f"\nCorrelación de Pearson (App Usage vs Screen On Time): {corr:.4f} (p-value: {p_value:.4e})")
+            return corr
+
+        if args.dbscan_eps:
+            graph.add('dbscan_sweep', dbscan_sweep, ['X_scaled', 'dbscan_eps'], ['dbscan_labels', 'dbscan_model'],
+                      cache=True, title="[PHASE 4] DBSCAN Clustering")
+        else:
+            graph.add('dbscan', dbscan, ['X_scaled'], ['dbscan_labels', 'dbscan_model'], cache=True, version=1,
+                      title="[PHASE 4] DBSCAN Clustering")
+        graph.add('save_dbscan_index', save_dbscan_index, ['dbscan_model', 'processor', 'X_scaled'])
+        graph.add('cluster_stats', cluster_stats, ['df', 'processor', 'kmeans_labels', 'dbscan_labels'],
+                  ['stats'], cache=True)
+        graph.add('stats_report', stats_report, ['stats', 'processor'], ['corr'])
+
+        if plotting:
+            def cluster_scatter(algorithm, save_path):
+                return lambda X_scaled, labels: visualizer.plot_cluster_scatter(
+                    X_scaled, labels,
+                    title=f'Segmentación por {algorithm} (Screen on Time vs Data Usage)',
+                    x_label='Screen On Time (escalado)',
+                    y_label='Data Usage (escalado)',
+                    save_path=save_path
+                )
+
+            graph.add('elbow_plot', lambda inertia: visualizer.plot_elbow_method(k_range, inertia), ['inertia'])
+            graph.add('kmeans_plot', cluster_scatter('K-Means', 'segmentacion_kmeans.png'),
+                      ['X_scaled', 'kmeans_labels'])
+            graph.add('dbscan_plot', cluster_scatter('DBSCAN', 'segmentacion_dbscan.png'),
+                      ['X_scaled', 'dbscan_labels'])
+            graph.add('correlation_plot', lambda df, corr: visualizer.plot_correlation(
+                df,
+                x_col='App Usage Time (hours/day)',
+                y_col='Screen On Time (hours/day)',
+                corr_value=corr
+            ), ['df', 'corr'])
+
+    if embedding:
+        # --- Phase 5: Dimensionality Reduction ---
+        def pca(X_scaled, processor):
+            # PCA: one shared fit feeds the scatter, the loadings heatmap and any t-SNE pre-reduction
+            shared = engine.fit_pca(X_scaled)
+            X_pca, _ = engine.run_pca(X_scaled, n_components=2)
+            return X_pca, shared.loadings(2, processor.selected_variables)
+
+        def pca_streaming(dataset_path, X_scaled):
+            import numpy as np
+            # Own processor, as in kmeans_streaming; the projection is built chunk by chunk too
+            stream = UserBehaviorDataProcessor(dataset_path, verbose=False)
+            shared = engine.fit_pca_streaming(stream)
+            X_pca = np.concatenate(list(shared.transform_chunks(stream.iter_scaled_chunks(), 2)))
+            if len(X_pca) != len(X_scaled):
+                raise ValueError(f"Streaming PCA projected {len(X_pca)} rows, the scaled data has "
+                                 f"{len(X_scaled)}; rows with missing values differ between the passes.")
+            print(f"Varianza explicada: {shared.explained_variance_ratio(2)}")
+            return X_pca, shared.loadings(2, stream.selected_variables)
+
+        if args.streaming_pca:
+            graph.add('pca_streaming', pca_streaming, ['dataset_path', 'X_scaled'], ['X_pca', 'loadings'],
+                      cache=True, title="[PHASE 5] Dimensionality Reduction")
+        else:
+            graph.add('pca', pca, ['X_scaled', 'processor'], ['X_pca', 'loadings'], cache=True,
+                      title="[PHASE 5] Dimensionality Reduction")
+        if args.fast_tsne:
+            graph.add('tsne_fast', lambda X_scaled, tsne_sample: engine.run_tsne_fast(
+                X_scaled, n_components=2, perplexity=30, learning_rate=200, sample_size=tsne_sample
+            )[0], ['X_scaled', 'tsne_sample'], ['X_tsne'], cache=True)
+        else:
+            graph.add('tsne', lambda X_scaled: engine.run_tsne(X_scaled, n_components=2, perplexity=30,
+                                                               learning_rate=200),
+                      ['X_scaled'], ['X_tsne'], cache=True)
+
+        if plotting:
+            def pca_plots(X_pca, loadings, kmeans_labels):
+                import pandas as pd
+                df_pca = pd.DataFrame(X_pca, columns=['Componente 1', 'Componente 2'], copy=False)
+                df_pca['Cluster'] = kmeans_labels
+                visualizer.plot_pca_scatter(df_pca)
+                visualizer.plot_pca_heatmap(loadings)
+
+            graph.add('pca_plots', pca_plots, ['X_pca', 'loadings', 'kmeans_labels'])
+            graph.add('tsne_plot', visualizer.plot_tsne, ['X_tsne', 'kmeans_labels'])
+        else:
+            def print_loadings(loadings):
+                print("\nCargas de los componentes principales:")
+                print(loadings)
+
+            graph.add('loadings_report', print_loadings, ['loadings'])
+
+    values = graph.run({'dataset_path': dataset_path, 'dtype': 'float32' if args.float32 else 'float64',
+                        'tsne_sample': args.tsne_sample, 'dbscan_eps': args.dbscan_eps,
+                        # n_jobs only changes how the sweep runs, not its result, so it is not an input
+                        'elbow_options': {'warm_start': args.elbow_warm_start,
+                                          'knee_threshold': args.knee_threshold}},
+                       keys={'dataset_path': _file_stamp(dataset_path)})
+
+    # Wait for background plots; a failed plot fails the run instead of being lost
+    plot_report = visualizer.join() if visualizer is not None else []
+    graph.report()
+    finish_tracing_from_args(args)
+    report_imports(args.import_report)
 
     # --- Phase 6: Analysis Summary ---
     print("\n[PHASE 6] Analysis Summary")
     print("=" * 60)
-    print(f"Clusters únicos KMeans: {df['KMeans_Cluster'].unique()}")
-    print(f"Clusters únicos DBSCAN: {df['DBSCAN_Cluster'].unique()}")
-    print("=" * 60)
+    if clustering:
+        stats = values['stats']
+        print(f"Clusters únicos KMeans: {stats.labels('KMeans_Cluster')}")
+        print(f"Clusters únicos DBSCAN: {stats.labels('DBSCAN_Cluster')}")
+        print("=" * 60)
     print("  ANALYSIS COMPLETE")
-    print("  Check generated .png files in semana3/assets/ for results.")
+    if visualizer is not None:
+        print("  Check generated .png files in semana3/assets/ for results.")
     print("=" * 60)
+    return 1 if any(entry['status'] == 'failed' for entry in plot_report) else 0
+
+
+def _file_stamp(path):
+    """Stands in for a file's content in phase cache keys: path, size and mtime."""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
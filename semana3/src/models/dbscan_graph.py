@@ -0,0 +1,89 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.cluster import DBSCAN, OPTICS, cluster_optics_dbscan
+from sklearn.neighbors import NearestNeighbors
+
+
+class DBSCANNeighborGraph:
+    """
+    Caches a sparse radius-neighbor graph over the scaled data so DBSCAN can
+    be re-run for any eps <= max_eps and any min_samples without recomputing
+    neighborhoods. Memory stays proportional to the number of neighbor pairs
+    within max_eps (never an n x n matrix).
+    """
+    def __init__(self, max_eps=1.0, algorithm='kd_tree', leaf_size=40, n_jobs=None):
+        self.max_eps = max_eps
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.tree = None
+        self.graph = None
+        self.optics = None
+
+    def fit(self, X_scaled):
+        """Builds the spatial index once and caches the max_eps neighbor graph."""
+        print(f"\nConstruyendo grafo de vecinos ({self.algorithm}, max_eps={self.max_eps})...")
+        self.tree = NearestNeighbors(
+            radius=self.max_eps, algorithm=self.algorithm,
+            leaf_size=self.leaf_size, n_jobs=self.n_jobs
+        ).fit(X_scaled)
+        # Self-distances are kept as explicit zeros so every point counts itself
+        self.graph = self.tree.radius_neighbors_graph(
+            X_scaled, mode='distance', sort_results=True
+        )
+        print(f"Pares de vecinos almacenados: {self.graph.nnz}")
+        return self
+
+    def graph_at(self, eps):
+        """Returns the neighbor graph restricted to distances <= eps."""
+        if self.graph is None:
+            raise ValueError("Graph not built. Call fit() first.")
+        if eps > self.max_eps:
+            raise ValueError(f"eps={eps} exceeds cached max_eps={self.max_eps}.")
+        graph = self.graph
+        keep = graph.data <= eps
+        rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+        row_counts = np.bincount(rows[keep], minlength=graph.shape[0])
+        indptr = np.concatenate([[0], np.cumsum(row_counts)])
+        # Built directly from arrays so explicit zero distances are preserved
+        return csr_matrix((graph.data[keep], graph.indices[keep], indptr), shape=graph.shape)
+
+    def fit_predict(self, eps=0.6, min_samples=5):
+        """Runs DBSCAN for (eps, min_samples) from the cached graph."""
+        model = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed')
+        labels = model.fit_predict(self.graph_at(eps))
+        return labels, model
+
+    def sweep(self, eps_values, min_samples=5):
+        """Returns {eps: labels} for several eps values from the cached graph."""
+        return {eps: self.fit_predict(eps, min_samples)[0] for eps in eps_values}
+
+    def fit_reachability(self, X_scaled, min_samples=5):
+        """
+        Computes an OPTICS reachability ordering bounded by max_eps, so that
+        labels for a whole eps range can be extracted without refitting.
+        """
+        print(f"\nCalculando ordenamiento OPTICS (min_samples={min_samples})...")
+        self.optics = OPTICS(
+            min_samples=min_samples, max_eps=self.max_eps, cluster_method='dbscan',
+            eps=self.max_eps, algorithm=self.algorithm, leaf_size=self.leaf_size,
+            n_jobs=self.n_jobs
+        ).fit(X_scaled)
+        return self.optics
+
+    def labels_from_reachability(self, eps_values):
+        """
+        Extracts DBSCAN-like labels for each eps from the OPTICS ordering.
+        Core points match DBSCAN exactly; border points may differ slightly.
+        """
+        if self.optics is None:
+            raise ValueError("Reachability not computed. Call fit_reachability() first.")
+        return {
+            eps: cluster_optics_dbscan(
+                reachability=self.optics.reachability_,
+                core_distances=self.optics.core_distances_,
+                ordering=self.optics.ordering_,
+                eps=eps
+            )
+            for eps in eps_values
+        }
@@ -0,0 +1,249 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.neighbors import KDTree
+
+
+class _GrowingIndex:
+    """
+    Radius/nearest-neighbor index that accepts appends: a KD-tree over the
+    rows present at the last rebuild plus a small KD-tree over newer rows.
+    Only the small tree is rebuilt on append; both are merged once it
+    outgrows rebuild_fraction of the large one, so appends cost amortized
+    O(rows appended) instead of a full rebuild each time.
+    """
+    def __init__(self, n_features, leaf_size=40, rebuild_fraction=0.25, min_buffer=4096):
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.min_buffer = min_buffer
+        self.trees = [None, None]
+        self.ids = [np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)]
+        self.buffer = np.empty((0, n_features))
+
+    def __len__(self):
+        return len(self.ids[0]) + len(self.ids[1])
+
+    def add(self, points, ids):
+        self.buffer = np.concatenate([self.buffer, points])
+        self.ids[1] = np.concatenate([self.ids[1], ids])
+        if len(self.ids[1]) > max(self.min_buffer, self.rebuild_fraction * len(self.ids[0])):
+            self.rebuild()
+        else:
+            self.trees[1] = KDTree(self.buffer, leaf_size=self.leaf_size) if len(self.buffer) else None
+
+    def rebuild(self):
+        points = self.buffer if self.trees[0] is None else np.concatenate([self.trees[0].data, self.buffer])
+        self.trees = [KDTree(points, leaf_size=self.leaf_size) if len(points) else None, None]
+        self.ids = [np.concatenate(self.ids), self.ids[1][:0]]
+        self.buffer = self.buffer[:0]
+
+    def query_radius(self, X, radius):
+        """(query rows, ids) of every indexed row within radius of each row of X."""
+        rows, ids = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+        for tree, tree_ids in zip(self.trees, self.ids):
+            if tree is None or not len(X):
+                continue
+            neighbors = tree.query_radius(X, radius)
+            rows.append(np.repeat(np.arange(len(X)), [len(n) for n in neighbors]))
+            ids.append(tree_ids[np.concatenate(neighbors).astype(np.intp)])
+        return np.concatenate(rows), np.concatenate(ids)
+
+    def nearest(self, X):
+        """Distance to and id of the nearest indexed row (inf and -1 when empty)."""
+        distances = np.full(len(X), np.inf)
+        ids = np.full(len(X), -1, dtype=np.intp)
+        for tree, tree_ids in zip(self.trees, self.ids):
+            if tree is None or not len(X):
+                continue
+            tree_distances, tree_rows = tree.query(X, k=1)
+            closer = tree_distances[:, 0] < distances
+            distances[closer] = tree_distances[closer, 0]
+            ids[closer] = tree_ids[tree_rows[closer, 0]]
+        return distances, ids
+
+
+class IncrementalDBSCAN:
+    """
+    DBSCAN inference and incremental updates from a fitted sklearn DBSCAN.
+
+    predict() places new (scaled) rows by an eps-radius lookup against the
+    core samples, indexed in a KD-tree: the nearest core within eps gives the
+    cluster, otherwise the row is noise (-1). Nothing is modified.
+
+    insert() adds rows to the clustering as DBSCAN would have seen them:
+    neighbor counts are updated around the new rows only, points that reach
+    min_samples become core, and the clusters touched by new cores are
+    created, extended or merged locally (merges go through a union-find over
+    cluster ids, so no existing label array is rewritten). Noise points next
+    to a new core become border points. A batch therefore costs O(rows
+    inserted) neighborhood queries instead of a refit over all rows; the core
+    partition matches a refit exactly, border points adjacent to several
+    clusters may pick a different one, and merged clusters keep the smallest
+    id, so ids can have gaps.
+
+    mean/scale (from the fitted scaler) are only used by segment_frame() to
+    scale raw feature rows; it inserts them instead of predicting when
+    update is set (nightly segment updates).
+    """
+    def __init__(self, eps=0.6, min_samples=5, features=None, mean=None, scale=None, leaf_size=40,
+                 rebuild_fraction=0.25):
+        self.eps = eps
+        self.min_samples = min_samples
+        self.features = list(features) if features is not None else None
+        self.mean = mean
+        self.scale = scale
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.update = False
+        self.n_inserted = 0
+
+    @classmethod
+    def from_model(cls, model, X_scaled, labels=None, scaler=None, features=None, **kwargs):
+        """Indexes a DBSCAN fitted on X_scaled (its labels_ unless labels are given)."""
+        index = cls(model.eps, model.min_samples, features,
+                    getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None), **kwargs)
+        return index.fit_state(X_scaled, model.labels_ if labels is None else labels,
+                               model.core_sample_indices_)
+
+    def fit_state(self, X_scaled, labels, core_indices):
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        n, n_features = X_scaled.shape
+        self._n = n
+        self._X = X_scaled.copy()
+        self._labels = np.asarray(labels, dtype=np.intp).copy()
+        self._core = np.zeros(n, dtype=bool)
+        self._core[core_indices] = True
+        self._parent = np.arange(self._labels.max() + 1 if n else 0, dtype=np.intp)
+        self._points = _GrowingIndex(n_features, self.leaf_size, self.rebuild_fraction)
+        self._points.add(X_scaled, np.arange(n))
+        self._points.rebuild()
+        # Neighbor counts (self included) are what insertions update
+        self._counts = self._points.trees[0].query_radius(X_scaled, self.eps, count_only=True).astype(np.intp) \
+            if n else np.empty(0, dtype=np.intp)
+        self._cores = _GrowingIndex(n_features, self.leaf_size, self.rebuild_fraction)
+        self._cores.add(X_scaled[self._core], np.flatnonzero(self._core))
+        self._cores.rebuild()
+        return self
+
+    @property
+    def labels_(self):
+        """Current labels of every indexed row (training rows first, then inserted ones)."""
+        return self._resolve(self._labels[:self._n])
+
+    @property
+    def core_sample_indices_(self):
+        return np.flatnonzero(self._core[:self._n])
+
+    def _resolve(self, raw):
+        raw = np.asarray(raw)
+        return np.where(raw >= 0, self._parent[np.maximum(raw, 0)], -1)
+
+    def predict(self, X_scaled):
+        """Cluster of the nearest core sample within eps, or -1 (noise), per row."""
+        distances, cores = self._cores.nearest(np.asarray(X_scaled, dtype=np.float64))
+        labels = self._resolve(self._labels[np.maximum(cores, 0)])
+        return np.where(distances <= self.eps, labels, -1)
+
+    def _append(self, X):
+        """Appends rows to the growing arrays (capacity doubling) and returns their ids."""
+        m = len(X)
+        if self._n + m > len(self._X):
+            capacity = max(2 * len(self._X), self._n + m)
+            self._X = np.resize(self._X, (capacity, self._X.shape[1]))
+            for name in ('_labels', '_core', '_counts'):
+                setattr(self, name, np.resize(getattr(self, name), capacity))
+        ids = np.arange(self._n, self._n + m)
+        self._X[ids] = X
+        self._labels[ids] = -1
+        self._core[ids] = False
+        self._counts[ids] = 0
+        self._n += m
+        return ids
+
+    def _union(self, target, roots):
+        for root in roots:
+            self._parent[self._parent == root] = target
+
+    def insert(self, X_scaled):
+        """Adds (scaled) rows to the clustering and returns their labels."""
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        ids = self._append(X_scaled)
+        self._points.add(X_scaled, ids)
+        self.n_inserted += len(ids)
+
+        # Neighbor counts: the new rows' own, and +1 on every row they fall next to
+        rows, neighbors = self._points.query_radius(X_scaled, self.eps)
+        self._counts[ids] = np.bincount(rows, minlength=len(ids))
+        old = neighbors < ids[0]
+        np.add.at(self._counts, neighbors[old], 1)
+        touched = np.union1d(ids, neighbors[old])
+        seeds = touched[(self._counts[touched] >= self.min_samples) & ~self._core[touched]]
+        self._core[seeds] = True
+        self._cores.add(self._X[seeds], seeds)
+
+        if len(seeds):
+            # Core-core edges around the new cores decide which clusters merge or appear
+            seed_rows, seed_neighbors = self._points.query_radius(self._X[seeds], self.eps)
+            core_edge = self._core[seed_neighbors]
+            nodes, inverse = np.unique(np.concatenate([seeds, seed_neighbors[core_edge]]),
+                                       return_inverse=True)
+            src, dst = inverse[:len(seeds)][seed_rows[core_edge]], inverse[len(seeds):]
+            graph = coo_matrix((np.ones(len(src)), (src, dst)), shape=(len(nodes), len(nodes)))
+            n_components, component = connected_components(graph, directed=False)
+
+            old_cores = self._core[nodes] & ~np.isin(nodes, seeds)
+            existing = pd.DataFrame({'component': component[old_cores],
+                                     'root': self._resolve(self._labels[nodes[old_cores]])})
+            existing = existing.drop_duplicates()
+            target = np.full(n_components, -1, dtype=np.intp)
+            firsts = existing.groupby('component')['root'].min()
+            target[firsts.index.to_numpy()] = firsts.to_numpy()
+            fresh = np.flatnonzero(target < 0)
+            target[fresh] = len(self._parent) + np.arange(len(fresh))
+            self._parent = np.concatenate([self._parent, target[fresh]])
+            merges = existing[existing['root'].to_numpy() != target[existing['component'].to_numpy()]]
+            for component_id, roots in merges.groupby('component')['root']:
+                self._union(target[component_id], roots.to_numpy())
+            self._labels[nodes] = target[component]
+
+            # Noise next to a new core becomes a border point of its cluster
+            border = ~self._core[seed_neighbors] & (self._labels[seed_neighbors] < 0)
+            self._labels[seed_neighbors[border]] = self._labels[seeds[seed_rows[border]]]
+
+        # New non-core rows next to any core are border points
+        noise = (self._labels[ids[rows]] < 0) & self._core[neighbors]
+        self._labels[ids[rows[noise]]] = self._labels[neighbors[noise]]
+        return self._resolve(self._labels[ids])
+
+    def segment_frame(self, df, update=None):
+        """DBSCAN cluster (-1 = noise) of raw rows; update (default: self.update) also inserts them."""
+        update = self.update if update is None else update
+        X = df[self.features].to_numpy(dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        labels = self.insert(X) if update else self.predict(X)
+        return pd.DataFrame({'dbscan_cluster': labels}, index=df.index)
+
+    def print_summary(self, file=None):
+        labels = self.labels_
+        clusters = np.unique(labels[labels >= 0])
+        print(f"DBSCAN index: {self._n} rows ({self.n_inserted} inserted), {len(clusters)} clusters, "
+              f"{int(self._core[:self._n].sum())} core, noise {np.mean(labels < 0):.3f}", file=file)
+
+    # --- Persistence ---
+
+    def save(self, path, file=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Saved DBSCAN index to {path}", file=file)
+        return path
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -1,44 +1,140 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.decomposition import PCA
+from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN
 from sklearn.manifold import TSNE
-from scipy.stats import pearsonr
+from sklearn.neighbors import NearestNeighbors
+
+from common.cache import cached
+from common.profiling import instrument
+from common.shared import preload_in_workers, worker_context
+from semana3.src.models.dbscan_index import IncrementalDBSCAN
+from semana3.src.models.reduction import SharedPCA
+from semana3.src.models.segmenter import CentroidSegmenter
+from semana3.src.models.stats import ClusterStatistics
 
+# Worker processes run this module's task functions
+preload_in_workers(__name__)
 
+
+@instrument
 class ClusteringModelEngine:
     """
     Manages clustering algorithms (KMeans, DBSCAN) and
     dimensionality reduction techniques (PCA, t-SNE).
+
+    With an ArtifactCache, fitted models, labels, embeddings and inertia
+    curves are keyed by the input data and parameters and reused on reruns.
+    PCA is fitted once per dataset and shared by every run_pca call.
     """
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._shared_pca = None
+        self._shared_pca_for = None
 
-    @staticmethod
-    def compute_correlation(series1, series2):
-        """Computes Pearson correlation between two series."""
-        corr, p_value = pearsonr(series1, series2)
-        print(f"Correlación de Pearson: {corr:.4f} (p-value: {p_value:.4e})")
-        return corr, p_value
+    def find_optimal_k(self, X_scaled, k_range=range(1, 10), n_jobs=None, warm_start=False,
+                      knee_threshold=None, return_times=False):
+        """
+        Runs KMeans for each k and returns inertia values for elbow method.
 
-    @staticmethod
-    def find_optimal_k(X_scaled, k_range=range(1, 10)):
-        """Runs KMeans for each k and returns inertia values for elbow method."""
+        - n_jobs: fans independent k values out over a process pool.
+        - warm_start: seeds each k from the centroids of k-1 plus a split of the
+          highest-SSE cluster (single init, so the sweep runs sequentially).
+        - knee_threshold: stops once the relative inertia drop between
+          consecutive k falls below this fraction.
+        - return_times: also returns the wall time (seconds) of each fit;
+          NaN when the curve comes from the cache (only inertia is cached).
+        """
         print("\nCalculando inercia para método del codo...")
-        inertia = []
-        for k in k_range:
-            km = KMeans(n_clusters=k, random_state=42)
-            km.fit(X_scaled)
-            inertia.append(km.inertia_)
+        k_values = list(k_range)
+        measured = {}
+
+        def sweep():
+            inertia, measured['times'] = _elbow_sweep(X_scaled, k_values, n_jobs, warm_start, knee_threshold)
+            return inertia
+
+        inertia = cached(self.cache, 'elbow_inertia', sweep, X_scaled, k_values, warm_start, knee_threshold)
+        times = measured.get('times', [np.nan] * len(inertia))
+
+        if len(inertia) < len(k_values):
+            print(f"Codo detectado: barrido detenido en k={k_values[len(inertia) - 1]}")
+        if 'times' in measured:
+            print(f"Tiempo total del barrido: {sum(times):.2f}s")
+        else:
+            print("Tiempo total del barrido: no medido (inercia en caché)")
+        if return_times:
+            return inertia, times
         return inertia
 
-    @staticmethod
-    def run_kmeans(X_scaled, n_clusters=4):
+    def run_kmeans(self, X_scaled, n_clusters=4):
         """Fits KMeans and returns labels and model."""
         print(f"\nEntrenando KMeans con k={n_clusters}...")
         model = KMeans(n_clusters=n_clusters, random_state=42)
-        labels = model.fit_predict(X_scaled)
+        labels, model = cached(
+            self.cache, 'kmeans',
+            lambda: (model.fit_predict(X_scaled), model),
+            X_scaled, model
+        )
+        print(f"Clusters encontrados: {np.unique(labels)}")
+        return labels, model
+
+    @staticmethod
+    def run_kmeans_streaming(processor, n_clusters=4, chunksize=100_000, n_epochs=1):
+        """
+        Fits MiniBatchKMeans over the processor's CSV chunk by chunk.
+
+        The scaler is fitted incrementally first, then centroids are updated
+        with partial_fit on each scaled chunk, so peak memory is bounded by
+        the chunk size. Returns labels and model like run_kmeans.
+        """
+        print(f"\nEntrenando MiniBatchKMeans en streaming con k={n_clusters}...")
+        processor.fit_scaler_incremental(chunksize)
+        model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42,
+                                batch_size=min(chunksize, 4096), n_init=3)
+        for _ in range(n_epochs):
+            for X_chunk in processor.iter_scaled_chunks(chunksize):
+                # partial_fit needs at least n_clusters rows to initialize
+                if not hasattr(model, 'cluster_centers_') and len(X_chunk) < n_clusters:
+                    continue
+                model.partial_fit(X_chunk)
+
+        # Only the labels (one int per row) are materialized in full
+        labels = np.concatenate([
+            model.predict(X_chunk).astype(np.int32)
+            for X_chunk in processor.iter_scaled_chunks(chunksize)
+        ])
         print(f"Clusters encontrados: {np.unique(labels)}")
         return labels, model
 
+    @staticmethod
+    def profile_clusters(df, features, label_columns, n_partitions=1, n_jobs=None, sketch_size=2048):
+        """
+        Computes counts, means, variances, quantile sketches and the
+        correlation matrix for every labeling in one pass over df. With
+        n_partitions > 1 the rows are split into partitions that are
+        summarized concurrently (NumPy releases the GIL) and merged.
+        """
+        X = df[features].to_numpy(dtype=np.float64)
+        labelings = {col: df[col].to_numpy() for col in label_columns}
+        bounds = np.linspace(0, len(X), max(n_partitions, 1) + 1).astype(int)
+
+        def summarize(i):
+            lo, hi = bounds[i], bounds[i + 1]
+            return ClusterStatistics(features, sketch_size, seed=i).update(
+                X[lo:hi], {col: labels[lo:hi] for col, labels in labelings.items()})
+
+        if n_partitions > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                partials = list(pool.map(summarize, range(n_partitions)))
+        else:
+            partials = [summarize(0)]
+        stats = partials[0]
+        for partial in partials[1:]:
+            stats.merge(partial)
+        return stats
+
     @staticmethod
     def get_cluster_centers_real(model, scaler, columns):
         """Inverse-transforms centroids to original scale and returns DataFrame."""
@@ -48,27 +144,85 @@ class ClusteringModelEngine:
         return df_centros
 
     @staticmethod
-    def run_dbscan(X_scaled, eps=0.6, min_samples=5):
-        """Fits DBSCAN and returns labels and model."""
+    def build_segmenter(model, scaler, columns, X_scaled=None, labels=None, **kwargs):
+        """
+        Inference object assigning new (unscaled) users to the fitted KMeans
+        segments; the training rows set its drift reference.
+        """
+        return CentroidSegmenter.from_kmeans(model, scaler, columns, X_scaled, labels, **kwargs)
+
+    @staticmethod
+    def build_dbscan_index(model, X_scaled, scaler=None, columns=None, **kwargs):
+        """
+        Inference object placing new users into the fitted DBSCAN clusters
+        (or noise) and inserting them incrementally, without a refit.
+        """
+        return IncrementalDBSCAN.from_model(model, X_scaled, scaler=scaler, features=columns, **kwargs)
+
+    def run_dbscan(self, X_scaled, eps=0.6, min_samples=5, neighbor_graph=None):
+        """
+        Fits DBSCAN and returns labels and model.
+        If a fitted DBSCANNeighborGraph is given, neighborhoods are read from
+        its cached sparse graph instead of being recomputed.
+        """
         print(f"\nEntrenando DBSCAN (eps={eps}, min_samples={min_samples})...")
-        model = DBSCAN(eps=eps, min_samples=min_samples)
-        labels = model.fit_predict(X_scaled)
+        if neighbor_graph is not None:
+            labels, model = neighbor_graph.fit_predict(eps, min_samples)
+        else:
+            model = DBSCAN(eps=eps, min_samples=min_samples)
+            labels, model = cached(
+                self.cache, 'dbscan',
+                lambda: (model.fit_predict(X_scaled), model),
+                X_scaled, model
+            )
         n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
         n_noise = list(labels).count(-1)
         print(f"Clusters encontrados: {n_clusters}, Puntos de ruido: {n_noise}")
         return labels, model
 
-    @staticmethod
-    def run_pca(X_scaled, n_components=2):
-        """Fits PCA and returns transformed data and model."""
+    def fit_pca(self, X_scaled, max_components=None):
+        """
+        Returns the SharedPCA fitted on X_scaled, fitting it only the first
+        time (or loading it from the cache). All component counts, loadings
+        and projections are then served from this one decomposition.
+        """
+        # Held by reference so the memo can never match a different array
+        if (self._shared_pca is not None and self._shared_pca_for[0] is X_scaled
+                and self._shared_pca_for[1] == max_components):
+            return self._shared_pca
+        shared = cached(
+            self.cache, 'pca_shared',
+            lambda: SharedPCA(max_components=max_components).fit(X_scaled),
+            X_scaled, {'max_components': max_components}
+        )
+        if shared.scores is None:
+            shared.scores = shared.transform(X_scaled, shared.n_components_)
+        self._shared_pca, self._shared_pca_for = shared, (X_scaled, max_components)
+        return shared
+
+    def run_pca(self, X_scaled, n_components=2):
+        """
+        Returns the n_components projection and a fitted PCA, both sliced
+        from the shared decomposition of X_scaled (no refit per call).
+        """
         print(f"\nAplicando PCA (n_components={n_components})...")
-        pca = PCA(n_components=n_components)
-        X_pca = pca.fit_transform(X_scaled)
+        shared = self.fit_pca(X_scaled)
+        pca = shared.as_pca(n_components)
         print(f"Varianza explicada: {pca.explained_variance_ratio_}")
-        return X_pca, pca
+        return shared.project(n_components), pca
 
     @staticmethod
-    def run_tsne(X_scaled, n_components=2, perplexity=30, learning_rate=200):
+    def fit_pca_streaming(processor, max_components=None, chunksize=100_000):
+        """
+        Fits IncrementalPCA over the processor's CSV chunk by chunk (scaler
+        fitted incrementally first). Project with
+        shared.transform_chunks(processor.iter_scaled_chunks(chunksize), k).
+        """
+        processor.fit_scaler_incremental(chunksize)
+        return SharedPCA(max_components=max_components).fit_incremental(
+            processor.iter_scaled_chunks(chunksize))
+
+    def run_tsne(self, X_scaled, n_components=2, perplexity=30, learning_rate=200):
         """Fits t-SNE and returns transformed data."""
         print(f"\nAplicando t-SNE (perplexity={perplexity}, lr={learning_rate})...")
         tsne = TSNE(
@@ -77,5 +231,186 @@ class ClusteringModelEngine:
             learning_rate=learning_rate,
             random_state=42
         )
-        X_tsne = tsne.fit_transform(X_scaled)
+        X_tsne = cached(self.cache, 'tsne', lambda: tsne.fit_transform(X_scaled), X_scaled, tsne)
         return X_tsne
+
+    def run_tsne_fast(self, X_scaled, n_components=2, perplexity=30, learning_rate=200,
+                      pca_components=None, n_jobs=-1, n_iter_without_progress=50,
+                      min_grad_norm=1e-6, max_iter=None, sample_size=None, n_neighbors=10):
+        """
+        Faster t-SNE path for large n.
+
+        - pca_components: pre-reduces the data with run_pca before embedding.
+        - Barnes-Hut gradients with multi-threaded neighbor search (n_jobs).
+        - Early exit once KL divergence stops improving for
+          n_iter_without_progress iterations or the gradient norm drops
+          below min_grad_norm; max_iter caps the optimization outright.
+        - sample_size: embeds a random subsample only and places the remaining
+          points by distance-weighted kNN interpolation of their neighbors.
+
+        Returns the embedding and a dict with timings and final KL divergence.
+        Only the embedding, KL divergence and iteration count are cached; on
+        a cache hit the timings are NaN.
+        """
+        params = dict(n_components=n_components, perplexity=perplexity,
+                      learning_rate=learning_rate, pca_components=pca_components,
+                      n_iter_without_progress=n_iter_without_progress,
+                      min_grad_norm=min_grad_norm, max_iter=max_iter,
+                      sample_size=sample_size, n_neighbors=n_neighbors)
+        measured = {}
+
+        def embed():
+            X_tsne, info = self._tsne_fast(X_scaled, n_jobs=n_jobs, **params)
+            measured.update((key, info.pop(key)) for key in _TSNE_TIMINGS)
+            return X_tsne, info
+
+        X_tsne, info = cached(self.cache, 'tsne_fast_result', embed, X_scaled, params)
+        return X_tsne, dict(info, **{key: measured.get(key, np.nan) for key in _TSNE_TIMINGS})
+
+    def _tsne_fast(self, X_scaled, n_components, perplexity, learning_rate, pca_components,
+                   n_jobs, n_iter_without_progress, min_grad_norm, max_iter, sample_size,
+                   n_neighbors):
+        start = time.perf_counter()
+        X_input = X_scaled
+        if pca_components is not None and pca_components < X_scaled.shape[1]:
+            X_input, _ = self.run_pca(X_scaled, n_components=pca_components)
+        pca_time = time.perf_counter() - start
+
+        n_samples = X_input.shape[0]
+        if sample_size is not None and sample_size < n_samples:
+            rng = np.random.RandomState(42)
+            sample_idx = np.sort(rng.choice(n_samples, size=sample_size, replace=False))
+        else:
+            sample_idx = np.arange(n_samples)
+
+        print(f"\nAplicando t-SNE rápido (perplexity={perplexity}, lr={learning_rate}, "
+              f"muestras={len(sample_idx)}/{n_samples})...")
+        extra_params = {'max_iter': max_iter} if max_iter is not None else {}
+        tsne = TSNE(
+            n_components=n_components,
+            perplexity=min(perplexity, (len(sample_idx) - 1) / 3),
+            learning_rate=learning_rate,
+            method='barnes_hut',
+            n_iter_without_progress=n_iter_without_progress,
+            min_grad_norm=min_grad_norm,
+            n_jobs=n_jobs,
+            random_state=42,
+            **extra_params
+        )
+        embed_start = time.perf_counter()
+        X_sample_tsne = tsne.fit_transform(X_input[sample_idx])
+        embed_time = time.perf_counter() - embed_start
+
+        interp_start = time.perf_counter()
+        if len(sample_idx) < n_samples:
+            X_tsne = np.empty((n_samples, n_components), dtype=X_sample_tsne.dtype)
+            X_tsne[sample_idx] = X_sample_tsne
+            rest_idx = np.setdiff1d(np.arange(n_samples), sample_idx, assume_unique=True)
+            X_tsne[rest_idx] = _knn_interpolate(
+                X_input[sample_idx], X_sample_tsne, X_input[rest_idx], n_neighbors, n_jobs
+            )
+        else:
+            X_tsne = X_sample_tsne
+        interp_time = time.perf_counter() - interp_start
+
+        info = {
+            'kl_divergence': float(tsne.kl_divergence_),
+            'n_iter': int(tsne.n_iter_),
+            'pca_time': pca_time,
+            'embed_time': embed_time,
+            'interpolation_time': interp_time,
+            'total_time': time.perf_counter() - start,
+        }
+        print(f"KL final: {info['kl_divergence']:.4f} tras {info['n_iter']} iteraciones, "
+              f"tiempo total: {info['total_time']:.2f}s")
+        return X_tsne, info
+
+
+_TSNE_TIMINGS = ('pca_time', 'embed_time', 'interpolation_time', 'total_time')
+
+
+def _elbow_sweep(X_scaled, k_values, n_jobs, warm_start, knee_threshold):
+    """Computes the inertia curve and per-k wall times for find_optimal_k."""
+    inertia, times = [], []
+
+    if warm_start:
+        prev_model = None
+        for k in k_values:
+            start = time.perf_counter()
+            init = _split_worst_cluster(X_scaled, prev_model) \
+                if prev_model is not None and prev_model.n_clusters == k - 1 else None
+            prev_model = _fit_kmeans(X_scaled, k, init)
+            times.append(time.perf_counter() - start)
+            inertia.append(prev_model.inertia_)
+            if _knee_reached(inertia, knee_threshold):
+                break
+    elif n_jobs is not None and n_jobs != 1:
+        max_workers = None if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context()) as pool:
+            futures = [pool.submit(_timed_kmeans_inertia, X_scaled, k) for k in k_values]
+            for future in futures:
+                value, elapsed = future.result()
+                inertia.append(value)
+                times.append(elapsed)
+                if _knee_reached(inertia, knee_threshold):
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    else:
+        for k in k_values:
+            value, elapsed = _timed_kmeans_inertia(X_scaled, k)
+            inertia.append(value)
+            times.append(elapsed)
+            if _knee_reached(inertia, knee_threshold):
+                break
+    return inertia, times
+
+
+def _fit_kmeans(X_scaled, k, init=None):
+    """Fits a single KMeans, optionally from explicit initial centroids."""
+    if init is None:
+        model = KMeans(n_clusters=k, random_state=42)
+    else:
+        model = KMeans(n_clusters=k, init=init, n_init=1, random_state=42)
+    return model.fit(X_scaled)
+
+
+def _timed_kmeans_inertia(X_scaled, k):
+    """Process-pool worker: returns (inertia, wall time) for a cold KMeans fit."""
+    start = time.perf_counter()
+    model = _fit_kmeans(X_scaled, k)
+    return model.inertia_, time.perf_counter() - start
+
+
+def _split_worst_cluster(X_scaled, model):
+    """
+    Builds k initial centroids from a fitted (k-1)-model by adding the point
+    farthest from its centroid inside the cluster with the highest SSE.
+    """
+    centers = model.cluster_centers_
+    labels = model.labels_
+    sq_dist = ((X_scaled - centers[labels]) ** 2).sum(axis=1)
+    sse = np.bincount(labels, weights=sq_dist, minlength=len(centers))
+    worst = np.argmax(sse)
+    members = np.flatnonzero(labels == worst)
+    new_center = X_scaled[members[np.argmax(sq_dist[members])]]
+    return np.vstack([centers, new_center])
+
+
+def _knee_reached(inertia, knee_threshold):
+    """True when the last relative inertia improvement is below the threshold."""
+    if knee_threshold is None or len(inertia) < 2 or inertia[-2] <= 0:
+        return False
+    return (inertia[-2] - inertia[-1]) / inertia[-2] < knee_threshold
+
+
+def _knn_interpolate(X_ref, Y_ref, X_new, n_neighbors=10, n_jobs=None, batch_size=50_000):
+    """Places new points at the inverse-distance weighted mean of their neighbors' embeddings."""
+    nn = NearestNeighbors(n_neighbors=min(n_neighbors, len(X_ref)), n_jobs=n_jobs).fit(X_ref)
+    Y_new = np.empty((len(X_new), Y_ref.shape[1]), dtype=Y_ref.dtype)
+    for start in range(0, len(X_new), batch_size):
+        dist, idx = nn.kneighbors(X_new[start:start + batch_size])
+        weights = 1.0 / np.maximum(dist, 1e-12)
+        weights /= weights.sum(axis=1, keepdims=True)
+        Y_new[start:start + batch_size] = np.einsum('ij,ijk->ik', weights, Y_ref[idx])
+    return Y_new
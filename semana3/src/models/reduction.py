@@ -0,0 +1,136 @@
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+
+
+class SharedPCA:
+    """
+    Fits one PCA decomposition and serves every component count from it.
+
+    The fit keeps the whole spectrum (or max_components of it), so any
+    n_components, explained variance ratio, loadings table or projection of
+    the fitted data is a slice of the cached result instead of a refit. The
+    projection of the fitted data is computed once and handed out as views,
+    so the PCA scatter, the loadings heatmap and the t-SNE pre-reduction
+    share the same numbers.
+
+    For large n the solver avoids a full SVD of the data: 'covariance_eigh'
+    (one pass building the features x features covariance) when keeping the
+    whole spectrum, 'randomized' when max_components truncates it. Data that
+    does not fit in memory is fitted chunk by chunk with fit_incremental().
+    """
+    def __init__(self, max_components=None, svd_solver='auto', large_n=50_000, random_state=42):
+        self.max_components = max_components
+        self.svd_solver = svd_solver
+        self.large_n = large_n
+        self.random_state = random_state
+        self.model = None
+        self.scores = None
+
+    def _solver(self, n_samples, n_features, n_components):
+        if self.svd_solver != 'auto' or n_samples < self.large_n:
+            return self.svd_solver
+        return 'randomized' if n_components < n_features else 'covariance_eigh'
+
+    def fit(self, X_scaled):
+        """Fits the decomposition once and caches the projection of X_scaled."""
+        n_samples, n_features = X_scaled.shape
+        n_components = min(self.max_components or n_features, n_samples, n_features)
+        solver = self._solver(n_samples, n_features, n_components)
+        print(f"\nAjustando PCA compartido ({n_components} componentes, solver={solver})...")
+        self.model = PCA(n_components=n_components, svd_solver=solver,
+                         random_state=self.random_state)
+        self.scores = self.model.fit_transform(X_scaled)
+        return self
+
+    def fit_incremental(self, chunks, batch_size=None):
+        """
+        Fits IncrementalPCA over an iterable of scaled chunks (e.g.
+        processor.iter_scaled_chunks()); peak memory is bounded by the chunk
+        size. Use transform_chunks() afterwards to project the data.
+        """
+        print("\nAjustando PCA incremental por bloques...")
+        model = IncrementalPCA(n_components=self.max_components, batch_size=batch_size)
+        n_rows = 0
+        for X_chunk in chunks:
+            # Every partial_fit call needs at least n_components rows
+            if model.n_components is not None and len(X_chunk) < model.n_components:
+                continue
+            model.partial_fit(X_chunk)
+            n_rows += len(X_chunk)
+        print(f"PCA ajustado sobre {n_rows} filas.")
+        self.model = model
+        self.scores = None
+        return self
+
+    def _check_fitted(self, n_components=None):
+        if self.model is None:
+            raise ValueError("PCA not fitted. Call fit() or fit_incremental() first.")
+        if n_components is not None and n_components > self.model.n_components_:
+            raise ValueError(f"Only {self.model.n_components_} components were kept; "
+                             f"requested {n_components}.")
+
+    @property
+    def n_components_(self):
+        self._check_fitted()
+        return self.model.n_components_
+
+    def explained_variance_ratio(self, n_components=None):
+        """Explained variance ratio of the first n_components (all kept by default)."""
+        self._check_fitted(n_components)
+        return self.model.explained_variance_ratio_[:n_components]
+
+    def components(self, n_components):
+        """Principal axes (n_components x features)."""
+        self._check_fitted(n_components)
+        return self.model.components_[:n_components]
+
+    def loadings(self, n_components, feature_names):
+        """Component weights as a DataFrame indexed 'Componente 1', 'Componente 2', ..."""
+        return pd.DataFrame(
+            self.components(n_components), columns=feature_names,
+            index=[f'Componente {i + 1}' for i in range(n_components)]
+        )
+
+    def project(self, n_components):
+        """Projection of the fitted data onto the first n_components (a view)."""
+        self._check_fitted(n_components)
+        if self.scores is None:
+            raise ValueError("No cached projection; use transform() or transform_chunks().")
+        return self.scores[:, :n_components]
+
+    def transform(self, X_scaled, n_components):
+        """Projects new data onto the first n_components."""
+        self._check_fitted(n_components)
+        model = self.model
+        return (X_scaled - model.mean_) @ model.components_[:n_components].T
+
+    def transform_chunks(self, chunks, n_components):
+        """Yields the projection of each chunk, for data that does not fit in memory."""
+        for X_chunk in chunks:
+            yield self.transform(X_chunk, n_components)
+
+    def as_pca(self, n_components):
+        """A fitted sklearn PCA equivalent to PCA(n_components), sliced from the shared fit."""
+        self._check_fitted(n_components)
+        model = self.model
+        pca = PCA(n_components=n_components)
+        pca.components_ = model.components_[:n_components]
+        pca.explained_variance_ = model.explained_variance_[:n_components]
+        pca.explained_variance_ratio_ = model.explained_variance_ratio_[:n_components]
+        pca.singular_values_ = model.singular_values_[:n_components]
+        pca.mean_ = model.mean_
+        pca.n_components_ = n_components
+        pca.n_features_in_ = model.n_features_in_
+        pca.n_samples_ = getattr(model, 'n_samples_', getattr(model, 'n_samples_seen_', None))
+        # Variance not captured by the kept components, averaged as PCA does
+        remaining = model.explained_variance_[n_components:]
+        pca.noise_variance_ = float(remaining.mean()) if len(remaining) else 0.0
+        if hasattr(model, 'feature_names_in_'):
+            pca.feature_names_in_ = model.feature_names_in_
+        return pca
+
+    def __getstate__(self):
+        # The projection is one matrix product away; keep cached pickles small
+        state = self.__dict__.copy()
+        state['scores'] = None
+        return state
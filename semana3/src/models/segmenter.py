@@ -0,0 +1,255 @@
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class CentroidSegmenter:
+    """
+    Assigns new users to fitted KMeans segments without rerunning the
+    pipeline, from the fitted scaler's mean/scale and the scaled centroids.
+
+    Raw rows are scaled in place in chunk_size blocks and compared with the
+    centroids through ||z||^2 - 2 z.c + ||c||^2, so the inner loop is one
+    BLAS matrix product per chunk. For large k (index='auto' and k >=
+    ivf_min_k, or index='ivf') the centroids are grouped under ~sqrt(k)
+    coarse cells; rows are compared with the coarse cells first and then
+    only with the members of their n_probe nearest cells (approximate).
+
+    Every assignment also yields the distance to the assigned centroid in
+    scaled units. Given the training rows, per-cluster reference shares,
+    mean distances and 99th-percentile distances are kept, and
+    drift_report() compares the rows seen since with them.
+    """
+    def __init__(self, centroids, mean, scale, features, index='auto', ivf_min_k=256, n_probe=2,
+                 chunk_size=65_536, dtype=np.float32, random_state=42):
+        self.features = list(features)
+        self.dtype = np.dtype(dtype)
+        self.centroids = np.asarray(centroids, dtype=self.dtype)
+        self.mean = np.asarray(mean, dtype=self.dtype)
+        self.scale = np.asarray(scale, dtype=self.dtype)
+        self.chunk_size = chunk_size
+        self.n_probe = n_probe
+        self.random_state = random_state
+        self.index = 'ivf' if index == 'auto' and len(self.centroids) >= ivf_min_k else index
+        if self.index == 'auto':
+            self.index = 'exact'
+        if self.index not in ('exact', 'ivf'):
+            raise ValueError(f"Unknown index '{index}'. Use 'auto', 'exact' or 'ivf'.")
+        self._centroids_t = np.ascontiguousarray(self.centroids.T)
+        self._centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        if self.index == 'ivf':
+            self._build_ivf()
+        self.reference = None
+        self.reset_monitor()
+
+    @classmethod
+    def from_kmeans(cls, model, scaler, features, X_scaled=None, labels=None, **kwargs):
+        """
+        Builds a segmenter from a fitted KMeans and StandardScaler. With the
+        scaled training rows (and optionally their labels) it also records
+        the reference statistics used for drift monitoring.
+        """
+        segmenter = cls(model.cluster_centers_, scaler.mean_, scaler.scale_, features, **kwargs)
+        if X_scaled is not None:
+            segmenter.fit_reference(X_scaled, labels)
+        return segmenter
+
+    @property
+    def n_clusters(self):
+        return len(self.centroids)
+
+    def _build_ivf(self):
+        from sklearn.cluster import KMeans
+
+        n_cells = max(2, int(round(np.sqrt(self.n_clusters))))
+        coarse = KMeans(n_clusters=n_cells, n_init=1, random_state=self.random_state).fit(self.centroids)
+        self._coarse_t = np.ascontiguousarray(coarse.cluster_centers_.T.astype(self.dtype))
+        self._coarse_norms = np.einsum('ji,ji->i', self._coarse_t, self._coarse_t)
+        self._cells = []
+        for cell in range(n_cells):
+            members = np.flatnonzero(coarse.labels_ == cell)
+            self._cells.append((members, np.ascontiguousarray(self._centroids_t[:, members]),
+                                self._centroid_norms[members]))
+
+    def _scale(self, X):
+        """Raw feature rows -> scaled float buffer (a copy; the input is untouched)."""
+        Z = np.array(X, dtype=self.dtype, order='C')
+        Z -= self.mean
+        Z /= self.scale
+        return Z
+
+    def _nearest_exact(self, Z, products):
+        """Index of and squared distance (without ||z||^2) to the nearest centroid."""
+        np.matmul(Z, self._centroids_t, out=products)
+        products *= -2
+        products += self._centroid_norms
+        labels = products.argmin(axis=1)
+        return labels, products[np.arange(len(Z)), labels]
+
+    def _nearest_ivf(self, Z):
+        coarse = Z @ self._coarse_t
+        coarse *= -2
+        coarse += self._coarse_norms
+        n_probe = min(self.n_probe, coarse.shape[1])
+        if n_probe < coarse.shape[1]:
+            probes = np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.broadcast_to(np.arange(n_probe), coarse.shape)
+        best = np.full(len(Z), np.inf, dtype=self.dtype)
+        labels = np.zeros(len(Z), dtype=np.intp)
+        for probe in range(n_probe):
+            # Rows grouped by their probe-th cell, one matrix product per cell
+            cells = probes[:, probe]
+            order = np.argsort(cells, kind='stable')
+            bounds = np.searchsorted(cells[order], np.arange(len(self._cells) + 1))
+            for cell, (members, members_t, norms) in enumerate(self._cells):
+                rows = order[bounds[cell]:bounds[cell + 1]]
+                if len(rows) == 0 or len(members) == 0:
+                    continue
+                scores = Z[rows] @ members_t
+                scores *= -2
+                scores += norms
+                nearest = scores.argmin(axis=1)
+                values = scores[np.arange(len(rows)), nearest]
+                better = values < best[rows]
+                best[rows[better]] = values[better]
+                labels[rows[better]] = members[nearest[better]]
+        return labels, best
+
+    def assign(self, X, monitor=True):
+        """
+        Nearest segment and distance to its centroid (scaled units) for raw
+        feature rows (n_samples x n_features, in self.features order).
+        """
+        start = time.perf_counter()
+        X = np.asarray(X)
+        labels = np.empty(len(X), dtype=np.intp)
+        distances = np.empty(len(X), dtype=self.dtype)
+        products = np.empty((min(self.chunk_size, len(X)), self.n_clusters), dtype=self.dtype)
+        for lo in range(0, len(X), self.chunk_size):
+            hi = min(lo + self.chunk_size, len(X))
+            Z = self._scale(X[lo:hi])
+            if self.index == 'ivf':
+                chunk_labels, partial = self._nearest_ivf(Z)
+            else:
+                chunk_labels, partial = self._nearest_exact(Z, products[:hi - lo])
+            partial += np.einsum('ij,ij->i', Z, Z)
+            np.maximum(partial, 0, out=partial)
+            labels[lo:hi] = chunk_labels
+            distances[lo:hi] = np.sqrt(partial)
+        if monitor:
+            self._observe(labels, distances, time.perf_counter() - start)
+        return labels, distances
+
+    def segment_frame(self, df):
+        """Cluster, distance and outlier flag (beyond the cluster's training p99) for raw rows."""
+        labels, distances = self.assign(df[self.features].to_numpy())
+        result = pd.DataFrame({'cluster': labels, 'distance': distances}, index=df.index)
+        if self.reference is not None:
+            result['outlier'] = distances > self.reference['p99_distance'].to_numpy()[labels]
+        return result
+
+    def segment_csv(self, source, output=None, chunksize=100_000, others=()):
+        """
+        Segments a CSV path (or '-' for stdin) chunk by chunk and writes the
+        input rows with cluster, distance and outlier columns to output
+        (stdout by default). others are further segmenters (e.g. a DBSCAN
+        index) whose segment_frame() columns are appended.
+        """
+        source = sys.stdin if source == '-' else source
+        output = sys.stdout if output in (None, '-') else output
+        header = True
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            segmented = pd.concat([chunk, self.segment_frame(chunk)]
+                                  + [other.segment_frame(chunk) for other in others], axis=1)
+            segmented.to_csv(output, header=header, index=False, mode='w' if header else 'a')
+            header = False
+        # Keep stdout clean for the segmented CSV
+        file = sys.stderr if output is sys.stdout else None
+        for other in others:
+            other.print_summary(file=file)
+        return self.print_summary(file=file)
+
+    # --- Drift monitoring ---
+
+    def fit_reference(self, X_scaled, labels=None):
+        """Records per-cluster share, mean and p99 distance of the (scaled) training rows."""
+        X_raw = np.asarray(X_scaled, dtype=np.float64) * self.scale + self.mean
+        assigned, distances = self.assign(X_raw, monitor=False)
+        labels = assigned if labels is None else np.asarray(labels)
+        counts = np.bincount(labels, minlength=self.n_clusters)
+        p99 = np.full(self.n_clusters, np.inf)
+        for cluster in np.flatnonzero(counts):
+            p99[cluster] = np.percentile(distances[labels == cluster], 99)
+        self.reference = pd.DataFrame({
+            'share': counts / max(len(labels), 1),
+            'mean_distance': np.bincount(labels, weights=distances, minlength=self.n_clusters)
+            / np.maximum(counts, 1),
+            'p99_distance': p99
+        })
+        self.reference.index.name = 'cluster'
+        return self.reference
+
+    def reset_monitor(self):
+        self._rows = 0
+        self._seconds = 0.0
+        self._counts = np.zeros(self.n_clusters, dtype=np.int64)
+        self._distance_sums = np.zeros(self.n_clusters)
+        self._outliers = np.zeros(self.n_clusters, dtype=np.int64)
+
+    def _observe(self, labels, distances, seconds):
+        self._rows += len(labels)
+        self._seconds += seconds
+        self._counts += np.bincount(labels, minlength=self.n_clusters)
+        self._distance_sums += np.bincount(labels, weights=distances, minlength=self.n_clusters)
+        if self.reference is not None:
+            beyond = distances > self.reference['p99_distance'].to_numpy()[labels]
+            self._outliers += np.bincount(labels[beyond], minlength=self.n_clusters)
+
+    def drift_report(self):
+        """
+        Per-cluster comparison of the rows assigned since the last reset with
+        the training reference: share, mean distance (and its ratio to the
+        reference) and the share of rows beyond the training p99 distance,
+        which is about 1% without drift.
+        """
+        counts = np.maximum(self._counts, 1)
+        report = pd.DataFrame({
+            'share': self._counts / max(self._rows, 1),
+            'mean_distance': self._distance_sums / counts
+        })
+        report.index.name = 'cluster'
+        if self.reference is not None:
+            report.insert(1, 'share_ref', self.reference['share'])
+            report['mean_distance_ref'] = self.reference['mean_distance']
+            report['distance_ratio'] = report['mean_distance'] / report['mean_distance_ref']
+            report['outlier_rate'] = self._outliers / counts
+        return report
+
+    def print_summary(self, file=None):
+        rate = self._rows / self._seconds if self._seconds > 0 else 0.0
+        print(f"Segmented {self._rows} rows in {self._seconds:.3f}s ({rate:,.0f} rows/s, "
+              f"{self.index} index, k={self.n_clusters})", file=file)
+        print(self.drift_report().to_string(float_format=lambda v: f"{v:.3f}"), file=file)
+        return self.drift_report()
+
+    # --- Persistence ---
+
+    def save(self, path):
+        """Pickles the segmenter (plain arrays only, so loading it needs no scikit-learn)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Saved segmenter to {path}")
+        return path
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            segmenter = pickle.load(f)
+        segmenter.reset_monitor()
+        return segmenter
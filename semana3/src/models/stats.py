@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+from scipy.special import stdtr
+
+
+class ClusterStatistics:
+    """
+    Mergeable summary statistics for cluster profiling.
+
+    One update() pass over a feature matrix and any number of label arrays
+    accumulates row counts, global means and co-moments (for the correlation
+    matrix) and, per labeling and cluster, counts, means, sums of squared
+    deviations and a bottom-k sample sketch for quantiles. Partial results
+    from chunks or partitions combine with merge() (Chan et al. parallel
+    moment updates), so the same code runs in memory, out of core or in
+    parallel and gives the same moments up to floating-point rounding.
+    Quantiles are exact for clusters with at most sketch_size rows.
+    """
+    def __init__(self, features, sketch_size=2048, seed=0):
+        self.features = list(features)
+        self.sketch_size = sketch_size
+        self.rng = np.random.default_rng(seed)
+        self.n = 0
+        self.mean = np.zeros(len(self.features))
+        self.comoment = np.zeros((len(self.features), len(self.features)))
+        self.groups = {}
+
+    def update(self, X, labelings=None):
+        """
+        Folds one chunk into the statistics. X is (n, n_features) in feature
+        order; labelings maps a name (e.g. 'KMeans_Cluster') to labels (n,).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+        chunk = ClusterStatistics(self.features, self.sketch_size)
+        chunk.n = len(X)
+        chunk.mean = X.mean(axis=0)
+        deviations = X - chunk.mean
+        chunk.comoment = deviations.T @ deviations
+        keys = self.rng.random(len(X))
+        for name, labels in (labelings or {}).items():
+            chunk.groups[name] = _group_moments(X, np.asarray(labels), keys, self.sketch_size)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """Combines another partial result (same features) into this one."""
+        if other.features != self.features:
+            raise ValueError("Cannot merge statistics over different features.")
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        for name, group in other.groups.items():
+            mine = self.groups.get(name)
+            self.groups[name] = group if mine is None else _merge_groups(mine, group, self.sketch_size)
+        return self
+
+    @classmethod
+    def from_arrays(cls, X, labelings=None, features=None, chunksize=None, **kwargs):
+        """Accumulates X (and labelings) in one pass, optionally chunk by chunk."""
+        features = features if features is not None else [f"x{i}" for i in range(np.shape(X)[1])]
+        stats = cls(features, **kwargs)
+        chunksize = chunksize or max(len(X), 1)
+        for start in range(0, len(X), chunksize):
+            stop = start + chunksize
+            stats.update(X[start:stop], {name: labels[start:stop]
+                                         for name, labels in (labelings or {}).items()})
+        return stats
+
+    # --- Results ---
+
+    def _group(self, labeling):
+        if labeling not in self.groups:
+            raise KeyError(f"No statistics for labeling '{labeling}'.")
+        return self.groups[labeling]
+
+    def labels(self, labeling):
+        """Distinct labels, sorted (replaces Series.unique())."""
+        return self._group(labeling)['labels'].copy()
+
+    def counts(self, labeling):
+        """Rows per label, largest first (replaces Series.value_counts())."""
+        group = self._group(labeling)
+        counts = pd.Series(group['count'], index=pd.Index(group['labels'], name=labeling), name='count')
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def means(self, labeling):
+        """Per-label feature means (replaces groupby(labeling)[features].mean())."""
+        group = self._group(labeling)
+        return pd.DataFrame(group['mean'], columns=self.features,
+                            index=pd.Index(group['labels'], name=labeling))
+
+    def variances(self, labeling, ddof=1):
+        """Per-label feature variances (NaN where a label has <= ddof rows)."""
+        group = self._group(labeling)
+        dof = (group['count'] - ddof).astype(np.float64)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variances = np.where(dof > 0, group['m2'] / dof, np.nan)
+        return pd.DataFrame(variances, columns=self.features,
+                            index=pd.Index(group['labels'], name=labeling))
+
+    def quantiles(self, labeling, q=(0.25, 0.5, 0.75)):
+        """Per-label feature quantiles from the sample sketch, indexed by (label, q)."""
+        group = self._group(labeling)
+        rows = []
+        for label in group['labels']:
+            sample = group['sketch_values'][group['sketch_labels'] == label]
+            rows.append(np.quantile(sample, q, axis=0))
+        index = pd.MultiIndex.from_product([group['labels'], list(q)], names=[labeling, 'quantile'])
+        return pd.DataFrame(np.concatenate(rows), index=index, columns=self.features)
+
+    def covariance(self, ddof=1):
+        """Feature covariance matrix over all rows."""
+        return pd.DataFrame(self.comoment / max(self.n - ddof, 1),
+                            index=self.features, columns=self.features)
+
+    def correlation(self):
+        """Pearson correlation matrix over all rows."""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.features, columns=self.features)
+
+    def correlation_pvalues(self):
+        """
+        Two-sided p-values of the Pearson correlations (same result as
+        scipy.stats.pearsonr), from t = r * sqrt((n - 2) / (1 - r^2)) with
+        n - 2 degrees of freedom.
+        """
+        r = self.correlation().to_numpy()
+        dof = self.n - 2
+        if dof <= 0:
+            p_values = np.full_like(r, np.nan)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = r * np.sqrt(dof / (1.0 - r ** 2))
+            p_values = np.clip(2 * stdtr(dof, -np.abs(t)), 0.0, 1.0)
+        return pd.DataFrame(p_values, index=self.features, columns=self.features)
+
+
+def _bottom_k(labels, keys, values, k):
+    """Keeps, per label, the k rows with the smallest random keys."""
+    order = np.lexsort((keys, labels))
+    labels, keys, values = labels[order], keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    group_sizes = np.diff(np.r_[starts, len(labels)])
+    rank = np.arange(len(labels)) - np.repeat(starts, group_sizes)
+    keep = rank < k
+    return labels[keep], keys[keep], values[keep]
+
+
+def _factorize(labels):
+    """Sorted distinct labels and each row's index into them (bincount for small int ranges)."""
+    if labels.dtype.kind in 'iub' and len(labels):
+        low, high = int(labels.min()), int(labels.max())
+        if high - low <= 4 * len(labels):
+            offsets = labels.astype(np.int64) - low
+            present = np.flatnonzero(np.bincount(offsets, minlength=high - low + 1))
+            position = np.zeros(high - low + 1, dtype=np.int64)
+            position[present] = np.arange(len(present))
+            return present + low, position[offsets]
+    values, inverse = np.unique(labels, return_inverse=True)
+    return values, inverse.ravel()
+
+
+def _group_moments(X, labels, keys, sketch_size):
+    values, inverse = _factorize(labels)
+    n_groups = len(values)
+    count = np.bincount(inverse, minlength=n_groups)
+    sums = np.column_stack([np.bincount(inverse, weights=X[:, j], minlength=n_groups)
+                            for j in range(X.shape[1])])
+    mean = sums / count[:, None]
+    deviations = X - mean[inverse]
+    m2 = np.column_stack([np.bincount(inverse, weights=deviations[:, j] ** 2, minlength=n_groups)
+                          for j in range(X.shape[1])])
+
+    # Only rows whose key is below a generous per-cluster threshold can be among
+    # its sketch_size smallest; sort just those unless a cluster comes up short
+    threshold = np.minimum(1.0, (sketch_size + 6 * np.sqrt(sketch_size) + 20) / count)
+    candidates = np.flatnonzero(keys < threshold[inverse])
+    if (np.bincount(inverse[candidates], minlength=n_groups) < np.minimum(count, sketch_size)).any():
+        candidates = slice(None)
+    sketch_labels, sketch_keys, sketch_values = _bottom_k(
+        values[inverse[candidates]], keys[candidates], X[candidates], sketch_size)
+    return {'labels': values, 'count': count, 'mean': mean, 'm2': m2,
+            'sketch_labels': sketch_labels, 'sketch_keys': sketch_keys, 'sketch_values': sketch_values}
+
+
+def _aligned(group, labels, n_features):
+    """Group moments expanded to a larger sorted label set (zeros where absent)."""
+    pos = np.searchsorted(labels, group['labels'])
+    count = np.zeros(len(labels), dtype=np.int64)
+    mean = np.zeros((len(labels), n_features))
+    m2 = np.zeros((len(labels), n_features))
+    count[pos], mean[pos], m2[pos] = group['count'], group['mean'], group['m2']
+    return count, mean, m2
+
+
+def _merge_groups(a, b, sketch_size):
+    labels = np.union1d(a['labels'], b['labels'])
+    n_features = a['mean'].shape[1]
+    count_a, mean_a, m2_a = _aligned(a, labels, n_features)
+    count_b, mean_b, m2_b = _aligned(b, labels, n_features)
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    weight = (count_b / count)[:, None]
+    sketch_labels, sketch_keys, sketch_values = _bottom_k(
+        np.concatenate([a['sketch_labels'], b['sketch_labels']]),
+        np.concatenate([a['sketch_keys'], b['sketch_keys']]),
+        np.concatenate([a['sketch_values'], b['sketch_values']]),
+        sketch_size
+    )
+    return {
+        'labels': labels, 'count': count,
+        'mean': mean_a + delta * weight,
+        'm2': m2_a + m2_b + delta ** 2 * (count_a * weight[:, 0])[:, None],
+        'sketch_labels': sketch_labels, 'sketch_keys': sketch_keys, 'sketch_values': sketch_values
+    }
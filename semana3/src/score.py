@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Segmentation entry point for the fitted user-behavior KMeans model.
+Assigns CSV/stdin batches of new users to segments without refitting,
+optionally also to DBSCAN clusters, inserting them into the saved index.
+"""
+
+import argparse
+import os
+import sys
+
+# Ensure src is in the python path to find modules if run from root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from semana3.src.models.segmenter import CentroidSegmenter
+
+
+def parse_args(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    artifacts_dir = os.path.join(project_root, "artifacts")
+    parser = argparse.ArgumentParser(description="Assign new users to the fitted KMeans segments.")
+    parser.add_argument('--artifacts-dir', default=artifacts_dir,
+                        help="Directory with segmenter.pkl (and dbscan_index.pkl)")
+    parser.add_argument('--input', default='-', help="CSV to segment, or '-' for stdin")
+    parser.add_argument('--output', default='-', help="Output CSV, or '-' for stdout")
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--dbscan', action='store_true',
+                        help="Also add the DBSCAN cluster (-1 = noise) of each row")
+    parser.add_argument('--update', action='store_true',
+                        help="With --dbscan, insert the rows into the DBSCAN index and save it back")
+    return parser.parse_args(argv)
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    segmenter_path = os.path.join(args.artifacts_dir, "segmenter.pkl")
+    dbscan_path = os.path.join(args.artifacts_dir, "dbscan_index.pkl")
+    for path in (segmenter_path,) + ((dbscan_path,) if args.dbscan else ()):
+        if not os.path.exists(path):
+            print(f"ERROR: Artifact not found at {path}. Run main.py cluster first.", file=sys.stderr)
+            return 1
+
+    segmenter = CentroidSegmenter.load(segmenter_path)
+    others = []
+    if args.dbscan:
+        # Pulls in scikit-learn's KD-tree, so only imported when asked for
+        from semana3.src.models.dbscan_index import IncrementalDBSCAN
+        index = IncrementalDBSCAN.load(dbscan_path)
+        index.update = args.update
+        others.append(index)
+    segmenter.segment_csv(args.input, args.output, args.chunksize, others)
+    if args.dbscan and args.update:
+        index.update = False
+        index.save(dbscan_path, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,36 @@
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
 
+import numpy as np
 
+from common.density import (annotate_sample, density_grid, draw_density, draw_regression,
+                            linear_fit_summary, pairplot_summary, render_density_pairplot,
+                            stratified_sample)
+from common.figures import FigureJobPool
+from common.lazy import lazy_import
+from common.profiling import instrument
+
+# Plotting libraries load on first render, i.e. only in the processes that draw
+sns = lazy_import('seaborn')
+mpl_figure = lazy_import('matplotlib.figure')
+
+
+@instrument
 class ClusteringVisualizer:
     """
     Handles all visualization tasks for the Clustering analysis.
+
+    Plots are queued as jobs on a FigureJobPool and rendered headless with
+    the object-oriented Figure API. Without a pool they render inline; in
+    both cases call join() to get the per-plot timing and failure report.
+
+    Inputs with more than max_points rows switch to large-data rendering:
+    a cluster-stratified sample drawn over a density layer binned from all
+    rows, and regression lines from full-data summary statistics.
     """
-    def __init__(self, output_dir='.'):
+    def __init__(self, output_dir='.', pool=None, max_points=20_000):
         self.output_dir = output_dir
+        self.pool = pool if pool is not None else FigureJobPool(max_workers=0)
+        self.max_points = max_points
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
             print(f"Created output directory: {self.output_dir}")
@@ -17,81 +38,175 @@ class ClusteringVisualizer:
     def _get_save_path(self, filename):
         return os.path.join(self.output_dir, filename)
 
+    def join(self):
+        """Waits for all queued plots and returns the render report."""
+        return self.pool.join()
+
+    def _is_large(self, n_rows):
+        return self.max_points is not None and n_rows > self.max_points
+
+    def _sampled_scatter(self, x, y, labels):
+        """Cluster-stratified sample of the points plus a density grid of all of them."""
+        if not self._is_large(len(x)):
+            return x, y, labels, None
+        idx = stratified_sample(len(x), self.max_points, strata=labels)
+        sampled_labels = np.asarray(labels)[idx] if labels is not None else None
+        return np.asarray(x)[idx], np.asarray(y)[idx], sampled_labels, density_grid(x, y)
+
     def plot_pairplot(self, df, columns, save_path='pairplot_distribucion.png'):
         """Plots pairwise relationships for selected columns."""
         full_path = self._get_save_path(save_path)
-        sns.pairplot(df[columns])
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved pairplot to {full_path}")
+        if self._is_large(len(df)):
+            summary = pairplot_summary(df, columns, max_points=self.max_points)
+            self.pool.submit(save_path, render_density_pairplot, full_path, summary)
+            return
+        self.pool.submit(save_path, _render_pairplot, full_path, df[columns])
 
     def plot_correlation(self, df, x_col, y_col, corr_value, save_path='correlacion_app_vs_screen_time.png'):
         """Plots regression plot with correlation annotation."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(8, 6))
-        sns.regplot(x=x_col, y=y_col, data=df,
-                    scatter_kws={'alpha': 0.5}, line_kws={'color': 'red'})
-        plt.title(f'Redundancia: App vs Screen Time (Correlación: {corr_value:.2f})')
-        plt.xlabel('Tiempo en Apps (Horas)')
-        plt.ylabel('Tiempo de Pantalla (Horas)')
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved correlation plot to {full_path}")
+        if self._is_large(len(df)):
+            x, y = df[x_col].to_numpy(), df[y_col].to_numpy()
+            fit = linear_fit_summary(x, y)
+            x_sample, y_sample, _, density = self._sampled_scatter(x, y, None)
+            self.pool.submit(save_path, _render_correlation_density, full_path, x_sample, y_sample,
+                             density, fit, x_col, y_col, corr_value)
+            return
+        self.pool.submit(save_path, _render_correlation, full_path, df[[x_col, y_col]],
+                         x_col, y_col, corr_value)
 
     def plot_elbow_method(self, k_range, inertia, save_path='metodo_del_codo_kmeans.png'):
         """Plots elbow method line chart."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(8, 5))
-        plt.plot(list(k_range), inertia, marker='o')
-        plt.xlabel('Número de Clusters')
-        plt.ylabel('Inercia')
-        plt.title('Método del Codo para K-Means')
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved elbow method plot to {full_path}")
+        # The sweep may stop early at the knee, so only plot the evaluated k values
+        self.pool.submit(save_path, _render_elbow, full_path, list(k_range)[:len(inertia)], list(inertia))
 
     def plot_cluster_scatter(self, X, labels, title, x_label, y_label, save_path):
         """Plots scatter plot colored by cluster labels."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(10, 6))
-        sns.scatterplot(x=X[:, 1], y=X[:, 2], hue=labels, palette='tab10')
-        plt.title(title)
-        plt.xlabel(x_label)
-        plt.ylabel(y_label)
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved cluster scatter to {full_path}")
+        x, y, labels, density = self._sampled_scatter(X[:, 1], X[:, 2], labels)
+        self.pool.submit(save_path, _render_cluster_scatter, full_path, x, y, labels,
+                         title, x_label, y_label, density)
 
     def plot_pca_scatter(self, df_pca, save_path='visualizacion_pca_kmeans.png'):
         """Plots PCA 2D scatter colored by cluster."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(10, 6))
-        sns.scatterplot(x='Componente 1', y='Componente 2', hue='Cluster',
-                        data=df_pca, palette='tab10')
-        plt.title('Visualización PCA (Dimensiones comprimidas en 2)')
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved PCA scatter to {full_path}")
+        if self._is_large(len(df_pca)):
+            x, y, labels, density = self._sampled_scatter(
+                df_pca['Componente 1'].to_numpy(), df_pca['Componente 2'].to_numpy(),
+                df_pca['Cluster'].to_numpy())
+            self.pool.submit(save_path, _render_cluster_scatter, full_path, x, y, labels,
+                             'Visualización PCA (Dimensiones comprimidas en 2)',
+                             'Componente 1', 'Componente 2', density)
+            return
+        self.pool.submit(save_path, _render_pca_scatter, full_path, df_pca)
 
     def plot_pca_heatmap(self, components_df, save_path='heatmap_componentes_pca.png'):
         """Plots heatmap of PCA component weights."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(10, 2))
-        sns.heatmap(components_df, annot=True, cmap='coolwarm')
-        plt.title('¿Qué significan los ejes del PCA?')
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved PCA heatmap to {full_path}")
+        self.pool.submit(save_path, _render_pca_heatmap, full_path, components_df)
 
     def plot_tsne(self, X_tsne, labels, save_path='visualizacion_tsne_kmeans.png'):
         """Plots t-SNE scatter colored by cluster labels."""
         full_path = self._get_save_path(save_path)
-        plt.figure(figsize=(10, 6))
-        plt.scatter(X_tsne[:, 0], X_tsne[:, 1], c=labels, cmap='tab10')
-        plt.title('Visualización t-SNE de Clusters K-Means')
-        plt.colorbar(label='Cluster')
-        plt.savefig(full_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        print(f"Saved t-SNE plot to {full_path}")
+        x, y, labels, density = self._sampled_scatter(X_tsne[:, 0], X_tsne[:, 1], labels)
+        self.pool.submit(save_path, _render_tsne, full_path, x, y, labels, density)
+
+
+def _save(fig, full_path, what):
+    fig.savefig(full_path, dpi=150, bbox_inches='tight')
+    print(f"Saved {what} to {full_path}")
+
+
+def _render_pairplot(full_path, df):
+    # pairplot builds its own figure; close it explicitly once saved
+    import matplotlib.pyplot as plt
+    grid = sns.pairplot(df)
+    _save(grid.figure, full_path, "pairplot")
+    plt.close(grid.figure)
+
+
+def _render_correlation(full_path, df, x_col, y_col, corr_value):
+    fig = mpl_figure.Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.regplot(x=x_col, y=y_col, data=df, ax=ax,
+                scatter_kws={'alpha': 0.5}, line_kws={'color': 'red'})
+    ax.set_title(f'Redundancia: App vs Screen Time (Correlación: {corr_value:.2f})')
+    ax.set_xlabel('Tiempo en Apps (Horas)')
+    ax.set_ylabel('Tiempo de Pantalla (Horas)')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    _save(fig, full_path, "correlation plot")
+
+
+def _render_correlation_density(full_path, x, y, density, fit, x_col, y_col, corr_value):
+    fig = mpl_figure.Figure(figsize=(9, 6))
+    ax = fig.subplots()
+    draw_density(ax, density)
+    ax.scatter(x, y, s=3, alpha=0.3, color='tab:blue', rasterized=True)
+    draw_regression(ax, fit)
+    annotate_sample(ax, len(x), density['n'])
+    ax.set_title(f'Redundancia: App vs Screen Time (Correlación: {corr_value:.2f})')
+    ax.set_xlabel('Tiempo en Apps (Horas)')
+    ax.set_ylabel('Tiempo de Pantalla (Horas)')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    _save(fig, full_path, "correlation density plot")
+
+
+def _render_elbow(full_path, k_values, inertia):
+    fig = mpl_figure.Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    ax.plot(k_values, inertia, marker='o')
+    ax.set_xlabel('Número de Clusters')
+    ax.set_ylabel('Inercia')
+    ax.set_title('Método del Codo para K-Means')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    _save(fig, full_path, "elbow method plot")
+
+
+def _render_cluster_scatter(full_path, x, y, labels, title, x_label, y_label, density=None):
+    fig = mpl_figure.Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if density is None:
+        sns.scatterplot(x=x, y=y, hue=labels, palette='tab10', ax=ax)
+    else:
+        draw_density(ax, density)
+        sns.scatterplot(x=x, y=y, hue=labels, palette='tab10', ax=ax, s=6,
+                        alpha=0.6, linewidth=0, rasterized=True)
+        ax.legend(loc='lower right')
+        annotate_sample(ax, len(x), density['n'])
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    _save(fig, full_path, "cluster scatter")
+
+
+def _render_pca_scatter(full_path, df_pca):
+    fig = mpl_figure.Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.scatterplot(x='Componente 1', y='Componente 2', hue='Cluster',
+                    data=df_pca, palette='tab10', ax=ax)
+    ax.set_title('Visualización PCA (Dimensiones comprimidas en 2)')
+    _save(fig, full_path, "PCA scatter")
+
+
+def _render_pca_heatmap(full_path, components_df):
+    fig = mpl_figure.Figure(figsize=(10, 2))
+    ax = fig.subplots()
+    sns.heatmap(components_df, annot=True, cmap='coolwarm', ax=ax)
+    ax.set_title('¿Qué significan los ejes del PCA?')
+    _save(fig, full_path, "PCA heatmap")
+
+
+def _render_tsne(full_path, x, y, labels, density=None):
+    fig = mpl_figure.Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if density is None:
+        scatter = ax.scatter(x, y, c=labels, cmap='tab10')
+    else:
+        # Density layer drawn without its own colorbar so the cluster colorbar stays readable
+        draw_density(ax, density, colorbar=False)
+        scatter = ax.scatter(x, y, c=labels, cmap='tab10', s=4, alpha=0.6, rasterized=True)
+        annotate_sample(ax, len(x), density['n'])
+    ax.set_title('Visualización t-SNE de Clusters K-Means')
+    fig.colorbar(scatter, ax=ax, label='Cluster')
+    _save(fig, full_path, "t-SNE plot")
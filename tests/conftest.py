@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Same import root as the entry points (common, semana2, semana3)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,65 @@
+import pickle
+
+import numpy as np
+
+from common.cache import ArtifactCache
+from semana2.src.models.engine import SupervisedModelEngine
+from semana3.src.models.engine import ClusteringModelEngine
+
+
+def _blobs(n=150, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0, 0], [5, 5], [0, 5]])
+    return np.concatenate([rng.normal(c, 0.5, size=(n // 3, 2)) for c in centers])
+
+
+def test_get_put_roundtrip(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    key = ArtifactCache.make_key('test', np.arange(5), {'a': 1})
+    assert cache.get(key, 'miss') == 'miss'
+    cache.put(key, [1, 2, 3])
+    assert cache.get(key) == [1, 2, 3]
+    assert key == ArtifactCache.make_key('test', np.arange(5), {'a': 1})
+    assert key != ArtifactCache.make_key('test', np.arange(6), {'a': 1})
+
+
+def test_stale_entry_is_a_miss_and_dropped(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    key = ArtifactCache.make_key('test', 1)
+    # Protocol-0 pickle of a class from a module that no longer exists
+    with open(cache._path(key), 'wb') as f:
+        f.write(b"cmissing_module\nRemovedClass\n.")
+    assert cache.get(key, 'miss') == 'miss'
+    assert not cache.contains(key)
+
+
+def test_elbow_cache_hit_has_no_timings(tmp_path):
+    engine = ClusteringModelEngine(cache=ArtifactCache(str(tmp_path)))
+    X = _blobs()
+    inertia, times = engine.find_optimal_k(X, range(1, 5), return_times=True)
+    assert np.all(np.isfinite(times))
+    cached_inertia, cached_times = engine.find_optimal_k(X, range(1, 5), return_times=True)
+    np.testing.assert_allclose(cached_inertia, inertia)
+    assert np.all(np.isnan(cached_times))
+
+
+def test_tsne_fast_cache_hit_has_no_timings(tmp_path):
+    engine = ClusteringModelEngine(cache=ArtifactCache(str(tmp_path)))
+    X = _blobs(90)
+    embedding, info = engine.run_tsne_fast(X, perplexity=10, max_iter=250, n_jobs=1)
+    assert info['total_time'] > 0
+    cached_embedding, cached_info = engine.run_tsne_fast(X, perplexity=10, max_iter=250, n_jobs=1)
+    np.testing.assert_array_equal(cached_embedding, embedding)
+    assert cached_info['kl_divergence'] == info['kl_divergence']
+    assert all(np.isnan(cached_info[key]) for key in ('pca_time', 'embed_time', 'total_time'))
+
+
+def test_cross_validation_cache_hit_has_no_timings(tmp_path):
+    X = _blobs()
+    y = (X[:, 0] > 2.5).astype(int)
+    cache = ArtifactCache(str(tmp_path))
+    fresh = SupervisedModelEngine(cache=cache).run_cross_validation(X, y)
+    reused = SupervisedModelEngine(cache=cache).run_cross_validation(X, y)
+    for a, b in zip(fresh, reused):
+        np.testing.assert_array_equal(a['Scores'], b['Scores'])
+        assert np.all(np.isfinite(a['Fit (s)'])) and np.all(np.isnan(b['Fit (s)']))
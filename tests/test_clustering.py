@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN, KMeans
+from sklearn.preprocessing import StandardScaler
+
+from semana3.src.models.dbscan_index import IncrementalDBSCAN
+from semana3.src.models.engine import ClusteringModelEngine
+from semana3.src.models.segmenter import CentroidSegmenter
+from semana3.src.models.stats import ClusterStatistics
+
+
+def _blobs(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0, 0], [4, 4], [0, 4], [4, 0]])
+    X = np.concatenate([rng.normal(c, 0.6, size=(n // 4, 2)) for c in centers])
+    return X[rng.permutation(len(X))]
+
+
+def _same_partition(a, b):
+    """True when two labelings group the rows identically (up to renaming)."""
+    pairs = set(zip(a.tolist(), b.tolist()))
+    return len(pairs) == len(set(a.tolist())) == len(set(b.tolist()))
+
+
+def test_incremental_dbscan_matches_refit():
+    X = _blobs()
+    eps, min_samples = 0.5, 5
+    first = X[:300]
+    index = IncrementalDBSCAN.from_model(DBSCAN(eps=eps, min_samples=min_samples).fit(first), first)
+    for start in range(300, len(X), 60):
+        index.insert(X[start:start + 60])
+
+    refit = DBSCAN(eps=eps, min_samples=min_samples).fit(X)
+    labels = index.labels_
+    np.testing.assert_array_equal(index.core_sample_indices_, refit.core_sample_indices_)
+    core = refit.core_sample_indices_
+    assert _same_partition(labels[core], refit.labels_[core])
+    # Border points may join a different neighboring cluster, but never become noise
+    np.testing.assert_array_equal(labels < 0, refit.labels_ < 0)
+
+
+def test_incremental_dbscan_predict_does_not_modify():
+    X = _blobs()
+    model = DBSCAN(eps=0.5, min_samples=5).fit(X)
+    index = IncrementalDBSCAN.from_model(model, X)
+    predicted = index.predict(X[model.core_sample_indices_])
+    np.testing.assert_array_equal(predicted, model.labels_[model.core_sample_indices_])
+    assert index.predict([[50.0, 50.0]])[0] == -1
+    np.testing.assert_array_equal(index.labels_, model.labels_)
+
+
+def test_statistics_merge_matches_single_pass():
+    X = _blobs()
+    labels = {'a': np.arange(len(X)) % 3, 'b': (X[:, 0] > 2).astype(int)}
+    features = ['x', 'y']
+    single = ClusterStatistics.from_arrays(X, labels, features)
+
+    bounds = [0, 100, 101, 350, len(X)]
+    merged = ClusterStatistics(features)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        partial = ClusterStatistics(features, seed=lo).update(
+            X[lo:hi], {name: values[lo:hi] for name, values in labels.items()})
+        merged.merge(partial)
+
+    assert merged.n == single.n == len(X)
+    np.testing.assert_allclose(merged.covariance(), single.covariance())
+    np.testing.assert_allclose(merged.correlation(), single.correlation())
+    for name, values in labels.items():
+        pd.testing.assert_series_equal(merged.counts(name), single.counts(name))
+        pd.testing.assert_frame_equal(merged.means(name), single.means(name))
+        pd.testing.assert_frame_equal(merged.variances(name), single.variances(name))
+        # Clusters below sketch_size keep every row, so quantiles are exact either way
+        pd.testing.assert_frame_equal(merged.quantiles(name), single.quantiles(name))
+        expected = pd.DataFrame(X, columns=features).groupby(values).var()
+        np.testing.assert_allclose(merged.variances(name).to_numpy(), expected.to_numpy())
+
+
+def test_profile_clusters_partitions_match_one_pass():
+    X = _blobs()
+    df = pd.DataFrame(X, columns=['x', 'y']).assign(cluster=np.arange(len(X)) % 4)
+    one = ClusteringModelEngine.profile_clusters(df, ['x', 'y'], ['cluster'])
+    parts = ClusteringModelEngine.profile_clusters(df, ['x', 'y'], ['cluster'], n_partitions=3, n_jobs=3)
+    pd.testing.assert_frame_equal(parts.means('cluster'), one.means('cluster'))
+    np.testing.assert_allclose(parts.correlation(), one.correlation())
+
+
+def test_segmenter_assigns_like_kmeans():
+    X_raw = _blobs() * [10, 1000] + [30, 500]
+    scaler = StandardScaler().fit(X_raw)
+    X = scaler.transform(X_raw)
+    model = KMeans(n_clusters=4, n_init=3, random_state=0).fit(X)
+    segmenter = CentroidSegmenter.from_kmeans(model, scaler, ['x', 'y'], X, model.labels_, dtype=np.float64)
+    labels, _ = segmenter.assign(X_raw)
+    np.testing.assert_array_equal(labels, model.predict(X))
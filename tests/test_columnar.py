@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from common.columnar import ColumnarTable, drop_missing, load_columnar
+
+DTYPES = {'id': 'Int32', 'kind': 'category', 'score': 'float32', 'count': 'Int16'}
+
+
+def _write_csv(path):
+    pd.DataFrame({
+        'id': [1, 2, 3, 4, 5],
+        'kind': ['a', 'b', None, 'a', 'b'],
+        'score': [0.5, None, 1.5, 2.0, 2.5],
+        'count': [10, 20, 30, None, 50],
+        'unused': list('vwxyz'),
+    }).to_csv(path, index=False)
+
+
+def test_table_matches_csv_on_every_load(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    _write_csv(path)
+    expected = pd.read_csv(path, usecols=list(DTYPES), dtype=DTYPES)[list(DTYPES)]
+    # The first load parses and stores, the second memory-maps the store
+    for _ in range(2):
+        table = load_columnar(path, DTYPES, store_dir=str(tmp_path / 'store'))
+        assert isinstance(table, ColumnarTable)
+        pd.testing.assert_frame_equal(table.to_frame(), expected)
+        pd.testing.assert_frame_equal(table.isna(), expected.isna())
+        pd.testing.assert_series_equal(table['count'], expected['count'])
+
+
+def test_drop_missing_keeps_memory_maps_when_nothing_is_dropped(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    _write_csv(path)
+    store = str(tmp_path / 'store')
+    load_columnar(path, DTYPES, store_dir=store)
+    table = load_columnar(path, DTYPES, store_dir=store)
+
+    df, dropped = drop_missing(table, ['id'])
+    assert dropped == 0
+    assert df['id'].dtype == np.int32
+    assert np.shares_memory(df['id'].to_numpy(), table._values['id'])
+    # Columns that were not checked keep their missing values
+    assert df['count'].dtype == 'Int16' and df['count'].isna().sum() == 1
+
+    df, dropped = drop_missing(table)
+    assert dropped == 3
+    assert df['id'].tolist() == [1, 5]
+    assert df['count'].dtype == np.int16 and df['count'].tolist() == [10, 50]
+    assert df['kind'].tolist() == ['a', 'b']
+
+
+def test_drop_missing_on_table_matches_frame(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    _write_csv(path)
+    table = load_columnar(path, DTYPES, store_dir=str(tmp_path / 'store'))
+    for columns in (None, ['count'], ['kind', 'score']):
+        from_table, n_table = drop_missing(table, columns)
+        from_frame, n_frame = drop_missing(table.to_frame(), columns)
+        assert n_table == n_frame
+        pd.testing.assert_frame_equal(from_table, from_frame)
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from common.cache import ArtifactCache
+from common.dag import PhaseGraph
+
+
+def test_outputs_flow_and_print_in_declaration_order(capsys):
+    release = threading.Event()
+
+    def slow(x):
+        release.wait(5)
+        print("slow")
+        return x + 1
+
+    def fast(x):
+        print("fast")
+        release.set()
+        return x * 2
+
+    graph = PhaseGraph(max_workers=2)
+    graph.add('slow', slow, ['x'], ['a'], title="[A]")
+    graph.add('fast', fast, ['x'], ['b'], title="[B]")
+    graph.add('total', lambda a, b: a + b, ['a', 'b'], ['total'])
+    values = graph.run({'x': 3})
+
+    assert values['total'] == 3 + 1 + 3 * 2
+    # 'fast' finished first but its output still follows 'slow''s
+    assert capsys.readouterr().out == "\n[A]\nslow\n\n[B]\nfast\n"
+
+
+def test_cached_nodes_are_skipped_until_an_input_changes(tmp_path, capsys):
+    calls = []
+
+    def build(cache):
+        graph = PhaseGraph(cache=cache)
+        graph.add('square', lambda x: calls.append(x) or x * x, ['x'], ['y'], cache=True, title="[SQ]")
+        graph.add('report', lambda y: print(f"y={y}"), ['y'])
+        return graph
+
+    cache = ArtifactCache(str(tmp_path), verbose=False)
+    assert build(cache).run({'x': 4})['y'] == 16
+    graph = build(cache)
+    assert graph.run({'x': 4})['y'] == 16
+    assert graph.records['square']['status'] == 'cached'
+    assert "[SQ]\n[cache] Reusing outputs of phase 'square'" in capsys.readouterr().out
+    assert build(cache).run({'x': 5})['y'] == 25
+    assert calls == [4, 5]
+
+
+def test_failure_stops_dependents_and_is_raised():
+    graph = PhaseGraph()
+    graph.add('boom', lambda x: 1 / 0, ['x'], ['y'])
+    graph.add('after', lambda y: y, ['y'], ['z'])
+    with pytest.raises(ZeroDivisionError):
+        graph.run({'x': 1})
+    assert graph.records['boom']['status'] == 'failed'
+    assert graph.records['after']['status'] == 'skipped'
+
+
+def test_declaration_errors():
+    graph = PhaseGraph()
+    graph.add('a', lambda: 1, [], ['y'])
+    with pytest.raises(ValueError):
+        graph.add('b', lambda: 2, [], ['y'])
+    graph.add('c', lambda missing: missing, ['missing'], ['z'])
+    with pytest.raises(ValueError):
+        graph.run({})
@@ -0,0 +1,81 @@
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from common.pipeline import ChunkedPipeline, Derive, Encode, Scale, Select, Validate, _BloomFilter, scale_in_place
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, n // 2, size=n)
+    return pd.DataFrame({
+        'id': ids,
+        'color': rng.choice(['red', 'blue', 'green'], size=n),
+        'a': rng.normal(10, 3, size=n),
+        'b': rng.integers(0, 100, size=n),
+        'y': rng.integers(0, 2, size=n),
+    })
+
+
+def test_chunked_matches_in_memory(tmp_path):
+    df = _frame()
+    path = str(tmp_path / 'data.csv')
+    df.to_csv(path, index=False)
+    features = ['color', 'a', 'b', 'ab']
+    validate = Validate(id_column='id')
+    pipeline = ChunkedPipeline(
+        stages=[validate,
+                Encode({'color': {'red': 0, 'blue': 1, 'green': 2}}),
+                Derive({'ab': lambda chunk: chunk['a'] * chunk['b']}),
+                Select(features + ['y']),
+                Scale(features)],
+        features=features, target='y')
+
+    # A second fit pass must not accumulate statistics from the first
+    pipeline.fit(path, chunksize=64)
+    X, y = pipeline.fit_transform(path, chunksize=64)
+
+    encoded = df.assign(color=df['color'].map({'red': 0, 'blue': 1, 'green': 2}), ab=df['a'] * df['b'])
+    np.testing.assert_allclose(X, StandardScaler().fit_transform(encoded[features]), atol=1e-10)
+    np.testing.assert_array_equal(y, df['y'])
+    assert validate.n_rows == len(df)
+    assert validate.duplicates == len(df) - df['id'].nunique()
+
+
+def test_temporary_memmap_removed_once_released(tmp_path):
+    path = str(tmp_path / 'data.csv')
+    _frame().to_csv(path, index=False)
+    pipeline = ChunkedPipeline([Scale(['a', 'b'])], features=['a', 'b'])
+    X, _ = pipeline.fit_transform(path, usecols=['a', 'b'], chunksize=100)
+    filename = X.filename
+    view = X[10:20]
+    del X
+    gc.collect()
+    assert os.path.exists(filename)
+    del view
+    gc.collect()
+    assert not os.path.exists(filename)
+
+
+def test_bloom_filter_never_undercounts():
+    bloom = _BloomFilter(capacity=10_000, error_rate=0.01)
+    seen, exact, found = set(), 0, 0
+    for chunk in np.array_split(np.random.default_rng(0).integers(0, 5_000, size=20_000), 7):
+        unique = np.unique(chunk)
+        exact += sum(1 for value in unique.tolist() if value in seen)
+        seen.update(unique.tolist())
+        found += bloom.add(unique)
+    assert exact <= found <= exact + 0.01 * len(seen)
+
+
+def test_scale_in_place_matches_standard_scaler():
+    df = _frame()
+    rows = np.random.default_rng(1).permutation(len(df))
+    scaler = StandardScaler()
+    X = scale_in_place(df, ['a', 'b'], scaler, dtype=np.float32, rows=rows, chunk_size=64)
+    assert X.dtype == np.float32 and X.flags.c_contiguous
+    expected = StandardScaler().fit_transform(df[['a', 'b']].to_numpy()[rows])
+    np.testing.assert_allclose(X, expected, atol=1e-5)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from semana2.src.models.scorer import AdScorer, MicroBatcher
+
+FEATURES = ['Gender', 'Age', 'EstimatedSalary']
+GENDER_CODES = {'Male': 0, 'Female': 1}
+
+
+@pytest.fixture
+def scorer():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 2, 200), rng.integers(18, 60, 200), rng.integers(15_000, 150_000, 200)])
+    y = (X[:, 1] > 40).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+    return AdScorer(scaler, model, FEATURES, {'Gender': GENDER_CODES})
+
+
+def test_malformed_request_fails_alone(scorer):
+    # A long wait makes sure all three requests land in the same batch
+    batcher = MicroBatcher(scorer, max_batch_rows=100, max_wait_ms=200)
+    valid = batcher.submit(pd.DataFrame({'Gender': ['Male', 'Female'], 'Age': [25, 55],
+                                         'EstimatedSalary': [40_000, 90_000]}))
+    unknown = batcher.submit(pd.DataFrame({'Gender': ['Other'], 'Age': [30], 'EstimatedSalary': [50_000]}))
+    missing = batcher.submit(pd.DataFrame({'Gender': ['Male'], 'Age': [None], 'EstimatedSalary': [50_000]}))
+
+    scored = valid.result(timeout=5)
+    expected = scorer.score_frame(pd.DataFrame({'Gender': ['Male', 'Female'], 'Age': [25, 55],
+                                                'EstimatedSalary': [40_000, 90_000]}))
+    np.testing.assert_array_equal(scored['prediction'].to_numpy(), expected['prediction'].to_numpy())
+    with pytest.raises(ValueError, match='Gender'):
+        unknown.result(timeout=5)
+    with pytest.raises(ValueError, match='Age'):
+        missing.result(timeout=5)
+
+
+def test_model_failure_is_retried_per_request(scorer):
+    class PickyModel:
+        """Fails on any batch with more than one row."""
+        def predict(self, X):
+            if len(X) > 1:
+                raise RuntimeError("batch too large")
+            return np.zeros(len(X), dtype=int)
+
+    scorer.model = PickyModel()
+    batcher = MicroBatcher(scorer, max_batch_rows=100, max_wait_ms=200)
+    row = pd.DataFrame({'Gender': ['Male'], 'Age': [30], 'EstimatedSalary': [50_000]})
+    single = [batcher.submit(row), batcher.submit(row)]
+    pair = batcher.submit(pd.concat([row, row], ignore_index=True))
+
+    for future in single:
+        assert future.result(timeout=5)['prediction'].tolist() == [0]
+    with pytest.raises(RuntimeError):
+        pair.result(timeout=5)
@@ -0,0 +1,42 @@
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.svm import SVC
+
+from semana2.src.models.search import SuccessiveHalvingSearch, _evaluate_candidate
+
+
+def _data(n=240, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = (X[:, 0] + 0.5 * X[:, 1] ** 2 + rng.normal(0, 0.3, size=n) > 0.5).astype(int)
+    return X, y
+
+
+def test_precomputed_kernel_scores_match_svc():
+    X, y = _data()
+    folds = list(StratifiedKFold(3, shuffle=True, random_state=0).split(X, y))
+    norms = np.einsum('ij,ij->i', X, X)
+    sq_dists = np.maximum(norms[:, None] + norms[None, :] - 2 * X @ X.T, 0)
+    for params in ({'C': 1.0, 'gamma': 'scale'}, {'C': 10.0, 'gamma': 0.3}):
+        shared = _evaluate_candidate(SVC(), params, X, y, folds, sq_dists)
+        direct = cross_val_score(SVC(**params), X, y, cv=folds)
+        np.testing.assert_allclose(shared, direct, atol=1e-9)
+
+
+def test_interrupted_search_resumes_from_log(tmp_path):
+    X, y = _data()
+    spaces = {'SVM': {'C': [0.1, 1.0, 10.0], 'gamma': ['scale', 1.0]}}
+    log_path = str(tmp_path / 'search.jsonl')
+    first = SuccessiveHalvingSearch({'SVM': SVC()}, spaces, cv=3, log_path=log_path).fit(X, y)
+
+    calls = []
+
+    def counting_map(fn, tasks):
+        calls.extend(tasks)
+        return [fn(*task) for task in tasks]
+
+    resumed = SuccessiveHalvingSearch({'SVM': SVC()}, spaces, cv=3, log_path=log_path,
+                                      map_fn=counting_map).fit(X, y)
+    assert calls == []
+    assert resumed.best_params_ == first.best_params_
+    assert resumed.best_models()['SVM'].get_params()['C'] == first.best_params_['SVM']['C']
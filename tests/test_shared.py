@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from common.shared import SharedArray, SharedArrays, resolve
+from semana2.src.data.processor import SocialAdDataProcessor
+from semana2.src.models.engine import SupervisedModelEngine
+
+ADS_CSV = os.path.join(os.path.dirname(__file__), '..', 'semana2', 'src', 'data', 'kaggle',
+                       'Social_Network_Ads.csv')
+
+
+def test_chunked_features_through_process_cross_validation():
+    processor = SocialAdDataProcessor(ADS_CSV)
+    X, y = processor.preprocess_chunked(chunksize=64)
+    assert isinstance(X, np.memmap) and os.path.exists(X.filename)
+
+    shared = SupervisedModelEngine(n_jobs=2, backend='process').run_cross_validation(X, y)
+    serial = SupervisedModelEngine().run_cross_validation(np.asarray(X), y)
+    for a, b in zip(shared, serial):
+        np.testing.assert_allclose(a['Scores'], b['Scores'])
+
+
+def test_memmap_is_shared_in_place(tmp_path):
+    path = str(tmp_path / 'x.npy')
+    X = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(10, 3))
+    X[:] = np.arange(30).reshape(10, 3)
+    X.flush()
+    with SharedArrays() as shared:
+        handle = shared.publish(X)
+        assert isinstance(handle, SharedArray) and handle.filename == path
+        np.testing.assert_array_equal(resolve(handle), X)
+
+
+def test_memmap_without_file_is_copied(tmp_path):
+    path = tmp_path / 'gone.npy'
+    X = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(10, 3))
+    X[:] = 1.5
+    os.remove(path)
+    with SharedArrays(directory=str(tmp_path)) as shared:
+        handle = shared.publish(X)
+        assert handle.filename != str(path)
+        np.testing.assert_array_equal(resolve(handle), X)